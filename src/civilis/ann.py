@@ -0,0 +1,133 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+近似最近邻索引（纯 NumPy）
+IVF：球面 k-means 质心 + 每行所属簇；查询只精排 nprobe 个最近簇内的行
+nprobe 越大召回越高、延迟越大；nprobe == nlist 时与精确检索一致
+"""
+from typing import Optional, Union
+
+import numpy as np
+
+
+def spherical_kmeans(x: np.ndarray, k: int, iters: int = 10,
+                     rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """单位向量上的 k-means（以点积为相似度），返回归一化质心 (k, dim)"""
+    rng = rng if rng is not None else np.random.default_rng()
+    k = min(k, len(x))
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(x @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        if empty.any():
+            # 空簇重新随机取点
+            sums[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    与 VectorMemory 的行号对齐：add(row) / remove(row, last) 与其“末行换入”删除方式一致
+    样本数达到 train_size 前不建索引（candidates 返回 None，调用方走精确检索）；
+    之后每新增 (retrain_factor - 1) × 上次训练样本数 条向量重新训练质心（应对增长与淘汰造成的漂移）
+    """
+    def __init__(self, nlist: int = 64, nprobe: int = 8, train_size: Optional[int] = None,
+                 retrain_factor: float = 2.0, kmeans_iters: int = 10,
+                 max_train_samples: int = 65536, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = train_size if train_size is not None else 16 * nlist
+        self.retrain_factor = retrain_factor
+        self.kmeans_iters = kmeans_iters
+        self.max_train_samples = max_train_samples
+        self.centroids: Optional[np.ndarray] = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._trained_at = 0
+        self._updates = 0
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _grow(self, size: int):
+        if size > len(self._assign):
+            assign = np.zeros(max(size, 2 * len(self._assign)), dtype=np.int32)
+            assign[:len(self._assign)] = self._assign
+            self._assign = assign
+
+    def train(self, matrix: np.ndarray):
+        """
+        在 matrix（预归一化行）上训练质心并为全部行分簇
+        也接受 VectorMemory 的 float16 / int8 紧凑矩阵：逐行正缩放不影响 argmax 分簇
+        """
+        n = len(matrix)
+        sample = matrix
+        if n > self.max_train_samples:
+            sample = matrix[self._rng.choice(n, self.max_train_samples, replace=False)]
+        sample = np.asarray(sample, dtype=np.float32)
+        sample = sample / np.maximum(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12)
+        self.centroids = spherical_kmeans(sample, self.nlist, self.kmeans_iters, self._rng)
+        self._grow(n)
+        for start in range(0, n, 16384):
+            block = np.asarray(matrix[start:start + 16384], dtype=np.float32)
+            self._assign[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        self._trained_at = n
+        self._updates = 0
+
+    def add(self, row: int, matrix: np.ndarray):
+        """matrix 为当前全部有效行（含新行 row）"""
+        n = len(matrix)
+        if not self.trained:
+            if n >= self.train_size:
+                self.train(matrix)
+            return
+        self._updates += 1
+        if self._updates >= self._trained_at * (self.retrain_factor - 1):
+            self.train(matrix)
+            return
+        self._grow(row + 1)
+        self._assign[row] = int(np.argmax(self.centroids @ matrix[row].astype(np.float32)))
+
+    def update(self, row: int, matrix: np.ndarray):
+        """第 row 行向量被原地替换（合并近似重复）后重新分配簇"""
+        if self.trained:
+            self._assign[row] = int(np.argmax(self.centroids @ matrix[row].astype(np.float32)))
+
+    def remove(self, row: int, last: int):
+        if self.trained:
+            self._assign[row] = self._assign[last]
+
+    def candidates(self, q: np.ndarray, n: int) -> Optional[np.ndarray]:
+        """返回 nprobe 个最近簇内的行号；未训练时返回 None"""
+        if not self.trained or self.nprobe >= len(self.centroids):
+            return None
+        probe = np.argpartition(-(self.centroids @ q), self.nprobe - 1)[:self.nprobe]
+        probed = np.zeros(len(self.centroids), dtype=bool)
+        probed[probe] = True
+        return np.flatnonzero(probed[self._assign[:n]])
+
+
+def get_ann_index(index: Union[None, str, IVFIndex], **kwargs) -> Optional[IVFIndex]:
+    """工厂函数：None | "ivf" | 现成实例"""
+    if index is None or isinstance(index, IVFIndex):
+        return index
+    if index == "ivf":
+        return IVFIndex(**kwargs)
+    raise ValueError(f"Unsupported ANN index: {index}")
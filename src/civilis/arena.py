@@ -0,0 +1,110 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+群体洞察竞技场（Insight Arena）
+所有智能体的洞察向量存放在一块预分配数组中，每个智能体占固定长度的一段；
+“用一句话查询全体记忆” = 一次矩阵乘 + 分段 top-k，各智能体仍以 VectorMemory 接口使用
+"""
+from typing import List, Optional, Union
+
+import numpy as np
+
+from .core import Insight, VectorMemory, _encode
+from .eviction import EvictionPolicy
+
+
+class ArenaMemory(VectorMemory):
+    """绑定到竞技场中一段存储的 VectorMemory（容量固定，不再扩容）"""
+    def __init__(self, arena: "InsightArena", slot: int,
+                 eviction: Union[str, EvictionPolicy] = "strength"):
+        super().__init__(max_insights=arena.capacity, eviction=eviction)
+        self.arena = arena
+        self.slot = slot
+        self._matrix = arena.vectors[slot]
+        self._valid = arena.valid[slot]
+
+    def _ensure_capacity(self, dim: int):
+        if dim != self._matrix.shape[1]:
+            raise ValueError(f"Vector dimension {dim} does not match arena dimension {self._matrix.shape[1]}")
+
+
+class InsightArena:
+    """
+    vectors: (num_agents, capacity + 1, dim) float32，第 i 个智能体的行偏移为 offsets[i]
+    valid:   (num_agents, capacity + 1) 有效行掩码（空行与零向量均为 False）
+    """
+    def __init__(self, num_agents: int, dim: int, capacity: int = 200,
+                 eviction: Union[str, EvictionPolicy] = "strength"):
+        self.num_agents = num_agents
+        self.dim = dim
+        self.capacity = capacity
+        # 额外一行用于“先插入再淘汰”
+        self.vectors = np.zeros((num_agents, capacity + 1, dim), dtype=np.float32)
+        self.valid = np.zeros((num_agents, capacity + 1), dtype=bool)
+        self.offsets = np.arange(num_agents, dtype=np.int64) * (capacity + 1)
+        self.memories = [ArenaMemory(self, i, eviction) for i in range(num_agents)]
+
+    def __len__(self):
+        return self.num_agents
+
+    def __getitem__(self, slot: int) -> ArenaMemory:
+        return self.memories[slot]
+
+    def broadcast(self, content: str, source_module: str = "unknown",
+                  agent_mask: Optional[np.ndarray] = None):
+        """同一条消息写入多个智能体：只编码一次"""
+        vector = _encode(content)
+        slots = range(self.num_agents) if agent_mask is None else np.flatnonzero(agent_mask)
+        for slot in slots:
+            self.memories[slot].add_insight(content, source_module, vector=vector)
+
+    def query_all(self, text: Union[str, np.ndarray], top_k: int = 2, threshold: float = 0.5,
+                  agent_mask: Optional[np.ndarray] = None,
+                  touch: Optional[bool] = None) -> List[List[Insight]]:
+        """
+        对所有（或 agent_mask 选中的）智能体记忆执行查询，返回每个智能体的匹配列表
+        touch 含义同 VectorMemory.query
+        """
+        q_vec = _encode(text) if isinstance(text, str) else np.asarray(text)
+        q_norm = np.linalg.norm(q_vec)
+        results: List[List[Insight]] = [[] for _ in range(self.num_agents)]
+        if q_norm < 1e-8 or top_k <= 0:
+            return results
+        rows = self.capacity + 1
+        sims = self.vectors.reshape(-1, self.dim) @ (q_vec / q_norm).astype(np.float32)
+        sims = sims.reshape(self.num_agents, rows)
+        sims[~self.valid] = -np.inf
+        if agent_mask is not None:
+            sims[~np.asarray(agent_mask, dtype=bool)] = -np.inf
+
+        # 分段 top-k：每段长度相同，沿 axis=1 做 argpartition
+        k = min(top_k, rows)
+        if k < rows:
+            candidates = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(rows), sims.shape)
+        scores = np.take_along_axis(sims, candidates, axis=1)
+        order = np.argsort(-scores, axis=1, kind="stable")
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        passed = scores >= threshold
+        for slot in np.flatnonzero(passed.any(axis=1)):
+            memory = self.memories[slot]
+            matches = [memory.insights[row] for row in candidates[slot][passed[slot]]]
+            results[slot] = memory._mark_used(matches, touch)
+        return results
+
+    def memory_usage(self) -> int:
+        """竞技场向量与掩码占用字节数"""
+        return self.vectors.nbytes + self.valid.nbytes
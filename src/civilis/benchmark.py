@@ -0,0 +1,294 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+性能基准套件
+使用确定性桩编码器（不加载真实模型），测得的是框架自身开销：
+VectorMemory.add_insight / query / query_many、CivilisAgent.learn / learn_many、CivilisSimulation.run
+命令行：
+    civilis-bench run --out baseline.json
+    civilis-bench compare baseline.json current.json --tolerance 0.2
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .embedding_backends import EmbeddingBackend, register_embedding_backend
+from .embedding_cache import reset_embedding_caches
+
+STUB_MODEL_PATH = "bench-stub"
+
+
+class StubEncoder(EmbeddingBackend):
+    """按文本哈希生成确定性单位向量：跨进程、跨机器一致，开销可忽略"""
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts: Union[str, List[str]], batch_size: Optional[int] = None) -> np.ndarray:
+        if isinstance(texts, str):
+            return self._vec(texts)
+        return np.stack([self._vec(t) for t in texts]) if texts else np.zeros((0, self.dim), np.float32)
+
+    def get_dimension(self) -> int:
+        return self.dim
+
+    def _vec(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        vec = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return vec / np.linalg.norm(vec)
+
+
+@contextlib.contextmanager
+def stub_environment(dim: int = 384):
+    """注册桩编码器并令默认模型指向它；退出时恢复环境变量、清空嵌入缓存"""
+    register_embedding_backend(STUB_MODEL_PATH, StubEncoder(dim))
+    previous = os.environ.get("CIVILIS_EMBEDDING_MODEL")
+    os.environ["CIVILIS_EMBEDDING_MODEL"] = STUB_MODEL_PATH
+    reset_embedding_caches()
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("CIVILIS_EMBEDDING_MODEL", None)
+        else:
+            os.environ["CIVILIS_EMBEDDING_MODEL"] = previous
+        reset_embedding_caches()
+
+
+def _warm(texts: Sequence[str]):
+    # 预先写入嵌入缓存，计时只覆盖框架路径（缓存命中 + 存储/检索）
+    from .core import _encode
+    _encode(list(texts))
+
+
+def _time(setup: Callable[[], Any], body: Callable[[Any], Any], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        body(state)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _bench_add_insight(size: int, repeat: int) -> Dict[str, Any]:
+    from .core import VectorMemory
+    texts = [f"insight {i}" for i in range(size)]
+    _warm(texts)
+
+    def body(memory):
+        for text in texts:
+            memory.add_insight(text)
+    return {"ops": size, "timings": _time(lambda: VectorMemory(max_insights=size), body, repeat)}
+
+
+def _bench_query(size: int, repeat: int, queries: int = 200) -> Dict[str, Any]:
+    from .core import VectorMemory
+    texts = [f"insight {i}" for i in range(size)]
+    probes = [f"probe {i}" for i in range(queries)]
+    _warm(texts + probes)
+    memory = VectorMemory(max_insights=size)
+    for text in texts:
+        memory.add_insight(text)
+
+    def body(_):
+        for probe in probes:
+            memory.query(probe, top_k=5, threshold=0.0)
+    return {"ops": queries, "timings": _time(lambda: None, body, repeat)}
+
+
+def _bench_learn(size: int, repeat: int) -> Dict[str, Any]:
+    from .core import CivilisAgent, VectorMemory
+    # 一半语句重复出现，覆盖去重加强路径
+    statements = [f"statement {i % (size // 2 or 1)}" for i in range(size)]
+    _warm(statements)
+
+    def body(agent):
+        for statement in statements:
+            agent.learn(statement)
+    return {"ops": size,
+            "timings": _time(lambda: CivilisAgent("bench", VectorMemory(max_insights=size)), body, repeat)}
+
+
+def _bench_learn_many(size: int, repeat: int) -> Dict[str, Any]:
+    from .core import CivilisAgent, VectorMemory
+    statements = [f"statement {i % (size // 2 or 1)}" for i in range(size)]
+    _warm(statements)
+
+    def body(agent):
+        agent.learn_many(statements)
+    return {"ops": size,
+            "timings": _time(lambda: CivilisAgent("bench", VectorMemory(max_insights=size)), body, repeat)}
+
+
+def _bench_query_many(size: int, repeat: int, queries: int = 200) -> Dict[str, Any]:
+    from .core import VectorMemory
+    texts = [f"insight {i}" for i in range(size)]
+    probes = [f"probe {i}" for i in range(queries)]
+    _warm(texts + probes)
+    memory = VectorMemory(max_insights=size)
+    memory.add_insights(texts)
+    return {"ops": queries,
+            "timings": _time(lambda: None, lambda _: memory.query_many(probes, top_k=5, threshold=0.0), repeat)}
+
+
+def _bench_simulation(agents: int, rounds: int, repeat: int) -> Dict[str, Any]:
+    from .simulation import CivilisSimulation
+
+    def setup():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return CivilisSimulation(num_agents=agents, rounds=rounds, seed=0,
+                                     model_path=STUB_MODEL_PATH)
+
+    def body(sim):
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim.run(keep_history=False)
+    return {"ops": agents * rounds, "timings": _time(setup, body, repeat)}
+
+
+# 名称 → (基准函数, 参数)；quick 为 CI / 测试使用的小规模子集
+SUITES = {
+    "full": [
+        ("vector_memory.add_insight", _bench_add_insight, {"size": size}) for size in (100, 1000, 10000)
+    ] + [
+        ("vector_memory.query", _bench_query, {"size": size}) for size in (100, 1000, 10000)
+    ] + [
+        ("vector_memory.query_many", _bench_query_many, {"size": size}) for size in (100, 1000, 10000)
+    ] + [
+        ("agent.learn", _bench_learn, {"size": size}) for size in (100, 1000)
+    ] + [
+        ("agent.learn_many", _bench_learn_many, {"size": size}) for size in (100, 1000)
+    ] + [
+        ("simulation.run", _bench_simulation, {"agents": a, "rounds": r})
+        for a, r in ((10, 100), (100, 20), (1000, 5))
+    ],
+    "quick": [
+        ("vector_memory.add_insight", _bench_add_insight, {"size": 50}),
+        ("vector_memory.query", _bench_query, {"size": 50}),
+        ("vector_memory.query_many", _bench_query_many, {"size": 50}),
+        ("agent.learn", _bench_learn, {"size": 50}),
+        ("agent.learn_many", _bench_learn_many, {"size": 50}),
+        ("simulation.run", _bench_simulation, {"agents": 5, "rounds": 5}),
+    ],
+}
+
+
+def _case_name(name: str, params: Dict[str, Any]) -> str:
+    return f"{name}[{','.join(f'{k}={v}' for k, v in params.items())}]"
+
+
+def run_benchmarks(suite: str = "full", repeat: int = 3, dim: int = 384,
+                   only: Optional[str] = None) -> Dict[str, Any]:
+    """运行基准套件，返回可直接写为 JSON 的基线（每项取 repeat 次中的最小值）"""
+    if suite not in SUITES:
+        raise ValueError(f"Unsupported benchmark suite: {suite}")
+    results = {}
+    with stub_environment(dim):
+        for name, bench, params in SUITES[suite]:
+            case = _case_name(name, params)
+            if only and only not in case:
+                continue
+            measured = bench(repeat=repeat, **params)
+            best = min(measured["timings"])
+            results[case] = {
+                "params": params,
+                "ops": measured["ops"],
+                "seconds": best,
+                "median_seconds": statistics.median(measured["timings"]),
+                "us_per_op": best / measured["ops"] * 1e6,
+            }
+    return {
+        "meta": {
+            "suite": suite,
+            "repeat": repeat,
+            "dim": dim,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            tolerance: float = 0.2) -> List[Dict[str, Any]]:
+    """逐项比较 us_per_op；current / baseline - 1 超过 tolerance 记为回归"""
+    rows = []
+    for case, base in baseline["results"].items():
+        now = current["results"].get(case)
+        if now is None:
+            continue
+        change = now["us_per_op"] / base["us_per_op"] - 1.0
+        status = "regression" if change > tolerance else ("faster" if change < -tolerance else "ok")
+        rows.append({"case": case, "baseline_us": base["us_per_op"], "current_us": now["us_per_op"],
+                     "change": change, "status": status})
+    return rows
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    from .ensemble import format_table
+
+    parser = argparse.ArgumentParser(description="Civilis 性能基准（桩编码器）")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="运行基准并输出 JSON 基线")
+    run.add_argument("--suite", default="full", choices=sorted(SUITES))
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--dim", type=int, default=384)
+    run.add_argument("--only", default=None, help="只运行名称包含该子串的用例")
+    run.add_argument("--out", default=None, help="写入 JSON 文件（默认打印到标准输出）")
+    cmp = commands.add_parser("compare", help="对比两份基线，出现回归时退出码为 1")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--tolerance", type=float, default=0.2, help="允许的相对变慢比例（默认 0.2）")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run_benchmarks(args.suite, args.repeat, args.dim, args.only)
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+            print(format_table([{"case": case, "us_per_op": r["us_per_op"]}
+                                for case, r in report["results"].items()]))
+            print(f"📊 基线已写入: {args.out}")
+        else:
+            print(text)
+        return 0
+
+    rows = compare(_load(args.baseline), _load(args.current), args.tolerance)
+    print(format_table(rows))
+    regressions = [row for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"❌ {len(regressions)} 项性能回归（容差 {args.tolerance:.0%}）")
+        return 1
+    print("✅ 无性能回归")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
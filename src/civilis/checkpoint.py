@@ -0,0 +1,385 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+模拟检查点（保存 / 恢复）
+目录布局：manifest.json（配置、轮次、模拟 RNG）+ 每列一个 .npy 数组（加载时以 memmap 方式打开）
+全部文本去重后存入一张字符串表（strings.bin + string_offsets.npy），其余列以整数索引引用
+恢复后继续运行的结果与不中断运行逐位一致（淘汰顺序由逻辑使用时钟决定；last_used 为墙钟时间，仅作记录）
+"""
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from .civilization import CivilizationMetrics
+from .core import STORAGE_DTYPES, Insight, VectorMemory
+from .eviction import EVICTION_POLICIES
+from .social import SocialGraph
+
+if TYPE_CHECKING:
+    from .simulation import CivilisAgent, CivilisSimulation
+
+FORMAT = "civilis-checkpoint"
+VERSION = 1
+MANIFEST = "manifest.json"
+_MASK64 = (1 << 64) - 1
+
+
+class _StringTable:
+    """文本去重：相同字符串只存一份"""
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def __call__(self, text: str) -> int:
+        return self.ids.setdefault(text, len(self.ids))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        encoded = [text.encode("utf-8") for text in self.ids]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return {"strings": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                "string_offsets": offsets}
+
+
+def _load_strings(strings: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = strings.tobytes()
+    bounds = offsets.tolist()
+    return [data[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+
+def _pack_rng(rng: np.random.Generator) -> List[int]:
+    """PCG64 状态 → 6 个 uint64（128 位 state/inc 各拆成高低两半）"""
+    state = rng.bit_generator.state
+    if state["bit_generator"] != "PCG64":
+        raise ValueError(f"Unsupported bit generator for checkpoint: {state['bit_generator']}")
+    s, inc = state["state"]["state"], state["state"]["inc"]
+    return [s >> 64, s & _MASK64, inc >> 64, inc & _MASK64,
+            state["has_uint32"], state["uinteger"]]
+
+
+def _unpack_rng(row: np.ndarray) -> np.random.Generator:
+    hi, lo, inc_hi, inc_lo, has_uint32, uinteger = (int(v) for v in row)
+    rng = np.random.Generator(np.random.PCG64())
+    rng.bit_generator.state = {
+        "bit_generator": "PCG64",
+        "state": {"state": (hi << 64) | lo, "inc": (inc_hi << 64) | inc_lo},
+        "has_uint32": has_uint32,
+        "uinteger": uinteger,
+    }
+    return rng
+
+
+def _policy_name(memory: VectorMemory) -> str:
+    name = memory._evictor.policy.name
+    if EVICTION_POLICIES.get(name) is not type(memory._evictor.policy):
+        raise ValueError(f"Eviction policy {name!r} is not registered and cannot be checkpointed")
+    return name
+
+
+def _memory_arrays(memories: List[VectorMemory], intern: _StringTable) -> Dict[str, np.ndarray]:
+    """一组知识记忆 → 列式数组（第 i 个记忆的洞察位于 insight_offsets[i]:insight_offsets[i + 1]）"""
+    n = len(memories)
+    insight_offsets = np.zeros(n + 1, dtype=np.int64)
+    contents: List[int] = []
+    sources: List[int] = []
+    strength: List[int] = []
+    hits: List[int] = []
+    last_used: List[float] = []
+    used: List[int] = []
+    seq: List[int] = []
+    members: List[int] = []
+    alias_names: List[int] = []
+    alias_targets: List[int] = []
+    alias_offsets = np.zeros(n + 1, dtype=np.int64)
+    raw_vectors: List[np.ndarray] = []
+    matrices: List[np.ndarray] = []
+    scales: List[np.ndarray] = []
+    exact: List[np.ndarray] = []
+    valid: List[np.ndarray] = []
+    storages = {memory.storage for memory in memories}
+    if len(storages) > 1:
+        raise ValueError(f"Agents use mixed storage modes: {sorted(storages)}")
+    storage = storages.pop() if storages else "float32"
+    # 任一记忆带精排侧存储时为全部记忆保存（没有的取反量化向量）
+    with_exact = any(memory._exact is not None for memory in memories)
+    next_seq = np.zeros(n, dtype=np.int64)
+    use_clock = np.zeros(n, dtype=np.int64)
+    max_insights = np.zeros(n, dtype=np.int64)
+    policies = np.zeros(n, dtype=np.int64)
+    dim = 0
+
+    for i, knowledge in enumerate(memories):
+        if knowledge._ann is not None:
+            raise ValueError("Checkpointing memories with an ANN index is not supported")
+        max_insights[i] = knowledge.max_insights
+        policies[i] = intern(_policy_name(knowledge))
+        next_seq[i] = knowledge._evictor._next_seq
+        use_clock[i] = knowledge._use_clock
+        for target, group in knowledge._alias_groups.items():
+            alias_names.extend(intern(alias) for alias in group)
+            alias_targets.extend([intern(target)] * len(group))
+        alias_offsets[i + 1] = len(alias_names)
+        count = len(knowledge)
+        insight_offsets[i + 1] = insight_offsets[i] + count
+        if count == 0:
+            continue
+        dim = knowledge._matrix.shape[1]
+        matrices.append(knowledge._matrix[:count])
+        valid.append(knowledge._valid[:count])
+        if knowledge._scales is not None:
+            scales.append(knowledge._scales[:count])
+        if with_exact:
+            exact.append(knowledge._unit_rows(slice(0, count)))
+        for ins in knowledge.insights:
+            contents.append(intern(ins.content))
+            sources.append(intern(ins.source_module))
+            strength.append(ins.strength)
+            hits.append(ins.hits)
+            last_used.append(ins.last_used)
+            used.append(ins.used)
+            seq.append(knowledge._evictor.seq(ins.content))
+            members.append(ins.members)
+            if ins.vector is not None:
+                raw_vectors.append(ins.vector)
+
+    dtype = STORAGE_DTYPES[storage]
+    arrays = {
+        "agent_max_insights": max_insights,
+        "agent_policy": policies,
+        "agent_next_seq": next_seq,
+        "agent_use_clock": use_clock,
+        "insight_offsets": insight_offsets,
+        "insight_content": np.asarray(contents, dtype=np.int64),
+        "insight_source": np.asarray(sources, dtype=np.int64),
+        "insight_strength": np.asarray(strength, dtype=np.int64),
+        "insight_hits": np.asarray(hits, dtype=np.int64),
+        "insight_last_used": np.asarray(last_used, dtype=np.float64),
+        "insight_used": np.asarray(used, dtype=np.int64),
+        "insight_seq": np.asarray(seq, dtype=np.int64),
+        "insight_members": np.asarray(members, dtype=np.int64),
+        # 近似重复合并留下的别名（被合并文本 → 代表洞察文本）
+        "alias_offsets": alias_offsets,
+        "alias_names": np.asarray(alias_names, dtype=np.int64),
+        "alias_targets": np.asarray(alias_targets, dtype=np.int64),
+        # 归一化矩阵行与原始向量分开保存，避免恢复时重新归一化带来的舍入差异
+        "insight_matrix": np.concatenate(matrices) if matrices else np.zeros((0, dim), dtype),
+        "insight_valid": np.concatenate(valid) if valid else np.zeros(0, dtype=bool),
+    }
+    # 紧凑存储不保留原始向量；int8 另存逐行缩放系数
+    if storage == "float32":
+        arrays["insight_vectors"] = (np.stack(raw_vectors) if raw_vectors
+                                     else np.zeros((0, dim), np.float32))
+    if storage == "int8":
+        arrays["insight_scales"] = (np.concatenate(scales) if scales
+                                    else np.zeros(0, dtype=np.float32))
+    if with_exact:
+        arrays["insight_exact"] = (np.concatenate(exact) if exact
+                                   else np.zeros((0, dim), dtype=np.float32))
+    return arrays
+
+
+def _agent_arrays(agents: List["CivilisAgent"], intern: _StringTable) -> Dict[str, np.ndarray]:
+    n = len(agents)
+    memory_offsets = np.zeros(n + 1, dtype=np.int64)
+    memory_strings: List[int] = []
+    insights = np.zeros(n, dtype=np.int64)
+    rngs = np.zeros((n, 6), dtype=np.uint64)
+    for i, agent in enumerate(agents):
+        memory_strings.extend(intern(text) for text in agent.memory)
+        memory_offsets[i + 1] = len(memory_strings)
+        insights[i] = agent.insights
+        rngs[i] = _pack_rng(agent.rng)
+    return {
+        "agent_insights": insights,
+        "agent_rng": rngs,
+        "memory_offsets": memory_offsets,
+        "memory_strings": np.asarray(memory_strings, dtype=np.int64),
+        **_memory_arrays([agent.knowledge for agent in agents], intern),
+    }
+
+
+def save_checkpoint(sim: "CivilisSimulation", path: str,
+                    agents: Optional[List["CivilisAgent"]] = None):
+    """
+    写入检查点目录；先写临时目录再整体替换，中途崩溃不会损坏上一个检查点
+    （在两次重命名之间崩溃时，下次保存 / 加载从 .old-* 目录恢复）
+    agents 默认取 sim.agents（多进程运行时由调用方传入从工作进程取回的智能体）
+    """
+    agents = sim.agents if agents is None else agents
+    intern = _StringTable()
+    arrays = _agent_arrays(agents, intern)
+    if sim.culture is not None:
+        arrays["culture"] = sim.culture
+    if sim.social_graph is not None:
+        arrays["social_indptr"] = sim.social_graph.indptr
+        arrays["social_indices"] = sim.social_graph.indices
+    # 已出现过的洞察文本（innovation 判定依据），恢复后指标与不中断运行一致
+    arrays["civilization_seen"] = np.asarray([intern(text) for text in sorted(sim.civilization.seen)],
+                                             dtype=np.int64)
+    arrays.update(intern.arrays())
+
+    manifest = {
+        "format": FORMAT,
+        "version": VERSION,
+        "current_round": sim.current_round,
+        "config": {
+            "num_agents": sim.num_agents,
+            "rounds": sim.rounds,
+            "seed": sim.seed,
+            "batch_size": sim.batch_size,
+            "workers": sim.workers,
+            "model_path": sim.model_path,
+            "social_degree": sim.social_degree,
+            "rewire_prob": sim.rewire_prob,
+            "social_influence": sim.social_influence,
+            "social_hops": sim.social_hops,
+            "storage": sim.storage,
+            "civilization_metrics": sim.civilization_metrics,
+            "merge_threshold": sim.merge_threshold,
+        },
+        "rng": sim.rng.bit_generator.state,
+        "arrays": sorted(arrays),
+    }
+
+    path = os.path.abspath(path)
+    _recover(path)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    old = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _recover(path: str):
+    """
+    上次保存在两次重命名之间崩溃时 path 不存在：把最新的完整 .old-* 目录改回 path；
+    其余残留的 .old-* 目录删除
+    """
+    parent, name = os.path.split(os.path.abspath(path))
+    if not os.path.isdir(parent):
+        return
+    olds = [os.path.join(parent, entry) for entry in os.listdir(parent) if entry.startswith(f"{name}.old-")]
+    olds = sorted((old for old in olds if os.path.exists(os.path.join(old, MANIFEST))), key=os.path.getmtime)
+    if olds and not os.path.exists(path):
+        os.replace(olds.pop(), path)
+    for old in olds:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def read_manifest(path: str) -> dict:
+    with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT:
+        raise ValueError(f"Not a Civilis checkpoint: {path}")
+    if manifest.get("version") != VERSION:
+        raise ValueError(f"Unsupported checkpoint version: {manifest.get('version')}")
+    return manifest
+
+
+def _restore_memory(memory: VectorMemory, a: Dict[str, np.ndarray], i: int,
+                    strings: List[str]):
+    start, end = int(a["insight_offsets"][i]), int(a["insight_offsets"][i + 1])
+    count = end - start
+    memory._evictor._next_seq = int(a["agent_next_seq"][i])
+    memory._use_clock = int(a["agent_use_clock"][i]) if "agent_use_clock" in a else 0
+    if "alias_offsets" in a:
+        lo, hi = int(a["alias_offsets"][i]), int(a["alias_offsets"][i + 1])
+        for alias, target in zip(a["alias_names"][lo:hi].tolist(), a["alias_targets"][lo:hi].tolist()):
+            memory._add_aliases(strings[target], [strings[alias]])
+    if count == 0:
+        return
+    capacity = min(max(16, count), memory.max_insights + 1)
+    memory._matrix = np.zeros((capacity, a["insight_matrix"].shape[1]), dtype=STORAGE_DTYPES[memory.storage])
+    memory._valid = np.zeros(capacity, dtype=bool)
+    memory._matrix[:count] = a["insight_matrix"][start:end]
+    memory._valid[:count] = a["insight_valid"][start:end]
+    if "insight_scales" in a:
+        memory._scales = np.zeros(capacity, dtype=np.float32)
+        memory._scales[:count] = a["insight_scales"][start:end]
+    if memory.compact and memory.rerank > 0:
+        # 没有保存侧存储（rerank 开启前写入的）时以反量化向量代替
+        memory._exact = np.zeros((capacity, memory._matrix.shape[1]), dtype=np.float32)
+        memory._exact[:count] = (a["insight_exact"][start:end] if "insight_exact" in a
+                                 else memory._unit_rows(slice(0, count)))
+    vectors = np.array(a["insight_vectors"][start:end]) if "insight_vectors" in a else [None] * count
+    members = a["insight_members"][start:end].tolist() if "insight_members" in a else [1] * count
+    if "insight_used" in a:
+        used = a["insight_used"][start:end].tolist()
+    else:
+        # 旧检查点没有逻辑时钟：按 (last_used, seq) 的先后重建
+        order = np.lexsort((a["insight_seq"][start:end], a["insight_last_used"][start:end]))
+        used = np.empty(count, dtype=np.int64)
+        used[order] = np.arange(1, count + 1)
+        used = used.tolist()
+        memory._use_clock = count
+    columns = zip(a["insight_content"][start:end].tolist(), a["insight_source"][start:end].tolist(),
+                  a["insight_strength"][start:end].tolist(), a["insight_hits"][start:end].tolist(),
+                  a["insight_last_used"][start:end].tolist(), a["insight_seq"][start:end].tolist(), members, used)
+    for row, (content, source, strength, hits, last_used, seq, merged, tick) in enumerate(columns):
+        ins = Insight(content=strings[content], vector=vectors[row], strength=strength,
+                      last_used=last_used, source_module=strings[source], hits=hits, members=merged,
+                      used=tick)
+        memory.insights.append(ins)
+        memory._index[ins.content] = row
+        memory._evictor.add(ins.content, ins, seq=seq)
+
+
+def load_checkpoint(path: str, rounds: Optional[int] = None,
+                    workers: Optional[int] = None) -> "CivilisSimulation":
+    """从检查点目录重建模拟；rounds / workers 可覆盖原配置（例如延长总轮数）"""
+    from .simulation import CivilisSimulation
+
+    _recover(path)
+    manifest = read_manifest(path)
+    a = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+         for name in manifest["arrays"]}
+    config = dict(manifest["config"])
+    if rounds is not None:
+        config["rounds"] = rounds
+    if workers is not None:
+        config["workers"] = workers
+    # 先不建社交网络，随后直接装入保存的 CSR 数组
+    sim = CivilisSimulation(**{**config, "social_degree": 0})
+    sim.social_degree = config["social_degree"]
+    if "social_indptr" in a:
+        sim.social_graph = SocialGraph(np.array(a["social_indptr"]), np.array(a["social_indices"]))
+    if "culture" in a:
+        sim.culture = np.array(a["culture"])
+    sim.rng.bit_generator.state = manifest["rng"]
+    sim.current_round = manifest["current_round"]
+
+    strings = _load_strings(a["strings"], a["string_offsets"])
+    memory_offsets = a["memory_offsets"].tolist()
+    memory_strings = a["memory_strings"].tolist()
+    for i, agent in enumerate(sim.agents):
+        agent.memory = [strings[s] for s in memory_strings[memory_offsets[i]:memory_offsets[i + 1]]]
+        agent.insights = int(a["agent_insights"][i])
+        agent.rng = _unpack_rng(a["agent_rng"][i])
+        agent.knowledge = VectorMemory(max_insights=int(a["agent_max_insights"][i]),
+                                       eviction=strings[int(a["agent_policy"][i])],
+                                       storage=sim.storage, model_path=sim.model_path,
+                                       merge_threshold=sim.merge_threshold)
+        _restore_memory(agent.knowledge, a, i, strings)
+    if "civilization_seen" in a:
+        sim.civilization = CivilizationMetrics(strings[s] for s in a["civilization_seen"].tolist())
+    return sim
@@ -0,0 +1,191 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+文明指标（增量维护）
+- diversity：全体洞察单位向量的总方差 1 - |均值|²（0 = 全部相同，越大越分散）
+- consensus：各智能体记忆质心方向两两余弦的均值
+- innovation：本轮首次出现（此前从未被任何智能体记住）的洞察文本数
+- novelty：本轮新写入洞察与轮初群体质心的平均余弦距离
+洞察写入 / 淘汰时经 VectorMemory.observer 记录，每轮合并一次，只处理本轮有变化的智能体；
+运行和以定点整数累加，结果与加减顺序、分片数无关
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from .core import VectorMemory
+
+# 定点缩放：单位向量分量乘 2^30 后取整累加，可容纳 2^33 条向量而不溢出
+_SCALE = float(1 << 30)
+
+
+def _fixed(vec: np.ndarray) -> np.ndarray:
+    # float32 输入保持 float32 计算（乘 2 的幂不引入舍入），结果同样确定
+    vec = np.asarray(vec)
+    if vec.dtype != np.float32:
+        vec = vec.astype(np.float64)
+    return np.rint(vec * vec.dtype.type(_SCALE)).astype(np.int64)
+
+
+class _Observer:
+    __slots__ = ("stats", "slot")
+
+    def __init__(self, stats: "CivilizationStats", slot: int):
+        self.stats = stats
+        self.slot = slot
+
+    def on_insert(self, content: str, vector: np.ndarray):
+        self.stats._insert(self.slot, content, vector)
+
+    def on_remove(self, content: str, vector: np.ndarray):
+        self.stats._remove(self.slot, vector)
+
+
+class CivilizationStats:
+    """
+    一个分片（一组智能体记忆）内的增量统计，在分片所在进程维护
+    写入 / 淘汰只把向量记入待处理列表，round_partial() 每轮一次性向量化合并，
+    返回可跨进程求和的部分和（整数数组）
+    """
+    def __init__(self, memories: List[VectorMemory]):
+        self.memories = memories
+        self.dim: Optional[int] = None
+        self._slots: List[int] = []
+        self._signs: List[int] = []
+        self._vectors: List[np.ndarray] = []
+        self._inserted: Set[str] = set()
+        for slot, memory in enumerate(memories):
+            memory.observer = _Observer(self, slot)
+            n = len(memory)
+            if n:
+                rows = memory._unit_rows(slice(0, n))[memory._valid[:n]]
+                self._slots.extend([slot] * len(rows))
+                self._signs.extend([1] * len(rows))
+                self._vectors.extend(rows)
+        self._flush()
+        # 已有洞察不算作本轮新增
+        self._inserted.clear()
+        if self.dim is not None:
+            self._start_sum = self.total_sum.copy()
+            self._new_sum[:] = 0
+            self._new_count = 0
+
+    def _ensure_dim(self, dim: int):
+        if self.dim is None:
+            self.dim = dim
+            n = len(self.memories)
+            self.total_sum = np.zeros(dim, dtype=np.int64)
+            self.agent_sums = np.zeros((n, dim), dtype=np.int64)
+            self.agent_counts = np.zeros(n, dtype=np.int64)
+            self.directions = np.zeros((n, dim), dtype=np.int64)
+            self.direction_sum = np.zeros(dim, dtype=np.int64)
+            self._start_sum = np.zeros(dim, dtype=np.int64)
+            self._new_sum = np.zeros(dim, dtype=np.int64)
+            self._new_count = 0
+        elif dim != self.dim:
+            raise ValueError(f"Vector dimension {dim} does not match metrics dimension {self.dim}")
+
+    def _insert(self, slot: int, content: str, vector: np.ndarray):
+        self._slots.append(slot)
+        self._signs.append(1)
+        self._vectors.append(np.array(vector))
+        self._inserted.add(content)
+
+    def _remove(self, slot: int, vector: np.ndarray):
+        # 该行随后会被末行覆盖，需复制
+        self._slots.append(slot)
+        self._signs.append(-1)
+        self._vectors.append(np.array(vector))
+
+    def _flush(self):
+        """合并待处理的写入 / 淘汰，只重算本轮有变化的智能体的质心方向"""
+        if not self._vectors:
+            return
+        self._ensure_dim(len(self._vectors[0]))
+        slots = np.asarray(self._slots, dtype=np.int64)
+        signs = np.asarray(self._signs, dtype=np.int64)
+        fixed = _fixed(np.stack(self._vectors))
+        self._slots, self._signs, self._vectors = [], [], []
+        inserts = signs > 0
+        self._new_sum += fixed[inserts].sum(axis=0)
+        self._new_count += int(inserts.sum())
+        fixed *= signs[:, None]
+        order = np.argsort(slots, kind="stable")
+        dirty, starts = np.unique(slots[order], return_index=True)
+        self.agent_sums[dirty] += np.add.reduceat(fixed[order], starts)
+        self.agent_counts[dirty] += np.add.reduceat(signs[order], starts)
+        self.total_sum += fixed.sum(axis=0)
+
+        self.direction_sum -= self.directions[dirty].sum(axis=0)
+        sums = self.agent_sums[dirty].astype(np.float64)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        units = np.where(norms > 0, sums / np.maximum(norms, 1e-300), 0.0)
+        self.directions[dirty] = _fixed(units)
+        self.direction_sum += self.directions[dirty].sum(axis=0)
+
+    def round_partial(self) -> Dict[str, Any]:
+        """本轮部分和（整数数组，可直接求和合并），并开始下一轮的累计"""
+        self._flush()
+        if self.dim is None:
+            partial = {"dim": None, "count": 0, "active": 0, "new_count": 0}
+        else:
+            partial = {
+                "dim": self.dim,
+                "sum": self.total_sum.copy(),
+                "count": int(self.agent_counts.sum()),
+                "direction_sum": self.direction_sum.copy(),
+                "active": int(np.count_nonzero(self.agent_counts)),
+                "start_sum": self._start_sum,
+                "new_sum": self._new_sum,
+                "new_count": self._new_count,
+            }
+            self._start_sum = self.total_sum.copy()
+            self._new_sum = np.zeros(self.dim, dtype=np.int64)
+            self._new_count = 0
+        partial["inserted"] = sorted(self._inserted)
+        self._inserted = set()
+        return partial
+
+
+class CivilizationMetrics:
+    """在主进程合并各分片的部分和；seen 记录历史上出现过的全部洞察文本（用于 innovation）"""
+    def __init__(self, seen: Optional[Iterable[str]] = None):
+        self.seen: Set[str] = set(seen or ())
+
+    def update(self, partials: List[Dict[str, Any]]) -> Dict[str, float]:
+        parts = [p for p in partials if p["dim"] is not None]
+        inserted = set().union(*(p["inserted"] for p in partials)) if partials else set()
+        novel = inserted - self.seen
+        self.seen |= novel
+        metrics = {"diversity": 0.0, "consensus": 0.0, "innovation": len(novel), "novelty": 0.0}
+        if not parts:
+            return metrics
+        total = sum(p["sum"] for p in parts).astype(np.float64) / _SCALE
+        count = sum(p["count"] for p in parts)
+        directions = sum(p["direction_sum"] for p in parts).astype(np.float64) / _SCALE
+        active = sum(p["active"] for p in parts)
+        if count:
+            mean = total / count
+            metrics["diversity"] = float(max(0.0, 1.0 - mean @ mean))
+        if active > 1:
+            metrics["consensus"] = float((directions @ directions - active) / (active * (active - 1)))
+        elif active == 1:
+            metrics["consensus"] = 1.0
+        new_count = sum(p["new_count"] for p in parts)
+        if new_count:
+            start = sum(p["start_sum"] for p in parts).astype(np.float64) / _SCALE
+            new = sum(p["new_sum"] for p in parts).astype(np.float64) / _SCALE
+            norm = np.linalg.norm(start)
+            metrics["novelty"] = float(1.0 - (new @ start) / (norm * new_count)) if norm > 0 else 1.0
+        return metrics
@@ -12,78 +12,550 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import time
 import numpy as np
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass, field
 
+from .ann import IVFIndex, get_ann_index
+from .embedding_backends import default_model_path, load_embedding_backend
+from .embedding_cache import get_embedding_cache
+from .eviction import EvictionPolicy, Evictor
+from .instrumentation import count, span
+
+# 非 None 时优先使用（测试注入桩模型）；否则走进程级模型注册表
 _embedding_model = None
 _llm_pipeline = None
+# 非 None 时缓存未命中的文本交给微批编码服务，并发调用方的请求合并为批量推理
+_encoder_service = None
 
 def _get_embedding_model():
-    global _embedding_model
-    if _embedding_model is None:
-        from sentence_transformers import SentenceTransformer
-        _embedding_model = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')
-    return _embedding_model
+    if _embedding_model is not None:
+        return _embedding_model
+    return load_embedding_backend()
+
+def use_encoder_service(service):
+    """安装（或以 None 卸载）进程级编码服务，返回之前的服务"""
+    global _encoder_service
+    previous, _encoder_service = _encoder_service, service
+    return previous
+
+def _missing_encoder(model_path: Optional[str]):
+    def encode_missing(missing: List[str]):
+        # 编码服务只服务默认模型；指定其他模型时直接走注册表（测试桩仍优先）
+        service = _encoder_service
+        if service is not None and (model_path is None or model_path == default_model_path()):
+            return service.encode(missing)
+        if _embedding_model is not None:
+            return _embedding_model.encode(missing)
+        return load_embedding_backend(model_path).encode(missing)
+    return encode_missing
+
+def _encode(texts, model_path: Optional[str] = None):
+    # 经进程级缓存编码；全部命中时不会触发模型加载
+    return get_embedding_cache(model_path or default_model_path()).encode(
+        texts, _missing_encoder(model_path))
+
+async def _aencode(text: str, model_path: Optional[str] = None) -> np.ndarray:
+    """异步编码并写入缓存：有编码服务时等待其批量结果，否则在默认线程池中同步编码"""
+    service = _encoder_service
+    if service is None or (model_path is not None and model_path != default_model_path()):
+        return await asyncio.get_running_loop().run_in_executor(None, _encode, text, model_path)
+    cache = get_embedding_cache(default_model_path())
+    vector = cache.get(text)
+    if vector is None:
+        vector = await service.aencode(text)
+        cache.put(text, vector)
+    return vector
+
+def _top_k(sims: np.ndarray, top_k: int, threshold: float) -> np.ndarray:
+    # argpartition 取前 top_k，再过滤阈值并按相似度降序
+    if top_k < len(sims):
+        candidates = np.argpartition(-sims, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(len(sims))
+    candidates = candidates[sims[candidates] >= threshold]
+    return candidates[np.argsort(-sims[candidates], kind="stable")]
+
+# 紧凑存储：float16 半精度；int8 为逐行缩放量化（行向量 ≈ int8 行 × scale）
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+_SCORE_BLOCK = 4096
 
 @dataclass
 class Insight:
     content: str
-    vector: np.ndarray
+    vector: Optional[np.ndarray]      # 紧凑存储模式下为 None（不再保留原始向量）
     strength: int = 1
     last_used: float = field(default_factory=time.time)
     source_module: str = "unknown"
+    hits: int = 0
+    members: int = 1                  # 合并进该洞察的近似重复条数（含自身），代表向量为其质心
+    used: int = 0                     # 最近一次写入 / 加强 / 命中时的逻辑时钟（淘汰排序用，不受墙钟精度影响）
 
 class VectorMemory:
-    def __init__(self, max_insights: int = 200):
+    """
+    storage: "float32"（默认）| "float16" | "int8"；紧凑模式直接对压缩矩阵打分，
+    rerank > 0 时另存一份 float32 单位向量（侧存储），取前 top_k × rerank 个候选用它精排
+    （以内存换精度，默认 0 关闭）
+    merge_threshold 非空时在线合并近似重复：新洞察与最近邻的余弦相似度 ≥ 该值即并入后者
+    （strength 累加、代表向量取成员质心，新文本记为别名，再次出现时直接加强）
+    """
+    def __init__(self, max_insights: int = 200,
+                 eviction: Union[str, EvictionPolicy] = "strength",
+                 index: Union[None, str, IVFIndex] = None,
+                 storage: str = "float32", rerank: int = 0,
+                 model_path: Optional[str] = None,
+                 merge_threshold: Optional[float] = None):
+        if storage not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported storage: {storage}")
+        if rerank < 0:
+            raise ValueError(f"rerank must be non-negative, got {rerank}")
+        if merge_threshold is not None and not -1.0 <= merge_threshold <= 1.0:
+            raise ValueError(f"merge_threshold must be in [-1, 1], got {merge_threshold}")
         self.insights: List[Insight] = []
         self.max_insights = max_insights
+        self.storage = storage
+        self.rerank = rerank
+        self.model_path = model_path
+        self.merge_threshold = merge_threshold
+        self._evictor = Evictor(eviction)
+        # 逻辑使用时钟：每次写入 / 加强 / 命中递增，赋给对应洞察的 used
+        self._use_clock = 0
+        # 可选近似最近邻索引（大容量记忆）；None 为精确检索
+        self._ann = get_ann_index(index)
+        # 所有向量预归一化后连续存放于矩阵（dtype 由 storage 决定），第 i 行对应 self.insights[i]
+        self._matrix: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        # 精排侧存储：紧凑模式且 rerank > 0 时为 (capacity, dim) float32 单位向量，否则 None
+        self._exact: Optional[np.ndarray] = None
+        self._valid: Optional[np.ndarray] = None
+        self._index: Dict[str, int] = {}
+        # 被合并文本 → 代表洞察文本；_alias_groups 为反向索引（代表被淘汰时一并清除）
+        self._aliases: Dict[str, str] = {}
+        self._alias_groups: Dict[str, List[str]] = {}
+        # 可选观察者：on_insert / on_remove(content, 单位向量)，用于增量统计（不随 pickle 传递）
+        self.observer = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["observer"] = None
+        return state
+
+    @property
+    def compact(self) -> bool:
+        return self.storage != "float32"
+
+    def _ensure_capacity(self, dim: int):
+        if self._matrix is None:
+            capacity = min(16, self.max_insights + 1)
+        elif len(self.insights) >= self._matrix.shape[0]:
+            capacity = min(2 * self._matrix.shape[0], self.max_insights + 1)
+        else:
+            return
+        n = len(self.insights)
+        matrix = np.zeros((capacity, dim), dtype=STORAGE_DTYPES[self.storage])
+        valid = np.zeros(capacity, dtype=bool)
+        if self._matrix is not None:
+            matrix[:n] = self._matrix[:n]
+            valid[:n] = self._valid[:n]
+        if self.storage == "int8":
+            scales = np.zeros(capacity, dtype=np.float32)
+            if self._scales is not None:
+                scales[:n] = self._scales[:n]
+            self._scales = scales
+        if self.compact and self.rerank > 0:
+            exact = np.zeros((capacity, dim), dtype=np.float32)
+            if self._exact is not None:
+                exact[:n] = self._exact[:n]
+            self._exact = exact
+        self._matrix, self._valid = matrix, valid
+
+    def _store_row(self, row: int, vec: np.ndarray):
+        norm = np.linalg.norm(vec)
+        self._valid[row] = norm >= 1e-8
+        if self._exact is not None:
+            self._exact[row] = vec / norm if self._valid[row] else 0.0
+        if not self._valid[row]:
+            self._matrix[row] = 0
+            if self._scales is not None:
+                self._scales[row] = 0.0
+        elif self.storage == "int8":
+            unit = vec / norm
+            scale = float(np.max(np.abs(unit))) / 127.0
+            self._matrix[row] = np.rint(unit / scale)
+            self._scales[row] = scale
+        else:
+            self._matrix[row] = vec / norm
+
+    def _row_scores(self, rows: Union[slice, np.ndarray], q: np.ndarray) -> np.ndarray:
+        """对压缩矩阵分块反量化打分（控制临时 float32 数组大小）"""
+        if not self.compact:
+            return self._matrix[rows] @ q
+        matrix = self._matrix[rows]
+        sims = np.empty((len(matrix),) + q.shape[1:], dtype=np.float32)
+        for start in range(0, len(matrix), _SCORE_BLOCK):
+            block = matrix[start:start + _SCORE_BLOCK]
+            sims[start:start + len(block)] = block.astype(np.float32) @ q
+        if self._scales is not None:
+            sims *= self._scales[rows].reshape((-1,) + (1,) * (q.ndim - 1))
+        return sims
+
+    def _unit_rows(self, rows: Union[int, slice, np.ndarray]) -> np.ndarray:
+        """行的单位向量（float32）：有侧存储时取原始向量，否则按存储内容反量化"""
+        if not self.compact:
+            return self._matrix[rows]
+        if self._exact is not None:
+            return self._exact[rows]
+        vecs = self._matrix[rows].astype(np.float32)
+        if self._scales is not None:
+            scales = np.asarray(self._scales[rows])
+            vecs *= scales.reshape(scales.shape + (1,))
+        return vecs
+
+    def memory_usage(self) -> int:
+        """向量存储占用字节数（矩阵 + 缩放系数 + 精排侧存储 + 掩码）"""
+        if self._matrix is None:
+            return 0
+        extra = sum(a.nbytes for a in (self._scales, self._exact) if a is not None)
+        return self._matrix.nbytes + extra + self._valid.nbytes
+
+    def _remove_row(self, row: int):
+        # 末行换入被删除位置，保持矩阵紧凑
+        last = len(self.insights) - 1
+        content = self.insights[row].content
+        if self.observer is not None and self._valid[row]:
+            self.observer.on_remove(content, self._unit_rows(row))
+        del self._index[content]
+        for alias in self._alias_groups.pop(content, ()):
+            del self._aliases[alias]
+        if row != last:
+            moved = self.insights[last]
+            self.insights[row] = moved
+            self._matrix[row] = self._matrix[last]
+            self._valid[row] = self._valid[last]
+            if self._scales is not None:
+                self._scales[row] = self._scales[last]
+            if self._exact is not None:
+                self._exact[row] = self._exact[last]
+            self._index[moved.content] = row
+        self.insights.pop()
+        self._valid[last] = False
+        if self._ann is not None:
+            self._ann.remove(row, last)
+
+    def add_insight(self, content: str, source_module: str = "unknown",
+                    vector: Optional[np.ndarray] = None):
+        known = self._resolve(content)
+        if known is not None:
+            self._reinforce(known)
+            return
+        if vector is None:
+            with span("memory.encode"):
+                vector = _encode(content, self.model_path)
+        self._insert(content, source_module, np.asarray(vector))
+
+    def add_insights(self, contents: List[str], source_module: Union[str, List[str]] = "unknown",
+                     vectors: Optional[np.ndarray] = None):
+        """
+        批量写入：未提供 vectors 时，批内尚未入库的不同文本一次性批量编码；
+        按顺序写入，批内重复文本与已有洞察同样只加强（结果与逐条 add_insight 相同）
+        """
+        contents = list(contents)
+        sources = [source_module] * len(contents) if isinstance(source_module, str) else list(source_module)
+        if len(sources) != len(contents):
+            raise ValueError(f"Got {len(sources)} source modules for {len(contents)} insights")
+        if vectors is not None:
+            vectors = np.asarray(vectors)
+            if len(vectors) != len(contents):
+                raise ValueError(f"Got {len(vectors)} vectors for {len(contents)} insights")
+            encoded = None
+        else:
+            pending = [c for c in dict.fromkeys(contents) if self._resolve(c) is None]
+            with span("memory.encode"):
+                encoded = dict(zip(pending, _encode(pending, self.model_path))) if pending else {}
+        for i, (content, source) in enumerate(zip(contents, sources)):
+            known = self._resolve(content)
+            if known is not None:
+                self._reinforce(known)
+                continue
+            vec = vectors[i] if encoded is None else encoded.get(content)
+            if vec is None:
+                # 批前已存在、批内被淘汰后再次出现的文本
+                vec = _encode(content, self.model_path)
+            self._insert(content, source, np.asarray(vec))
+
+    def _resolve(self, content: str) -> Optional[str]:
+        """已入库（或已被合并）的文本 → 对应洞察的文本；未知文本返回 None"""
+        if content in self._index:
+            return content
+        return self._aliases.get(content)
+
+    def _nearest(self, vec: np.ndarray) -> Tuple[int, float]:
+        """
+        与 vec 余弦相似度最高的有效行（ANN 已训练时只在候选中找，探查的簇全空时退回精确查找）；
+        无有效行时返回 (-1, -inf)
+        """
+        n = len(self.insights)
+        norm = np.linalg.norm(vec)
+        if n == 0 or norm < 1e-8:
+            return -1, -np.inf
+        q = (vec / norm).astype(np.float32)
+        rows = self._ann.candidates(q, n) if self._ann is not None else None
+        if rows is None or len(rows) == 0:
+            rows = np.arange(n)
+        sims = self._row_scores(rows, q)
+        sims[~self._valid[rows]] = -np.inf
+        best = int(np.argmax(sims))
+        return int(rows[best]), float(sims[best])
 
-    def add_insight(self, content: str, source_module: str = "unknown"):
-        for ins in self.insights:
-            if ins.content == content:
-                ins.strength += 1
-                ins.last_used = time.time()
+    def _set_representative(self, row: int, centroid: np.ndarray):
+        """以成员质心替换第 row 行的代表向量（同步观察者与 ANN 分配）"""
+        ins = self.insights[row]
+        if self.observer is not None and self._valid[row]:
+            self.observer.on_remove(ins.content, self._unit_rows(row))
+        self._store_row(row, centroid)
+        if not self.compact:
+            ins.vector = self._matrix[row].copy()
+        if self._ann is not None:
+            self._ann.update(row, self._matrix[:len(self.insights)])
+        if self.observer is not None and self._valid[row]:
+            self.observer.on_insert(ins.content, self._unit_rows(row))
+
+    def _add_aliases(self, target: str, aliases: List[str]):
+        group = self._alias_groups.setdefault(target, [])
+        for alias in aliases:
+            self._aliases[alias] = target
+            group.append(alias)
+
+    def _fold(self, row: int, content: str, vec: np.ndarray):
+        count("memory.merged")
+        ins = self.insights[row]
+        unit = vec / np.linalg.norm(vec)
+        self._set_representative(row, self._unit_rows(row).astype(np.float32) * ins.members + unit)
+        ins.members += 1
+        ins.strength += 1
+        ins.last_used = time.time()
+        ins.used = self._tick()
+        self._add_aliases(ins.content, [content])
+        self._evictor.touch(ins.content, ins)
+
+    def consolidate(self, threshold: Optional[float] = None) -> int:
+        """
+        离线合并现有洞察中的近似重复（例如开启 merge_threshold 之前写入的）：
+        按 strength 从高到低，每条吸收相似度 ≥ threshold 的其余洞察；返回被合并掉的条数
+        """
+        threshold = self.merge_threshold if threshold is None else threshold
+        if threshold is None:
+            raise ValueError("consolidate() needs a threshold (or merge_threshold on the memory)")
+        n = len(self.insights)
+        if n < 2:
+            return 0
+        units = self._unit_rows(slice(0, n)).astype(np.float32)
+        valid = self._valid[:n].copy()
+        open_rows = valid.copy()
+        order = sorted(range(n), key=lambda r: -self.insights[r].strength)
+        groups = []
+        for r in order:
+            if not open_rows[r]:
+                continue
+            open_rows[r] = False
+            candidates = np.flatnonzero(open_rows)
+            members = candidates[units[candidates] @ units[r] >= threshold]
+            if len(members):
+                open_rows[members] = False
+                groups.append((self.insights[r], [self.insights[m] for m in members],
+                               units[r] * self.insights[r].members
+                               + sum(units[m] * self.insights[m].members for m in members)))
+        merged = 0
+        for keep, absorbed, centroid in groups:
+            for ins in absorbed:
+                keep.strength += ins.strength
+                keep.hits += ins.hits
+                keep.members += ins.members
+                keep.last_used = max(keep.last_used, ins.last_used)
+                keep.used = max(keep.used, ins.used)
+                aliases = [ins.content] + self._alias_groups.get(ins.content, [])
+                self._evictor.remove(ins.content)
+                self._remove_row(self._index[ins.content])
+                self._add_aliases(keep.content, aliases)
+                merged += 1
+            self._set_representative(self._index[keep.content], centroid)
+            self._evictor.touch(keep.content, keep)
+        count("memory.merged", merged)
+        return merged
+
+    def _tick(self) -> int:
+        self._use_clock += 1
+        return self._use_clock
+
+    def _reinforce(self, content: str):
+        count("memory.reinforced")
+        ins = self.insights[self._index[content]]
+        ins.strength += 1
+        ins.last_used = time.time()
+        ins.used = self._tick()
+        self._evictor.touch(content, ins)
+
+    def _insert(self, content: str, source_module: str, vec: np.ndarray):
+        if self.merge_threshold is not None:
+            row, sim = self._nearest(vec)
+            if sim >= self.merge_threshold:
+                self._fold(row, content, vec)
                 return
-        vec = _get_embedding_model().encode(content)
-        self.insights.append(Insight(content=content, vector=vec, source_module=source_module))
+        count("memory.inserted")
+        self._ensure_capacity(vec.shape[-1])
+        row = len(self.insights)
+        self._store_row(row, vec)
+        ins = Insight(content=content, vector=None if self.compact else vec,
+                      source_module=source_module, used=self._tick())
+        self.insights.append(ins)
+        self._index[content] = row
+        self._evictor.add(content, ins)
+        if self._ann is not None:
+            self._ann.add(row, self._matrix[:row + 1])
+        if self.observer is not None and self._valid[row]:
+            self.observer.on_insert(content, self._unit_rows(row))
         if len(self.insights) > self.max_insights:
-            self.insights.sort(key=lambda x: (x.strength, x.last_used))
-            self.insights.pop(0)
+            with span("memory.evict"):
+                victim = self._evictor.victim()
+                self._evictor.remove(victim)
+                self._remove_row(self._index[victim])
+
+    def query(self, text: Union[str, np.ndarray], top_k: int = 2,
+              threshold: float = 0.5, touch: Optional[bool] = None) -> List[Insight]:
+        """
+        text 可为文本，也可为已编码的查询向量（跳过编码）
+        touch：命中是否更新 hits / last_used / used；默认仅 LRU / LFU 等按使用情况淘汰的策略更新
+        """
+        if isinstance(text, str):
+            with span("memory.encode"):
+                q_vec = _encode(text, self.model_path)
+        else:
+            q_vec = np.asarray(text)
+        with span("memory.score"):
+            return self._score(q_vec, top_k, threshold, touch)
+
+    def query_many(self, texts: Union[List[str], np.ndarray], top_k: int = 2,
+                   threshold: float = 0.5, touch: Optional[bool] = None) -> List[List[Insight]]:
+        """
+        批量查询：文本列表一次性批量编码（或直接传入 (m, dim) 查询矩阵），
+        精确检索路径下一次矩阵乘完成全部打分；结果与逐条 query 相同
+        """
+        if isinstance(texts, np.ndarray):
+            q_vecs = texts.reshape(len(texts), -1)
+        else:
+            texts = list(texts)
+            if not texts:
+                return []
+            with span("memory.encode"):
+                q_vecs = np.asarray(_encode(texts, self.model_path)).reshape(len(texts), -1)
+        with span("memory.score"):
+            if (self._ann is not None and self._ann.trained) or self._exact is not None:
+                return [self._score(q_vec, top_k, threshold, touch) for q_vec in q_vecs]
+            return self._score_many(q_vecs, top_k, threshold, touch)
+
+    def _score_many(self, q_vecs: np.ndarray, top_k: int, threshold: float,
+                    touch: Optional[bool] = None) -> List[List[Insight]]:
+        results: List[List[Insight]] = [[] for _ in range(len(q_vecs))]
+        n = len(self.insights)
+        if n == 0 or top_k <= 0:
+            return results
+        norms = np.linalg.norm(q_vecs, axis=1)
+        usable = norms >= 1e-8
+        q = (q_vecs / np.maximum(norms, 1e-12)[:, None]).astype(np.float32)
+        sims = self._row_scores(slice(0, n), q.T).T
+        sims[:, ~self._valid[:n]] = -np.inf
+        k = min(top_k, n)
+        if k < n:
+            candidates = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(n), sims.shape)
+        scores = np.take_along_axis(sims, candidates, axis=1)
+        order = np.argsort(-scores, axis=1, kind="stable")
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        passed = np.take_along_axis(scores, order, axis=1) >= threshold
+        for i in np.flatnonzero(usable & passed.any(axis=1)):
+            results[i] = self._mark_used([self.insights[r] for r in candidates[i][passed[i]]], touch)
+        return results
 
-    def query(self, text: str, top_k: int = 2, threshold: float = 0.5) -> List[Insight]:
-        q_vec = _get_embedding_model().encode(text)
+    def _score(self, q_vec: np.ndarray, top_k: int, threshold: float,
+               touch: Optional[bool] = None) -> List[Insight]:
         q_norm = np.linalg.norm(q_vec)
-        if q_norm < 1e-8:
+        if q_norm < 1e-8 or not self.insights or top_k <= 0:
             return []
-        
-        scored = []
-        for ins in self.insights:
-            ins_norm = np.linalg.norm(ins.vector)
-            if ins_norm < 1e-8:
-                continue
-            sim = float(np.dot(q_vec, ins.vector) / (q_norm * ins_norm))
-            if sim >= threshold:
-                scored.append((sim, ins))
-        scored.sort(reverse=True, key=lambda x: x[0])
-        return [ins for _, ins in scored[:top_k]]
-    
+
+        n = len(self.insights)
+        q = (q_vec / q_norm).astype(np.float32)
+        rows = self._ann.candidates(q, n) if self._ann is not None else None
+        if rows is None:
+            rows = np.arange(n)
+            sims = self._row_scores(slice(0, n), q)
+        else:
+            sims = self._row_scores(rows, q)
+        sims[~self._valid[rows]] = -np.inf
+        if self._exact is not None:
+            return self._mark_used(self._rerank(rows, sims, q, top_k, threshold), touch)
+        return self._mark_used([self.insights[rows[i]] for i in _top_k(sims, top_k, threshold)], touch)
+
+    def _rerank(self, rows: np.ndarray, sims: np.ndarray, q: np.ndarray,
+                top_k: int, threshold: float) -> List[Insight]:
+        """压缩分数取前 top_k × rerank 个候选，再用侧存储中的原始单位向量精确打分"""
+        order = _top_k(sims, top_k * self.rerank, -np.inf)
+        candidates = rows[order[np.isfinite(sims[order])]]
+        if len(candidates) == 0:
+            return []
+        exact_sims = self._exact[candidates] @ q
+        return [self.insights[candidates[i]] for i in _top_k(exact_sims, top_k, threshold)]
+
+    def _mark_used(self, matches: List[Insight], touch: Optional[bool] = None) -> List[Insight]:
+        if not (self._evictor.policy.tracks_use if touch is None else touch):
+            return matches
+        now = time.time()
+        for ins in matches:
+            ins.hits += 1
+            ins.last_used = now
+            ins.used = self._tick()
+            self._evictor.touch(ins.content, ins)
+        return matches
+
     def __len__(self):
         return len(self.insights)
 
 class CivilisAgent:
-    def __init__(self, agent_id: str):
+    def __init__(self, agent_id: str, memory: Optional[VectorMemory] = None):
         self.id = agent_id
-        self.memory = VectorMemory()
+        self.memory = memory if memory is not None else VectorMemory()
         self.insight_threshold = 4
 
     def learn(self, statement: str, source_module: str = "Xun"):
-        self.memory.add_insight(statement, source_module)
-        matches = self.memory.query(statement, top_k=1, threshold=0.95)
+        # 只编码一次：写入与随后的自查询共用同一向量
+        vector = _encode(statement, self.memory.model_path)
+        self.memory.add_insight(statement, source_module, vector=vector)
+        matches = self.memory.query(vector, top_k=1, threshold=0.95)
         if matches and matches[0].strength >= self.insight_threshold:
             pass  # Silent insight (avoid console spam in batch runs)
 
+    def learn_many(self, statements: List[str], source_module: str = "Xun"):
+        """批量学习：所有不同语句一次批量编码，批量写入后再批量自查询"""
+        statements = list(statements)
+        if not statements:
+            return
+        vectors = np.asarray(_encode(statements, self.memory.model_path)).reshape(len(statements), -1)
+        self.memory.add_insights(statements, source_module, vectors=vectors)
+        for matches in self.memory.query_many(vectors, top_k=1, threshold=0.95):
+            if matches and matches[0].strength >= self.insight_threshold:
+                pass  # Silent insight (avoid console spam in batch runs)
+
+    async def alearn(self, statement: str, source_module: str = "Xun"):
+        """asyncio 版本：先在事件循环外完成编码（写入缓存），再同步更新记忆"""
+        await _aencode(statement, self.memory.model_path)
+        self.learn(statement, source_module)
+
     def interact(self, message: str) -> str:
         self.learn(message)
+        return f"[{self.id}] Acknowledged."
+
+    async def ainteract(self, message: str) -> str:
+        await self.alearn(message)
         return f"[{self.id}] Acknowledged."
\ No newline at end of file
@@ -13,10 +13,19 @@
 # limitations under the License.
 """
 嵌入模型后端抽象层
-支持：Sentence-Transformers | 未来扩展 Ollama/LocalAI 等
+支持：Sentence-Transformers | 哈希 n-gram（纯 NumPy，离线/CI 使用）| 未来扩展 Ollama/LocalAI 等
 """
 import os
-from typing import Any, Optional
+import socket
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .instrumentation import count, span
+
+DEFAULT_MODEL_PATH = "sentence-transformers/all-MiniLM-L6-v2"
+HASHING_MODEL_PREFIX = "hashing"
 
 class EmbeddingBackend:
     """嵌入模型后端基类"""
@@ -28,37 +37,210 @@ class EmbeddingBackend:
 
 class SentenceTransformerBackend(EmbeddingBackend):
     """Sentence-Transformers 后端实现（当前默认）"""
-    def __init__(self, model_path: str, cache_folder: Optional[str] = None):
-        # 中国大陆网络优化（自动启用HF镜像）
-        if "sentence-transformers/" in model_path and os.getenv("HF_ENDPOINT") is None:
-            try:
-                import socket
-                socket.setdefaulttimeout(2.0)
-                socket.create_connection(("hf-mirror.com", 443), timeout=2)
-                os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
-                print("🌐 检测到中国大陆网络环境，已自动启用HuggingFace镜像源 (hf-mirror.com)")
-            except:
-                pass
-        
+    def __init__(self, model_path: str, cache_folder: Optional[str] = None,
+                 device: Optional[str] = None):
         from sentence_transformers import SentenceTransformer
         self.model = SentenceTransformer(
             model_path,
             trust_remote_code=True,
-            cache_folder=cache_folder
+            cache_folder=cache_folder,
+            device=device
         )
     
-    def encode(self, texts: list[str]) -> Any:
-        return self.model.encode(texts, convert_to_tensor=True)
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32,
+               convert_to_tensor: bool = False) -> Any:
+        count("embedding.encode_calls")
+        count("embedding.sentences", 1 if isinstance(texts, str) else len(texts))
+        with span("embedding.encode"):
+            return self.model.encode(texts, batch_size=batch_size, convert_to_tensor=convert_to_tensor)
     
     def get_dimension(self) -> int:
         return self.model.get_sentence_embedding_dimension()
 
+_U64 = np.uint64
+_MIX1 = _U64(0xBF58476D1CE4E5B9)
+_MIX2 = _U64(0x94D049BB133111EB)
+_GOLDEN = _U64(0x9E3779B97F4A7C15)
+
+
+def _splitmix64(z: np.ndarray) -> np.ndarray:
+    z = (z ^ (z >> _U64(30))) * _MIX1
+    z = (z ^ (z >> _U64(27))) * _MIX2
+    return z ^ (z >> _U64(31))
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    哈希 n-gram 后端：字符 n-gram 经带符号特征哈希投影到固定维度（稀疏随机投影）
+    纯 NumPy 向量化实现，无需 torch/网络，毫秒级启动，结果跨进程确定
+    """
+    def __init__(self, dim: int = 384, ngram_range: Tuple[int, int] = (3, 5), seed: int = 0):
+        if dim <= 0:
+            raise ValueError(f"Embedding dimension must be positive, got {dim}")
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.seed = seed
+
+    def encode(self, texts: Union[str, List[str]], batch_size: Optional[int] = None) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        count("embedding.encode_calls")
+        count("embedding.sentences", len(texts))
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        step = batch_size or len(texts)
+        with span("embedding.encode"):
+            out = np.concatenate([self._encode_batch(texts[i:i + step])
+                                  for i in range(0, len(texts), step)])
+        return out[0] if single else out
+
+    def get_dimension(self) -> int:
+        return self.dim
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        # 整批文本拼成一个字节数组，所有 n-gram 哈希一次性向量化计算
+        encoded = [f" {t.lower()} ".encode("utf-8") for t in texts]
+        lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(_U64)
+        owner = np.repeat(np.arange(len(texts)), lengths)
+        ends = np.cumsum(lengths)
+        counts = np.zeros(len(texts) * self.dim, dtype=np.float64)
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            windows = len(data) - n + 1
+            if windows <= 0:
+                continue
+            h = np.full(windows, _U64(self.seed * 1000003 + n), dtype=_U64)
+            for j in range(n):
+                h = (h * _GOLDEN) ^ data[j:j + windows]
+            start_owner = owner[:windows]
+            valid = np.arange(windows) + n <= ends[start_owner]
+            h = _splitmix64(h[valid])
+            bucket = (h % _U64(self.dim)).astype(np.int64)
+            sign = np.where((h >> _U64(63)) == 0, 1.0, -1.0)
+            counts += np.bincount(start_owner[valid] * self.dim + bucket,
+                                  weights=sign, minlength=counts.size)
+        vectors = counts.reshape(len(texts), self.dim).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def is_hashing_model(model_path: str) -> bool:
+    """\"hashing\" 或 \"hashing:<维度>\" 表示使用哈希后端"""
+    return model_path == HASHING_MODEL_PREFIX or model_path.startswith(HASHING_MODEL_PREFIX + ":")
+
+
+def _hashing_dim(model_path: str) -> int:
+    """解析 "hashing:<维度>" 中的维度（缺省 384）"""
+    if not is_hashing_model(model_path) or model_path == HASHING_MODEL_PREFIX:
+        return 384
+    dim = model_path[len(HASHING_MODEL_PREFIX) + 1:]
+    if not dim.isdigit() or int(dim) <= 0:
+        raise ValueError(f"Invalid hashing model path {model_path!r}: dimension must be a positive integer")
+    return int(dim)
+
+
+def default_model_path() -> str:
+    """读取 CIVILIS_EMBEDDING_MODEL；CIVILIS_OFFLINE=1 且未指定模型时使用哈希后端"""
+    model_path = os.getenv("CIVILIS_EMBEDDING_MODEL")
+    if model_path:
+        return model_path
+    if os.getenv("CIVILIS_OFFLINE") == "1":
+        return HASHING_MODEL_PREFIX
+    return DEFAULT_MODEL_PATH
+
+
 def get_embedding_backend(
-    model_path: str = "sentence-transformers/all-MiniLM-L6-v2",
+    model_path: str = DEFAULT_MODEL_PATH,
     backend_type: str = "sentence-transformers",
     cache_folder: Optional[str] = None
 ) -> EmbeddingBackend:
     """工厂函数：根据配置返回嵌入后端实例"""
+    if backend_type == "hashing" or is_hashing_model(model_path):
+        return HashingEmbeddingBackend(dim=_hashing_dim(model_path))
     if backend_type == "sentence-transformers":
         return SentenceTransformerBackend(model_path, cache_folder)
     raise ValueError(f"Unsupported backend type: {backend_type}")
+
+
+# =============== 进程级模型注册表 ===============
+_backends: Dict[Tuple[str, Optional[str], Optional[str]], EmbeddingBackend] = {}
+_backends_lock = threading.Lock()
+_registered: Dict[str, EmbeddingBackend] = {}
+_mirror_probe_result: Optional[bool] = None
+
+
+def _maybe_enable_hf_mirror(model_path: str):
+    """
+    中国大陆网络优化：仅在 CIVILIS_HF_MIRROR_PROBE=1 时探测 hf-mirror.com
+    结果进程内缓存，且不修改全局 socket 超时
+    """
+    global _mirror_probe_result
+    if os.getenv("CIVILIS_HF_MIRROR_PROBE") != "1":
+        return
+    if "sentence-transformers/" not in model_path or os.getenv("HF_ENDPOINT") is not None:
+        return
+    if _mirror_probe_result is None:
+        try:
+            socket.create_connection(("hf-mirror.com", 443), timeout=2).close()
+            _mirror_probe_result = True
+        except OSError:
+            _mirror_probe_result = False
+    if _mirror_probe_result:
+        os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
+        print("🌐 检测到中国大陆网络环境，已自动启用HuggingFace镜像源 (hf-mirror.com)")
+
+
+def _load_backend(model_path: str, device: Optional[str],
+                  cache_folder: Optional[str]) -> EmbeddingBackend:
+    if is_hashing_model(model_path):
+        backend = get_embedding_backend(model_path)
+        print(f"✅ 使用哈希嵌入后端 | 维度: {backend.get_dimension()}")
+        return backend
+    _maybe_enable_hf_mirror(model_path)
+    print(f"📥 正在加载嵌入模型: {model_path}")
+    backend = SentenceTransformerBackend(model_path, cache_folder, device)
+    print(f"✅ 模型加载成功 | 维度: {backend.get_dimension()} | 来源: {model_path}")
+    return backend
+
+
+def load_embedding_backend(
+    model_path: Optional[str] = None,
+    device: Optional[str] = None,
+    cache_folder: Optional[str] = None
+) -> EmbeddingBackend:
+    """
+    进程级注册表：同一 (模型路径, 设备, 缓存目录) 只加载一次，之后直接复用
+    model_path 缺省取 default_model_path()，device 缺省取 CIVILIS_DEVICE（未设置则由后端自动选择），
+    cache_folder 缺省取 CIVILIS_MODEL_CACHE
+    """
+    model_path = model_path or default_model_path()
+    if model_path in _registered:
+        return _registered[model_path]
+    device = device or os.getenv("CIVILIS_DEVICE")
+    cache_folder = cache_folder or os.getenv("CIVILIS_MODEL_CACHE")
+    if is_hashing_model(model_path):
+        device = cache_folder = None
+    key = (model_path, device, cache_folder)
+    backend = _backends.get(key)
+    if backend is not None:
+        return backend
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            with span("embedding.load"):
+                backend = _load_backend(model_path, device, cache_folder)
+            _backends[key] = backend
+        return backend
+
+
+def register_embedding_backend(model_path: str, backend: EmbeddingBackend):
+    """以名称注册现成后端（如基准测试的桩编码器）；load_embedding_backend(model_path) 直接返回它"""
+    with _backends_lock:
+        _registered[model_path] = backend
+
+
+def clear_embedding_backends():
+    """清空注册表（测试或释放显存时使用）"""
+    with _backends_lock:
+        _backends.clear()
+        _registered.clear()
@@ -0,0 +1,309 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+进程级嵌入缓存
+内存 LRU（按文本哈希索引）+ 可选磁盘内存映射存储，跨智能体、跨运行复用向量
+环境变量：CIVILIS_EMBEDDING_CACHE_DIR（启用磁盘存储）| CIVILIS_EMBEDDING_CACHE_SIZE（内存条目上限）
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from .instrumentation import count
+
+try:
+    import fcntl
+except ImportError:  # Windows：单进程使用
+    fcntl = None
+
+EncodeFn = Callable[[List[str]], np.ndarray]
+
+
+def text_key(text: str) -> str:
+    """文本 → 缓存键（blake2b 128 位十六进制）"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class DiskEmbeddingStore:
+    """
+    追加写的磁盘向量存储：vectors.f32 按行存放，keys.txt 第 i 行为第 i 行向量的键
+    写入在文件锁内完成，多个进程可共享同一目录，并能读到彼此新写入的向量
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._keys_path = os.path.join(path, "keys.txt")
+        self._meta_path = os.path.join(path, "meta.json")
+        self._lock_path = os.path.join(path, "lock")
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._keys_offset = 0
+        self._mmap: Optional[np.memmap] = None
+        with self._locked():
+            self._repair()
+            self._refresh()
+
+    @contextmanager
+    def _locked(self):
+        with open(self._lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_dim(self):
+        if self.dim is None and os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                self.dim = int(json.load(f)["dim"])
+
+    def _repair(self):
+        # 截断中断写入留下的半条记录，保证键与向量行一一对应
+        self._read_dim()
+        if self.dim is None:
+            return
+        keys = []
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, encoding="utf-8") as f:
+                keys = [line.strip() for line in f if line.strip()]
+        row_bytes = 4 * self.dim
+        stored = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        count = min(len(keys), stored)
+        if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) != count * row_bytes:
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(count * row_bytes)
+        if len(keys) != count:
+            with open(self._keys_path, "w", encoding="utf-8") as f:
+                f.writelines(k + "\n" for k in keys[:count])
+
+    def _refresh(self):
+        """读入其他进程在上次同步后追加的键"""
+        self._read_dim()
+        if not os.path.exists(self._keys_path) or os.path.getsize(self._keys_path) == self._keys_offset:
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            chunk = f.read()
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        for line in complete.decode("utf-8").splitlines():
+            if line:
+                self._rows.setdefault(line, len(self._rows))
+        self._keys_offset += len(complete)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        if row is None:
+            self._refresh()
+            row = self._rows.get(key)
+            if row is None:
+                return None
+        if self._mmap is None or row >= self._mmap.shape[0]:
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                   shape=(len(self._rows), self.dim))
+        return np.array(self._mmap[row])
+
+    def append(self, key: str, vector: np.ndarray):
+        self.append_many([key], np.asarray(vector).reshape(1, -1))
+
+    def append_many(self, keys: List[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(keys), -1)
+        with self._locked():
+            self._refresh()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim}, f)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match store dimension {self.dim}")
+            new, seen = [], set()
+            for i, key in enumerate(keys):
+                if key not in self._rows and key not in seen:
+                    seen.add(key)
+                    new.append(i)
+            if not new:
+                return
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors[new].tobytes())
+            lines = "".join(keys[i] + "\n" for i in new).encode("utf-8")
+            with open(self._keys_path, "ab") as f:
+                f.write(lines)
+            for i in new:
+                self._rows[keys[i]] = len(self._rows)
+            self._keys_offset += len(lines)
+
+    def flush(self):
+        """写入即落盘，保留接口以兼容调用方"""
+
+    def close(self):
+        self._mmap = None
+
+
+class EmbeddingCache:
+    """线程安全的嵌入 LRU 缓存，可选落盘（写穿透）"""
+    def __init__(self, max_entries: int = 50000, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._store = DiskEmbeddingStore(cache_dir) if cache_dir else None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+            return vector
+        if self._store is not None:
+            vector = self._store.get(key)
+            if vector is not None:
+                vector.flags.writeable = False
+                self.disk_hits += 1
+                self._remember(key, vector)
+        return vector
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._lookup(text_key(text))
+            if vector is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return vector
+
+    def put(self, text: str, vector: np.ndarray):
+        vector = np.array(vector, dtype=np.float32).reshape(-1)
+        vector.flags.writeable = False
+        key = text_key(text)
+        with self._lock:
+            self._remember(key, vector)
+            if self._store is not None:
+                self._store.append(key, vector)
+
+    def encode(self, texts: Union[str, List[str]], encode_fn: EncodeFn) -> np.ndarray:
+        """批量取向量；未命中的文本去重后一次性交给 encode_fn"""
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        keys = [text_key(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    # 同一批内的重复文本也算命中
+                    self.hits += 1
+                    continue
+                vector = self._lookup(key)
+                if vector is None:
+                    self.misses += 1
+                    missing[key] = text
+                else:
+                    self.hits += 1
+                    found[key] = vector
+        count("embedding_cache.hits", len(keys) - len(missing))
+        count("embedding_cache.misses", len(missing))
+        if missing:
+            encoded = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            encoded = encoded.reshape(len(missing), -1)
+            with self._lock:
+                for key, vector in zip(missing, encoded):
+                    vector = vector.copy()
+                    vector.flags.writeable = False
+                    found[key] = vector
+                    self._remember(key, vector)
+                if self._store is not None:
+                    self._store.append_many(list(missing), encoded)
+        out = np.stack([found[k] for k in keys])
+        return out[0] if single else out
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "disk_entries": len(self._store) if self._store is not None else 0,
+            }
+
+    def flush(self):
+        with self._lock:
+            if self._store is not None:
+                self._store.flush()
+
+    def clear(self):
+        """清空内存条目与计数（磁盘存储保留）"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.disk_hits = 0
+
+    def close(self):
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _namespace_dir(cache_dir: str, namespace: str) -> str:
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in namespace)
+    return os.path.join(cache_dir, safe)
+
+
+def get_embedding_cache(namespace: str = "default") -> EmbeddingCache:
+    """获取进程级共享缓存；不同模型使用不同 namespace，避免向量混用"""
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache_dir = os.getenv("CIVILIS_EMBEDDING_CACHE_DIR")
+            cache = EmbeddingCache(
+                max_entries=int(os.getenv("CIVILIS_EMBEDDING_CACHE_SIZE", "50000")),
+                cache_dir=_namespace_dir(cache_dir, namespace) if cache_dir else None,
+            )
+            _caches[namespace] = cache
+        return cache
+
+
+def reset_embedding_caches():
+    """关闭并丢弃所有进程级缓存（测试或切换配置时使用）"""
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.close()
+        _caches.clear()
@@ -0,0 +1,159 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+微批编码服务
+多个线程 / asyncio 任务的零散编码请求进入同一队列，由后台线程在 max_wait_ms 时间窗内
+（或凑满 max_batch_size 条文本时）合并为一次模型调用，再通过 Future 把各自的向量交还调用方
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .instrumentation import count, span
+
+EncodeFn = Callable[[List[str]], np.ndarray]
+
+_STOP = object()
+
+
+def _default_encode_fn(texts: List[str]) -> np.ndarray:
+    from .core import _get_embedding_model
+    return np.asarray(_get_embedding_model().encode(texts))
+
+
+class EncoderService:
+    """
+    submit(text) / submit_many(texts) 立即返回 concurrent.futures.Future；
+    encode(texts) 为阻塞版本，aencode(texts) 为 asyncio 版本
+    单个请求的等待上限约为 max_wait_ms + 一次批量推理时间
+    """
+    def __init__(self, encode_fn: Optional[EncodeFn] = None, max_batch_size: int = 64,
+                 max_wait_ms: float = 2.0):
+        if max_batch_size <= 0:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}")
+        self.encode_fn = encode_fn or _default_encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+
+    def submit_many(self, texts: List[str]) -> Future:
+        """Future 结果为 (len(texts), dim) 数组"""
+        return self._submit(list(texts), single=False)
+
+    def submit(self, text: str) -> Future:
+        """Future 结果为 (dim,) 向量"""
+        return self._submit([text], single=True)
+
+    def _submit(self, texts: List[str], single: bool) -> Future:
+        future: Future = Future()
+        # 入队与 close() 互斥，保证停止标记之后不会再有请求
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("EncoderService is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="civilis-encoder", daemon=True)
+                self._thread.start()
+            self._queue.put((texts, single, future))
+        return future
+
+    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        if isinstance(texts, str):
+            return self.submit(texts).result()
+        return self.submit_many(texts).result()
+
+    async def aencode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        future = self.submit(texts) if isinstance(texts, str) else self.submit_many(texts)
+        return await asyncio.wrap_future(future)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            size = len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._process(batch)
+
+    def _process(self, batch: List[Tuple[List[str], bool, Future]]):
+        batch = [req for req in batch if req[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        # 批内去重：相同文本只编码一次
+        unique: Dict[str, int] = {}
+        for texts, _, _ in batch:
+            for text in texts:
+                unique.setdefault(text, len(unique))
+        self.requests += len(batch)
+        self.texts += len(unique)
+        self.batches += 1
+        count("encoder_service.batches")
+        count("encoder_service.requests", len(batch))
+        try:
+            with span("encoder_service.encode"):
+                vectors = np.asarray(self.encode_fn(list(unique)), dtype=np.float32)
+            vectors = vectors.reshape(len(unique), -1)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        for texts, single, future in batch:
+            rows = vectors[[unique[t] for t in texts]]
+            future.set_result(rows[0] if single else rows)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "texts": self.texts,
+            "batches": self.batches,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+        }
+
+    def close(self):
+        """处理完已入队的请求后停止后台线程；之后的提交会抛出 RuntimeError"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,151 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+集成 / 参数扫描运行器
+多组 (seed, num_agents, rounds) 配置并行调度；每个工作进程只加载一次模型、共用一份嵌入缓存
+命令行：python -m civilis.ensemble --seeds 1 2 3 --agents 10 100 --rounds 100 --workers 8
+"""
+import argparse
+import csv
+import functools
+import itertools
+import multiprocessing as mp
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .embedding_backends import default_model_path, load_embedding_backend
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    seed: int
+    num_agents: int = 10
+    rounds: int = 100
+    batch_size: int = 64
+
+
+def expand_grid(seeds: Iterable[int], num_agents: Iterable[int], rounds: Iterable[int],
+                batch_size: int = 64) -> List[RunConfig]:
+    """笛卡尔积展开扫描配置"""
+    return [RunConfig(seed, agents, r, batch_size)
+            for agents, r, seed in itertools.product(num_agents, rounds, seeds)]
+
+
+def run_config(config: RunConfig, model_path: Optional[str] = None) -> Dict[str, Any]:
+    """运行单个配置，返回一行汇总（不保留历史）"""
+    from .simulation import CivilisSimulation
+    start = time.perf_counter()
+    sim = CivilisSimulation(num_agents=config.num_agents, rounds=config.rounds,
+                            seed=config.seed, batch_size=config.batch_size,
+                            model_path=model_path)
+    result = sim.run(keep_history=False)
+    return {
+        **asdict(config),
+        "total_insights": result["total_insights"],
+        "rounds_completed": result["rounds_completed"],
+        "knowledge_size": sum(len(agent.knowledge) for agent in sim.agents),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _init_worker(model_path: str):
+    # 每个工作进程预先加载一次模型；fork 方式下直接继承父进程已加载的模型
+    load_embedding_backend(model_path)
+
+
+class EnsembleRunner:
+    """在进程池上调度多组配置；workers=1 时在当前进程串行执行"""
+    def __init__(self, configs: Sequence[RunConfig], workers: int = 1,
+                 model_path: Optional[str] = None, start_method: Optional[str] = None):
+        self.configs = list(configs)
+        self.workers = max(1, workers)
+        self.model_path = model_path or default_model_path()
+        self.start_method = start_method
+
+    def run(self) -> List[Dict[str, Any]]:
+        load_embedding_backend(self.model_path)
+        if self.workers == 1 or len(self.configs) <= 1:
+            return [run_config(config, self.model_path) for config in self.configs]
+        ctx = mp.get_context(self.start_method)
+        task = functools.partial(run_config, model_path=self.model_path)
+        with ctx.Pool(self.workers, initializer=_init_worker, initargs=(self.model_path,)) as pool:
+            return pool.map(task, self.configs, chunksize=1)
+
+
+def summarize(rows: List[Dict[str, Any]],
+              by: Sequence[str] = ("num_agents", "rounds")) -> List[Dict[str, Any]]:
+    """按配置分组（跨 seed）聚合均值与标准差"""
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(row[k] for k in by), []).append(row)
+    summary = []
+    for key, members in sorted(groups.items()):
+        entry = dict(zip(by, key))
+        entry["runs"] = len(members)
+        for metric in ("total_insights", "knowledge_size", "seconds"):
+            values = np.array([m[metric] for m in members], dtype=np.float64)
+            entry[f"{metric}_mean"] = float(values.mean())
+            entry[f"{metric}_std"] = float(values.std())
+        summary.append(entry)
+    return summary
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    """渲染为等宽文本表格"""
+    if not rows:
+        return ""
+    columns = list(rows[0])
+    cells = [[f"{row[c]:.3f}" if isinstance(row[c], float) else str(row[c]) for c in columns]
+             for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.rjust(w) for c, w in zip(columns, widths)),
+             "  ".join("-" * w for w in widths)]
+    lines += ["  ".join(v.rjust(w) for v, w in zip(r, widths)) for r in cells]
+    return "\n".join(lines)
+
+
+def write_csv(rows: List[Dict[str, Any]], path: str):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Civilis 参数扫描 / 集成运行")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--agents", type=int, nargs="+", default=[10])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[100])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--model", default=None, help="嵌入模型（默认读取 CIVILIS_EMBEDDING_MODEL）")
+    parser.add_argument("--start-method", default=None, choices=["fork", "spawn", "forkserver"])
+    parser.add_argument("--csv", default=None, help="逐次运行结果写入 CSV")
+    args = parser.parse_args(argv)
+
+    configs = expand_grid(args.seeds, args.agents, args.rounds, args.batch_size)
+    print(f"🧪 参数扫描: {len(configs)} 组配置, {args.workers} 个工作进程")
+    rows = EnsembleRunner(configs, workers=args.workers, model_path=args.model,
+                          start_method=args.start_method).run()
+    if args.csv:
+        write_csv(rows, args.csv)
+        print(f"📊 逐次结果已写入: {args.csv}")
+    print(format_table(summarize(rows)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+向量记忆淘汰策略
+带位置索引的最小堆 + 可插拔策略：LRU | LFU | 强度优先（默认，兼容旧行为）
+"""
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
+
+
+class IndexedHeap:
+    """带位置索引的二叉最小堆：插入、删除、原地改键均为 O(log n)"""
+    def __init__(self):
+        self._heap: List[Hashable] = []
+        self._keys: Dict[Hashable, Tuple] = {}
+        self._pos: Dict[Hashable, int] = {}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, handle: Hashable) -> bool:
+        return handle in self._pos
+
+    def push(self, handle: Hashable, key: Tuple):
+        if handle in self._pos:
+            self.update(handle, key)
+            return
+        self._heap.append(handle)
+        self._keys[handle] = key
+        self._pos[handle] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def update(self, handle: Hashable, key: Tuple):
+        old = self._keys[handle]
+        self._keys[handle] = key
+        i = self._pos[handle]
+        if key < old:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+
+    def remove(self, handle: Hashable):
+        i = self._pos.pop(handle)
+        del self._keys[handle]
+        last = self._heap.pop()
+        if i < len(self._heap):
+            self._heap[i] = last
+            self._pos[last] = i
+            self._sift_up(i)
+            self._sift_down(self._pos[last])
+
+    def peek(self) -> Optional[Hashable]:
+        return self._heap[0] if self._heap else None
+
+    def pop(self) -> Optional[Hashable]:
+        handle = self.peek()
+        if handle is not None:
+            self.remove(handle)
+        return handle
+
+    def clear(self):
+        self._heap.clear()
+        self._keys.clear()
+        self._pos.clear()
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._pos[heap[i]] = i
+        self._pos[heap[j]] = j
+
+    def _sift_up(self, i: int):
+        heap, keys = self._heap, self._keys
+        while i > 0:
+            parent = (i - 1) >> 1
+            if keys[heap[i]] < keys[heap[parent]]:
+                self._swap(i, parent)
+                i = parent
+            else:
+                break
+
+    def _sift_down(self, i: int):
+        heap, keys = self._heap, self._keys
+        n = len(heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and keys[heap[child]] < keys[heap[smallest]]:
+                    smallest = child
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
+
+
+# =============== 策略：key 越小越先被淘汰 ===============
+class EvictionPolicy:
+    """
+    淘汰策略基类；seq 为插入序号，保证同键时结果确定
+    insight.used 为逻辑使用时钟（单调递增，同一墙钟刻度内的多次使用仍有先后）
+    tracks_use 为 True 时查询命中会更新 hits / used（只读查询不改变其余策略的淘汰顺序）
+    """
+    name = "base"
+    tracks_use = False
+
+    def key(self, insight: Any, seq: int) -> Tuple:
+        raise NotImplementedError
+
+
+class LRUPolicy(EvictionPolicy):
+    """最近最少使用（按逻辑使用时钟）"""
+    name = "lru"
+    tracks_use = True
+
+    def key(self, insight, seq):
+        return (insight.used, seq)
+
+
+class LFUPolicy(EvictionPolicy):
+    """最不常用：写入次数（strength）+ 命中次数（hits）"""
+    name = "lfu"
+    tracks_use = True
+
+    def key(self, insight, seq):
+        return (insight.strength + insight.hits, insight.used, seq)
+
+
+class StrengthRecencyPolicy(EvictionPolicy):
+    """先比强度，再比最近使用（VectorMemory 默认策略）"""
+    name = "strength"
+
+    def key(self, insight, seq):
+        return (insight.strength, insight.used, seq)
+
+
+EVICTION_POLICIES = {
+    LRUPolicy.name: LRUPolicy,
+    LFUPolicy.name: LFUPolicy,
+    StrengthRecencyPolicy.name: StrengthRecencyPolicy,
+}
+
+
+def get_eviction_policy(policy: Union[str, EvictionPolicy] = "strength") -> EvictionPolicy:
+    """工厂函数：按名称返回策略实例（也接受现成实例）"""
+    if isinstance(policy, EvictionPolicy):
+        return policy
+    if policy in EVICTION_POLICIES:
+        return EVICTION_POLICIES[policy]()
+    raise ValueError(f"Unsupported eviction policy: {policy}")
+
+
+class Evictor:
+    """按策略维护候选淘汰顺序；insight 的 strength / hits / used 变化后调用 touch"""
+    def __init__(self, policy: Union[str, EvictionPolicy] = "strength"):
+        self.policy = get_eviction_policy(policy)
+        self._heap = IndexedHeap()
+        self._seq: Dict[Hashable, int] = {}
+        self._next_seq = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, handle: Hashable, insight: Any, seq: Optional[int] = None):
+        # seq 仅在从检查点恢复时显式传入，保持原有的同键先后顺序
+        if seq is None:
+            seq = self._next_seq
+        self._next_seq = max(self._next_seq, seq + 1)
+        self._seq[handle] = seq
+        self._heap.push(handle, self.policy.key(insight, seq))
+
+    def touch(self, handle: Hashable, insight: Any):
+        self._heap.update(handle, self.policy.key(insight, self._seq[handle]))
+
+    def remove(self, handle: Hashable):
+        self._heap.remove(handle)
+        del self._seq[handle]
+
+    def seq(self, handle: Hashable) -> int:
+        return self._seq[handle]
+
+    def victim(self) -> Optional[Hashable]:
+        return self._heap.peek()
+
+    def clear(self):
+        self._heap.clear()
+        self._seq.clear()
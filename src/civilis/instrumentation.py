@@ -0,0 +1,161 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+热路径埋点：分阶段计时、计数器、Chrome trace 导出
+默认关闭：span() 返回共享的空上下文管理器，count() 直接返回，开销仅一次全局变量判断
+开启：with profile(trace=True) as prof: ...；或 CivilisSimulation.run(profile=True)
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class Profiler:
+    """
+    timers:   阶段名 → [调用次数, 累计纳秒]
+    counters: 计数器名 → 累计值
+    trace=True 时额外保留每个 span 的起止时间（最多 max_events 条），用于导出 Chrome trace
+    """
+    def __init__(self, trace: bool = False, max_events: int = 1_000_000):
+        self.trace = trace
+        self.max_events = max_events
+        self.timers: Dict[str, List[int]] = {}
+        self.counters: Dict[str, float] = {}
+        self.events: List[Tuple[str, int, int, int]] = []
+        self.dropped_events = 0
+        self._origin = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def _record(self, name: str, start: int, end: int):
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = [0, 0]
+            timer[0] += 1
+            timer[1] += end - start
+            if self.trace:
+                if len(self.events) < self.max_events:
+                    self.events.append((name, start, end - start, threading.get_ident()))
+                else:
+                    self.dropped_events += 1
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            timers = {
+                name: {"count": count, "total_s": total / 1e9,
+                       "mean_us": total / count / 1e3 if count else 0.0}
+                for name, (count, total) in sorted(self.timers.items())
+            }
+            return {"timers": timers, "counters": dict(sorted(self.counters.items()))}
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Chrome / Perfetto 可读的 trace（完整事件 ph="X"，时间单位为微秒）"""
+        pid = os.getpid()
+        with self._lock:
+            events = [{"name": name, "cat": name.split(".")[0], "ph": "X", "pid": pid, "tid": tid,
+                       "ts": (start - self._origin) / 1e3, "dur": dur / 1e3}
+                      for name, start, dur, tid in self.events]
+            counters = dict(self.counters)
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"counters": counters, "dropped_events": self.dropped_events}}
+
+    def write_chrome_trace(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+_active: Optional[Profiler] = None
+
+
+def span(name: str):
+    profiler = _active
+    return _NULL_SPAN if profiler is None else profiler.span(name)
+
+
+def count(name: str, value: float = 1):
+    profiler = _active
+    if profiler is not None:
+        profiler.count(name, value)
+
+
+def get_profiler() -> Optional[Profiler]:
+    return _active
+
+
+def enable(trace: bool = False) -> Profiler:
+    """开启进程级埋点（已开启时返回现有实例，trace 只会被打开不会被关闭）"""
+    global _active
+    if _active is None:
+        _active = Profiler(trace=trace)
+    elif trace:
+        _active.trace = True
+    return _active
+
+
+def disable():
+    global _active
+    _active = None
+
+
+@contextlib.contextmanager
+def profile(trace: bool = False, trace_path: Optional[str] = None) -> Iterator[Profiler]:
+    """作用域内开启埋点；嵌套使用时复用外层实例，仅最外层负责关闭"""
+    outer = _active
+    profiler = enable(trace=trace or trace_path is not None)
+    try:
+        yield profiler
+    finally:
+        if outer is None:
+            disable()
+        if trace_path:
+            profiler.write_chrome_trace(trace_path)
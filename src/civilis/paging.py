@@ -0,0 +1,412 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+分页智能体存储（out-of-core）
+智能体按整数 ID 分片落盘：每个分片目录内，洞察向量以定长槽位存放在内存映射的 .npy 中，
+其余元数据（文本、强度、别名等）以 JSON 追加写入 meta.bin；
+内存中只保留最近使用的 max_resident 个智能体，首次访问时载入，按 LRU 换出并回写脏智能体
+每个槽位有两份向量缓冲区：回写总是写入当前未使用的一份，再追加元数据，最后才更新 index.npy 指向它，
+进程在写入中途崩溃时 index 仍指向上一版本，该智能体恢复为上次完整写入的状态；
+元数据中的校验和用于发现其余原因造成的向量与元数据不一致（载入时抛出 ValueError）
+"""
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from .checkpoint import _memory_arrays, _restore_memory, _StringTable
+from .core import STORAGE_DTYPES, CivilisAgent, VectorMemory
+
+FORMAT = "civilis-agent-store"
+VERSION = 2
+MANIFEST = "store.json"
+# meta.bin 中的失效记录超过该字节数且多于有效记录时整理文件
+_COMPACT_MIN_BYTES = 1 << 20
+
+
+_VECTOR_KEYS = ("insight_matrix", "insight_valid", "insight_scales", "insight_vectors", "insight_exact")
+
+
+def _checksum(arrays: Dict[str, np.ndarray]) -> int:
+    """槽位向量数据（按落盘后的 dtype）的 CRC32，与元数据一起写入，用于发现损坏的向量"""
+    crc = 0
+    for key in _VECTOR_KEYS:
+        if key in arrays:
+            crc = zlib.crc32(np.ascontiguousarray(arrays[key]).tobytes(), crc)
+    return crc
+
+
+class _Shard:
+    """
+    一个分片：index.npy 为每个槽位的 (meta 偏移, 长度, 向量缓冲区)，长度 0 表示槽位为空；
+    向量文件形状为 (槽位, 2, max_insights, ...)，第二维为双缓冲
+    """
+    def __init__(self, path: str, shard_size: int, max_insights: int, storage: str):
+        self.path = path
+        self.max_insights = max_insights
+        self.storage = storage
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "meta.bin")
+        self.index = self._open("index", (shard_size, 3), np.int64)
+        self.matrix: Optional[np.memmap] = None
+        self.valid: Optional[np.memmap] = None
+        self.scales: Optional[np.memmap] = None
+        self.vectors: Optional[np.memmap] = None
+        # 紧凑存储的精排侧存储（rerank > 0 时按需创建；meta 中 exact=True 的槽位有效）
+        self.exact: Optional[np.memmap] = None
+        if os.path.exists(os.path.join(path, "matrix.npy")):
+            self._open_vectors(None)
+        if os.path.exists(os.path.join(path, "exact.npy")):
+            self.exact = np.load(os.path.join(path, "exact.npy"), mmap_mode="r+")
+        # meta.bin 中不再被引用的字节（含之前会话留下的）
+        size = os.path.getsize(self._meta_path) if os.path.exists(self._meta_path) else 0
+        self.garbage = size - int(self.index[:, 1].sum())
+
+    def _open(self, name: str, shape, dtype) -> np.memmap:
+        file = os.path.join(self.path, f"{name}.npy")
+        if os.path.exists(file):
+            return np.load(file, mmap_mode="r+")
+        # 新文件为稀疏文件：只有写入过的槽位实际占用磁盘
+        return np.lib.format.open_memmap(file, mode="w+", dtype=dtype, shape=shape)
+
+    def _open_vectors(self, dim: Optional[int]):
+        if dim is None:
+            dim = np.load(os.path.join(self.path, "matrix.npy"), mmap_mode="r").shape[3]
+        slots = (len(self.index), 2, self.max_insights)
+        self.matrix = self._open("matrix", slots + (dim,), STORAGE_DTYPES[self.storage])
+        self.valid = self._open("valid", slots, bool)
+        if self.storage == "int8":
+            self.scales = self._open("scales", slots, np.float32)
+        if self.storage == "float32":
+            self.vectors = self._open("vectors", slots + (dim,), np.float32)
+
+    def present(self, slot: int) -> bool:
+        return bool(self.index[slot, 1] > 0)
+
+    def count(self) -> int:
+        return int(np.count_nonzero(self.index[:, 1]))
+
+    def _read_meta(self, slot: int) -> Dict[str, Any]:
+        offset, length = (int(v) for v in self.index[slot, :2])
+        with open(self._meta_path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length).decode("utf-8"))
+
+    def read(self, slot: int) -> Optional[Dict[str, Any]]:
+        """槽位 → (_restore_memory 所需的列式数组, 元数据)；空槽位返回 None"""
+        if not self.present(slot):
+            return None
+        meta = self._read_meta(slot)
+        count = meta["count"]
+        a = {
+            "agent_next_seq": np.array([meta["next_seq"]]),
+            "agent_use_clock": np.array([meta.get("use_clock", 0)]),
+            "insight_offsets": np.array([0, count]),
+            "alias_offsets": np.array([0, len(meta["alias_names"])]),
+            "alias_names": np.array(meta["alias_names"], dtype=np.int64),
+            "alias_targets": np.array(meta["alias_targets"], dtype=np.int64),
+        }
+        for key in ("content", "source", "strength", "hits", "seq", "members"):
+            a[f"insight_{key}"] = np.array(meta[key], dtype=np.int64)
+        a["insight_last_used"] = np.array(meta["last_used"], dtype=np.float64)
+        if "used" in meta:
+            a["insight_used"] = np.array(meta["used"], dtype=np.int64)
+        vectors = self._slot_vectors(slot, int(self.index[slot, 2]), count, meta["exact"])
+        a.update((key, np.array(value)) for key, value in vectors.items())
+        if _checksum(vectors) != meta["checksum"]:
+            raise ValueError(f"Slot {slot} in {self.path} does not match its metadata "
+                             f"(corrupted vectors); the agent cannot be restored")
+        return {"arrays": a, "meta": meta}
+
+    def _slot_vectors(self, slot: int, buffer: int, count: int, exact: bool) -> Dict[str, np.ndarray]:
+        """槽位第 buffer 份缓冲区中前 count 行的向量数据（内存映射视图）"""
+        if not count:
+            return {}
+        a = {"insight_matrix": self.matrix[slot, buffer, :count],
+             "insight_valid": self.valid[slot, buffer, :count]}
+        if self.scales is not None:
+            a["insight_scales"] = self.scales[slot, buffer, :count]
+        if self.vectors is not None:
+            a["insight_vectors"] = self.vectors[slot, buffer, :count]
+        if exact:
+            a["insight_exact"] = self.exact[slot, buffer, :count]
+        return a
+
+    def write(self, slot: int, arrays: Dict[str, np.ndarray], strings: List[str]):
+        count = int(arrays["insight_offsets"][1])
+        if count > self.max_insights:
+            raise ValueError(f"Memory holds {count} insights, store slots hold {self.max_insights}")
+        # 写入当前未被 index 引用的那份缓冲区，旧版本在 index 更新前始终完整可读
+        buffer = 1 - int(self.index[slot, 2]) if self.present(slot) else 0
+        if count:
+            if self.matrix is None:
+                self._open_vectors(arrays["insight_matrix"].shape[1])
+            self.matrix[slot, buffer, :count] = arrays["insight_matrix"]
+            self.valid[slot, buffer, :count] = arrays["insight_valid"]
+            if self.scales is not None:
+                self.scales[slot, buffer, :count] = arrays["insight_scales"]
+            if self.vectors is not None:
+                self.vectors[slot, buffer, :count] = arrays["insight_vectors"]
+            if "insight_exact" in arrays:
+                if self.exact is None:
+                    self.exact = self._open("exact", self.matrix.shape, np.float32)
+                self.exact[slot, buffer, :count] = arrays["insight_exact"]
+        meta = {
+            "count": count,
+            "checksum": _checksum(self._slot_vectors(slot, buffer, count, "insight_exact" in arrays)),
+            "exact": "insight_exact" in arrays,
+            "strings": strings,
+            "max_insights": int(arrays["agent_max_insights"][0]),
+            "policy": int(arrays["agent_policy"][0]),
+            "next_seq": int(arrays["agent_next_seq"][0]),
+            "last_used": arrays["insight_last_used"].tolist(),
+            "use_clock": int(arrays["agent_use_clock"][0]),
+            "used": arrays["insight_used"].tolist(),
+            "alias_names": arrays["alias_names"].tolist(),
+            "alias_targets": arrays["alias_targets"].tolist(),
+        }
+        for key in ("content", "source", "strength", "hits", "seq", "members"):
+            meta[key] = arrays[f"insight_{key}"].tolist()
+        blob = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        with open(self._meta_path, "ab") as f:
+            offset = f.tell()
+            f.write(blob)
+        self.garbage += int(self.index[slot, 1])
+        # 最后切换 index：此前崩溃时仍指向上一版本的元数据与缓冲区
+        self.index[slot] = (offset, len(blob), buffer)
+        if self.garbage > _COMPACT_MIN_BYTES and self.garbage > int(self.index[:, 1].sum()):
+            self._compact()
+
+    def _compact(self):
+        # 只保留各槽位的最新记录，整体替换 meta.bin
+        tmp = self._meta_path + ".tmp"
+        index = np.array(self.index)
+        with open(self._meta_path, "rb") as src, open(tmp, "wb") as dst:
+            for slot in np.flatnonzero(index[:, 1]).tolist():
+                src.seek(int(index[slot, 0]))
+                data = src.read(int(index[slot, 1]))
+                index[slot, 0] = dst.tell()
+                dst.write(data)
+        os.replace(tmp, self._meta_path)
+        self.index[:] = index
+        self.index.flush()
+        self.garbage = 0
+
+    def flush(self):
+        for array in (self.index, self.matrix, self.valid, self.scales, self.vectors, self.exact):
+            if array is not None:
+                array.flush()
+
+
+class PagedAgentStore:
+    """
+    按整数 ID（0, 1, 2, ...）存取 core.CivilisAgent；get() 返回的智能体在被换出前保持有效，
+    不要跨越其他 get() 调用长期持有引用（被换出后对它的修改不会再写回）
+    shard_size / max_insights / storage 为磁盘布局参数，重新打开已有存储时沿用保存的值
+    """
+    def __init__(self, path: str, max_resident: int = 10000,
+                 shard_size: Optional[int] = None, max_insights: Optional[int] = None,
+                 storage: Optional[str] = None, eviction: str = "strength",
+                 merge_threshold: Optional[float] = None, model_path: Optional[str] = None,
+                 rerank: int = 0):
+        if max_resident <= 0:
+            raise ValueError(f"max_resident must be positive, got {max_resident}")
+        self.path = os.path.abspath(path)
+        self.max_resident = max_resident
+        self.eviction = eviction
+        self.merge_threshold = merge_threshold
+        self.model_path = model_path
+        self.rerank = rerank
+        layout = {"shard_size": shard_size, "max_insights": max_insights, "storage": storage}
+        manifest_path = os.path.join(self.path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("format") != FORMAT:
+                raise ValueError(f"Not a Civilis agent store: {path}")
+            if manifest.get("version") != VERSION:
+                raise ValueError(f"Unsupported agent store version: {manifest.get('version')}")
+            for key, value in layout.items():
+                if value is not None and value != manifest[key]:
+                    raise ValueError(f"Store at {path} has {key}={manifest[key]!r}, got {value!r}")
+            layout = {key: manifest[key] for key in layout}
+        else:
+            layout = {"shard_size": shard_size or 4096, "max_insights": max_insights or 200,
+                      "storage": storage or "float32"}
+            if layout["storage"] not in STORAGE_DTYPES:
+                raise ValueError(f"Unsupported storage: {layout['storage']}")
+            if layout["shard_size"] <= 0 or layout["max_insights"] <= 0:
+                raise ValueError("shard_size and max_insights must be positive")
+            os.makedirs(self.path, exist_ok=True)
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump({"format": FORMAT, "version": VERSION, **layout}, f, indent=2)
+        self.shard_size = layout["shard_size"]
+        self.max_insights = layout["max_insights"]
+        self.storage = layout["storage"]
+        self._shards: Dict[int, _Shard] = {}
+        self._resident: "OrderedDict[int, CivilisAgent]" = OrderedDict()
+        self._dirty: Set[int] = set()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.loads = 0
+        self.creates = 0
+        self.writebacks = 0
+        self.evictions = 0
+
+    def _shard(self, shard_id: int, create: bool) -> Optional[_Shard]:
+        shard = self._shards.get(shard_id)
+        if shard is None:
+            path = os.path.join(self.path, f"shard-{shard_id:05d}")
+            if not create and not os.path.exists(os.path.join(path, "index.npy")):
+                return None
+            shard = _Shard(path, self.shard_size, self.max_insights, self.storage)
+            self._shards[shard_id] = shard
+        return shard
+
+    def _locate(self, agent_id: int):
+        if agent_id < 0:
+            raise KeyError(agent_id)
+        return divmod(int(agent_id), self.shard_size)
+
+    def _new_memory(self, max_insights: Optional[int] = None, eviction: Optional[str] = None) -> VectorMemory:
+        return VectorMemory(max_insights=max_insights or self.max_insights, eviction=eviction or self.eviction,
+                            storage=self.storage, rerank=self.rerank, model_path=self.model_path,
+                            merge_threshold=self.merge_threshold)
+
+    def _load(self, agent_id: int) -> Optional[CivilisAgent]:
+        shard_id, slot = self._locate(agent_id)
+        shard = self._shard(shard_id, create=False)
+        record = shard.read(slot) if shard is not None else None
+        if record is None:
+            return None
+        meta, strings = record["meta"], record["meta"]["strings"]
+        memory = self._new_memory(meta["max_insights"], strings[meta["policy"]])
+        _restore_memory(memory, record["arrays"], 0, strings)
+        return CivilisAgent(agent_id, memory)
+
+    def _write_back(self, agent_id: int, agent: CivilisAgent):
+        if agent.memory.max_insights > self.max_insights:
+            raise ValueError(f"Agent {agent_id} has max_insights={agent.memory.max_insights}, "
+                             f"store slots hold {self.max_insights}")
+        intern = _StringTable()
+        arrays = _memory_arrays([agent.memory], intern)
+        shard_id, slot = self._locate(agent_id)
+        self._shard(shard_id, create=True).write(slot, arrays, list(intern.ids))
+        self.writebacks += 1
+
+    def get(self, agent_id: int, readonly: bool = False) -> CivilisAgent:
+        """
+        取智能体：常驻则直接返回，否则从磁盘载入（不存在时新建）；
+        readonly=False（默认）视为会修改，换出或 flush() 时回写
+        """
+        with self._lock:
+            agent = self._resident.get(agent_id)
+            if agent is not None:
+                self._resident.move_to_end(agent_id)
+                self.hits += 1
+            else:
+                agent = self._load(agent_id)
+                if agent is None:
+                    agent = CivilisAgent(agent_id, self._new_memory())
+                    self.creates += 1
+                    # 新建的智能体总要落盘一次
+                    readonly = False
+                else:
+                    self.loads += 1
+                self._resident[agent_id] = agent
+            if not readonly:
+                self._dirty.add(agent_id)
+            self._page_out(self.max_resident)
+            return agent
+
+    __getitem__ = get
+
+    def mark_dirty(self, agent_id: int):
+        with self._lock:
+            if agent_id in self._resident:
+                self._dirty.add(agent_id)
+
+    def _page_out(self, keep: int):
+        while len(self._resident) > keep:
+            agent_id, agent = next(iter(self._resident.items()))
+            # 先回写成功再换出：回写失败时智能体仍常驻且保持为脏
+            if agent_id in self._dirty:
+                self._write_back(agent_id, agent)
+                self._dirty.discard(agent_id)
+            del self._resident[agent_id]
+            self.evictions += 1
+
+    def evict_all(self):
+        """回写并换出全部常驻智能体"""
+        with self._lock:
+            self._page_out(0)
+
+    def flush(self):
+        """回写全部脏智能体（保持常驻），并把内存映射文件刷到磁盘"""
+        with self._lock:
+            for agent_id in sorted(self._dirty):
+                self._write_back(agent_id, self._resident[agent_id])
+                self._dirty.discard(agent_id)
+            for shard in self._shards.values():
+                shard.flush()
+
+    def __contains__(self, agent_id: int) -> bool:
+        with self._lock:
+            return agent_id in self._resident or self._stored(agent_id)
+
+    def __len__(self) -> int:
+        """已知智能体数（磁盘上的 + 尚未落盘的常驻智能体）"""
+        with self._lock:
+            stored = 0
+            for name in os.listdir(self.path):
+                shard = self._shard(int(name[len("shard-"):]), create=False) if name.startswith("shard-") else None
+                # 没有 index.npy 的分片目录（创建中途中断）视为空
+                if shard is not None:
+                    stored += shard.count()
+            unsaved = sum(1 for agent_id in self._resident if not self._stored(agent_id))
+            return stored + unsaved
+
+    def _stored(self, agent_id: int) -> bool:
+        shard_id, slot = self._locate(agent_id)
+        shard = self._shard(shard_id, create=False)
+        return shard is not None and shard.present(slot)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resident": len(self._resident),
+                "dirty": len(self._dirty),
+                "hits": self.hits,
+                "loads": self.loads,
+                "creates": self.creates,
+                "writebacks": self.writebacks,
+                "evictions": self.evictions,
+                "resident_vector_bytes": sum(a.memory.memory_usage() for a in self._resident.values()),
+            }
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._resident.clear()
+            self._shards.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,178 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+多进程分片执行引擎
+智能体按连续区间分配到工作进程，每轮只同步一次；每个进程通过注册表各自加载模型
+"""
+import multiprocessing as mp
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .embedding_backends import load_embedding_backend
+from .simulation import AgentShard, CivilisAgent
+from .social import SocialMessages
+
+
+def shard_ranges(num_items: int, shards: int) -> List[Tuple[int, int]]:
+    """把 [0, num_items) 切成 shards 段尽量等长的连续区间"""
+    base, extra = divmod(num_items, shards)
+    ranges, start = [], 0
+    for i in range(shards):
+        end = start + base + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _split_messages(messages: SocialMessages, ranges: List[Tuple[int, int]]) -> List[SocialMessages]:
+    """按分片区间切分社交消息：行号改为分片内下标，每个分片只带自己用到的文本与向量"""
+    texts, vectors, rows, ids = messages
+    parts = []
+    for start, end in ranges:
+        lo, hi = np.searchsorted(rows, [start, end])
+        used, local = np.unique(ids[lo:hi], return_inverse=True)
+        parts.append(([texts[i] for i in used], vectors[used], rows[lo:hi] - start, local))
+    return parts
+
+
+def _worker_main(conn, agents: List[CivilisAgent], model_path: str, batch_size: int,
+                 civilization_metrics: bool = True):
+    try:
+        embedding_model = load_embedding_backend(model_path)
+        for agent in agents:
+            agent.embedding_model = embedding_model
+        shard = AgentShard(agents, embedding_model, model_path, batch_size, civilization_metrics)
+        conn.send(("ok", None))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+        return
+    while True:
+        command, arg = conn.recv()
+        try:
+            if command == "step":
+                conn.send(("ok", shard.step(arg)))
+            elif command == "begin_round":
+                conn.send(("ok", shard.begin_round(arg)))
+            elif command == "end_round":
+                conn.send(("ok", shard.end_round(arg)))
+            elif command == "agents":
+                conn.send(("ok", shard.agents))
+            elif command == "close":
+                break
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+
+
+class ShardedEngine:
+    """与 AgentShard 接口一致（step / begin_round / end_round），由 CivilisSimulation 在 workers > 1 时使用"""
+    def __init__(self, agents: List[CivilisAgent], model_path: str, batch_size: int,
+                 workers: int, start_method: Optional[str] = None, civilization_metrics: bool = True):
+        ctx = mp.get_context(start_method)
+        self._ranges = shard_ranges(len(agents), workers)
+        self._conns = []
+        self._processes = []
+        # 工作进程失联（管道断开）后为 True，不能再取回智能体
+        self.broken = False
+        try:
+            for start, end in self._ranges:
+                parent, child = ctx.Pipe()
+                process = ctx.Process(target=_worker_main,
+                                      args=(child, agents[start:end], model_path, batch_size,
+                                            civilization_metrics),
+                                      daemon=True)
+                process.start()
+                self._conns.append(parent)
+                self._processes.append(process)
+                child.close()
+            self._gather()
+        except BaseException:
+            # 部分工作进程已启动时一并关闭
+            self.close()
+            raise
+
+    def _gather(self) -> List[Any]:
+        """读取每个工作进程的回复（出错时也读完其余回复，保持请求 / 回复一一对应），再抛出第一个错误"""
+        replies, errors = [], []
+        for conn in self._conns:
+            try:
+                status, payload = conn.recv()
+            except (EOFError, OSError) as e:
+                self.broken = True
+                status, payload = "error", f"{type(e).__name__}: {e}"
+            if status == "error":
+                errors.append(payload)
+            replies.append(payload)
+        if errors:
+            raise RuntimeError(f"分片工作进程出错:\n{errors[0]}")
+        return replies
+
+    def _broadcast(self, command: str, arg: Any = None) -> List[Any]:
+        return self._scatter(command, [arg] * len(self._conns))
+
+    def _scatter(self, command: str, args: List[Any]) -> List[Any]:
+        """向每个工作进程发送各自的参数，再读取全部回复"""
+        if self.broken:
+            raise RuntimeError("分片工作进程已失联")
+        for conn, arg in zip(self._conns, args):
+            try:
+                conn.send((command, arg))
+            except (BrokenPipeError, OSError):
+                self.broken = True
+                raise
+        return self._gather()
+
+    @staticmethod
+    def _merge(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        result = {
+            "observations": [obs for part in parts for obs in part["observations"]],
+            "reflections": [refl for part in parts for refl in part["reflections"]],
+            "total_insights": sum(part["total_insights"] for part in parts),
+            "knowledge_size": sum(part["knowledge_size"] for part in parts),
+        }
+        if "civilization" in parts[0]:
+            result["civilization"] = [partial for part in parts for partial in part["civilization"]]
+        return result
+
+    def step(self, round_num: int) -> Dict[str, Any]:
+        return self._merge(self._broadcast("step", round_num))
+
+    def begin_round(self, round_num: int) -> Tuple[List[str], Tuple[np.ndarray, np.ndarray]]:
+        parts = self._broadcast("begin_round", round_num)
+        # 各分片的去重向量表拼接，下标按表偏移
+        tables = [table for _, (table, _) in parts]
+        offsets = np.cumsum([0] + [len(table) for table in tables[:-1]])
+        reflections = [refl for part, _ in parts for refl in part]
+        return reflections, (np.concatenate(tables),
+                             np.concatenate([inverse + offset for (_, (_, inverse)), offset in zip(parts, offsets)]))
+
+    def end_round(self, messages: Optional[SocialMessages] = None) -> Dict[str, Any]:
+        args = _split_messages(messages, self._ranges) if messages is not None else [None] * len(self._conns)
+        return self._merge(self._scatter("end_round", args))
+
+    def collect_agents(self) -> List[CivilisAgent]:
+        return [agent for part in self._broadcast("agents") for agent in part]
+
+    def close(self):
+        for conn, process in zip(self._conns, self._processes):
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._conns, self._processes = [], []
@@ -0,0 +1,126 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+智能体群体状态（struct-of-arrays）
+每个智能体的近期观察存放在定长环形缓冲区（观察文本 ID），洞察计数为 NumPy 数组；
+observe / reflect 对全体智能体一次完成，长时间运行内存恒定
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# reflect 只读取最近 3 条观察，环形缓冲区即保留这么多
+MEMORY_WINDOW = 3
+
+
+class AgentPopulation:
+    """
+    ring:     (num_agents, window) 观察文本 ID，-1 为空位；第 i 行的下一个写入位置为 observed[i] % window
+    observed: (num_agents,) 累计观察次数
+    insights: (num_agents,) 累计洞察数
+    """
+    def __init__(self, num_agents: int, window: int = MEMORY_WINDOW):
+        if window <= 0:
+            raise ValueError(f"window must be positive, got {window}")
+        self.num_agents = num_agents
+        self.window = window
+        self.ring = np.full((num_agents, window), -1, dtype=np.int64)
+        self.observed = np.zeros(num_agents, dtype=np.int64)
+        self.insights = np.zeros(num_agents, dtype=np.int64)
+        self.texts: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._compact_at = 64
+
+    def __len__(self):
+        return self.num_agents
+
+    def intern(self, text: str) -> int:
+        text_id = self._ids.get(text)
+        if text_id is None:
+            if len(self.texts) >= self._compact_at:
+                self._compact()
+            text_id = len(self.texts)
+            self.texts.append(text)
+            self._ids[text] = text_id
+        return text_id
+
+    def _compact(self):
+        # 丢弃已滑出所有环形缓冲区的文本，文本表大小与运行轮数无关
+        live = np.unique(self.ring[self.ring >= 0])
+        remap = np.full(len(self.texts), -1, dtype=np.int64)
+        remap[live] = np.arange(len(live))
+        self.ring = np.where(self.ring >= 0, remap[np.maximum(self.ring, 0)], -1)
+        self.texts = [self.texts[i] for i in live.tolist()]
+        self._ids = {text: i for i, text in enumerate(self.texts)}
+        self._compact_at = max(64, 2 * len(self.texts))
+
+    def observe(self, observation: str, rows: Optional[np.ndarray] = None):
+        """rows（默认全体）中的每个智能体记下同一条观察"""
+        self.observe_ids(np.int64(self.intern(observation)), rows)
+
+    def observe_ids(self, text_ids: np.ndarray, rows: Optional[np.ndarray] = None):
+        """rows 中每行记下对应的观察文本 ID；同一行在一次调用中只能出现一次"""
+        if rows is None:
+            rows = np.arange(self.num_agents)
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            if len(rows) > 1 and len(np.unique(rows)) != len(rows):
+                raise ValueError("rows must not contain duplicates; call observe once per observation")
+        self.ring[rows, self.observed[rows] % self.window] = text_ids
+        self.observed[rows] += 1
+
+    def reflect(self) -> List[str]:
+        """全体智能体各反思一次：有观察的洞察数 +1，返回每个智能体的反思文本"""
+        active = self.observed > 0
+        self.insights[active] += 1
+        recent = np.minimum(self.observed, self.window)
+        # 同一 (洞察数, 近期观察数) 的文本相同，只格式化一次
+        keys = np.where(active, self.insights * (self.window + 1) + recent, -1)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        texts = np.array([
+            "No observations yet" if key < 0 else
+            f"Insight #{key // (self.window + 1)}: Based on {key % (self.window + 1)} observations"
+            for key in unique.tolist()
+        ], dtype=object)
+        return texts[inverse.reshape(-1)].tolist()
+
+    def recent(self, row: int) -> List[str]:
+        """第 row 个智能体的近期观察（旧 → 新）"""
+        count = int(self.observed[row])
+        start = max(0, count - self.window)
+        return [self.texts[self.ring[row, i % self.window]] for i in range(start, count)]
+
+    def set_row(self, row: int, memory: Sequence[str], insights: int):
+        memory = list(memory)[-self.window:]
+        self.ring[row] = -1
+        for i, text in enumerate(memory):
+            self.ring[row, i] = self.intern(text)
+        self.observed[row] = len(memory)
+        self.insights[row] = insights
+
+    @classmethod
+    def bind(cls, agents: Sequence, window: int = MEMORY_WINDOW) -> "AgentPopulation":
+        """
+        让 agents 依次对应群体的第 0..n-1 行：若它们已是同一群体的完整行序列则直接复用，
+        否则把各自状态收拢到新群体中（例如从工作进程取回的智能体）
+        """
+        population = agents[0]._population if agents else None
+        if (population is not None and population.num_agents == len(agents)
+                and all(a._population is population and a._row == i for i, a in enumerate(agents))):
+            return population
+        population = cls(len(agents), window)
+        for row, agent in enumerate(agents):
+            population.set_row(row, agent.memory, agent.insights)
+            agent._population, agent._row = population, row
+        return population
@@ -0,0 +1,386 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+智能体服务（asyncio，HTTP/JSON over TCP 或 Unix socket，仅依赖标准库）
+- 每个智能体一把 asyncio.Lock：同一智能体的请求串行，不同智能体并行
+- interact / learn 在有界线程池中执行，编码经微批编码服务合并为批量推理
+- 排队请求超过 max_pending 时立即返回 503（背压），/stats 提供各接口延迟分位数
+接口：
+    POST /agents/{id}/interact  {"message": "..."}
+    POST /agents/{id}/learn     {"statement": "...", "source_module": "..."}
+    GET  /agents/{id} | /stats | /health
+命令行：civilis-serve --port 8000 [--unix /tmp/civilis.sock]
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Sequence, Set, Tuple
+from urllib.parse import unquote
+
+import numpy as np
+
+from . import core
+from .core import CivilisAgent
+from .encoder_service import EncoderService
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 431: "Request Header Fields Too Large",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+# 单个请求最多接受的头部行数
+_MAX_HEADERS = 100
+
+
+class Overloaded(RuntimeError):
+    """排队请求已达 max_pending，或智能体数已达 max_agents"""
+
+
+class UnknownAgent(KeyError):
+    """create_agents=False 时请求了不存在的智能体"""
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class LatencyWindow:
+    """最近 window 次请求的延迟（秒），按需计算分位数"""
+    def __init__(self, window: int = 10000):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+
+    def summary(self) -> Dict[str, float]:
+        if not self._samples:
+            return {"count": self.count, "p50_ms": 0.0, "p90_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        samples = np.fromiter(self._samples, dtype=np.float64, count=len(self._samples)) * 1000.0
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+        return {"count": self.count, "p50_ms": float(p50), "p90_ms": float(p90),
+                "p99_ms": float(p99), "max_ms": float(samples.max())}
+
+
+class AgentServer:
+    """
+    agents 为预先创建的智能体（按 ID）；create_agents=True 时未知 ID 在首次请求时由 agent_factory 创建，
+    智能体总数达到 max_agents 后不再新建（返回 503）
+    workers 为执行 interact / learn 的线程数；batch_encoding=True 时运行期间安装微批编码服务
+    """
+    def __init__(self, agents: Optional[Dict[str, CivilisAgent]] = None,
+                 agent_factory: Optional[Callable[[str], CivilisAgent]] = None,
+                 create_agents: bool = True, max_agents: int = 10000,
+                 workers: int = 8, max_pending: int = 1024,
+                 batch_encoding: bool = True, latency_window: int = 10000,
+                 max_body_bytes: int = 1 << 20, keepalive_timeout: float = 30.0):
+        if workers <= 0:
+            raise ValueError(f"workers must be positive, got {workers}")
+        if max_pending <= 0:
+            raise ValueError(f"max_pending must be positive, got {max_pending}")
+        if max_agents <= 0:
+            raise ValueError(f"max_agents must be positive, got {max_agents}")
+        self.agents: Dict[str, CivilisAgent] = dict(agents or {})
+        self.agent_factory = agent_factory or CivilisAgent
+        self.create_agents = create_agents
+        self.max_agents = max_agents
+        self.workers = workers
+        self.max_pending = max_pending
+        self.batch_encoding = batch_encoding
+        self.max_body_bytes = max_body_bytes
+        self.keepalive_timeout = keepalive_timeout
+        self.latency: Dict[str, LatencyWindow] = {
+            name: LatencyWindow(latency_window) for name in ("interact", "learn")}
+        self.address: Any = None
+        self.pending = 0
+        self.rejected = 0
+        self.errors = 0
+        # 每个智能体的锁及其使用者数（含排队者），无人使用时删除
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._service: Optional[EncoderService] = None
+        self._previous_service = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+
+    # ---------- 智能体调用（可不经 HTTP 直接 await） ----------
+
+    def _agent(self, agent_id: str) -> CivilisAgent:
+        agent = self.agents.get(agent_id)
+        if agent is None:
+            if not self.create_agents:
+                raise UnknownAgent(agent_id)
+            if len(self.agents) >= self.max_agents:
+                raise Overloaded(f"agent pool is full (max_agents={self.max_agents})")
+            agent = self.agents[agent_id] = self.agent_factory(agent_id)
+        return agent
+
+    async def _call(self, route: str, agent_id: str, method: Callable[[CivilisAgent], Any]) -> Any:
+        if self._executor is None:
+            raise RuntimeError("AgentServer is not started")
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded(f"{self.pending} requests pending")
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            agent = self._agent(agent_id)
+            lock = self._locks.setdefault(agent_id, asyncio.Lock())
+            self._lock_users[agent_id] = self._lock_users.get(agent_id, 0) + 1
+            try:
+                # 先排智能体锁、再占工作线程：热点智能体的排队不占用线程
+                async with lock:
+                    async with self._slots:
+                        result = await asyncio.get_running_loop().run_in_executor(
+                            self._executor, method, agent)
+            finally:
+                self._lock_users[agent_id] -= 1
+                if not self._lock_users[agent_id]:
+                    del self._lock_users[agent_id], self._locks[agent_id]
+            self.latency[route].add(time.perf_counter() - start)
+            return result
+        finally:
+            self.pending -= 1
+
+    async def interact(self, agent_id: str, message: str) -> str:
+        return await self._call("interact", agent_id, lambda agent: agent.interact(message))
+
+    async def learn(self, agent_id: str, statement: str, source_module: str = "Xun"):
+        await self._call("learn", agent_id, lambda agent: agent.learn(statement, source_module))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "agents": len(self.agents),
+            "max_agents": self.max_agents,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "latency": {name: window.summary() for name, window in self.latency.items()},
+        }
+        if self._service is not None:
+            stats["encoder_service"] = self._service.stats()
+        return stats
+
+    # ---------- 生命周期 ----------
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, unix_path: Optional[str] = None):
+        """开始监听；port=0 时由系统分配端口（见 self.address）"""
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="civilis-serve")
+        self._slots = asyncio.Semaphore(self.workers)
+        if self.batch_encoding:
+            self._service = EncoderService()
+            self._previous_service = core.use_encoder_service(self._service)
+        limit = max(self.max_body_bytes, 1 << 16)
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=unix_path, limit=limit)
+            self.address = unix_path
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port, limit=limit)
+            self.address = self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+            self._executor = None
+        if self._service is not None:
+            core.use_encoder_service(self._previous_service)
+            self._service.close()
+            self._service = None
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # ---------- HTTP ----------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.keepalive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except _HTTPError as e:
+                    await self._respond(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader
+                            ) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        line = await self._readline(reader, 400, "Request line too long")
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise _HTTPError(400, "Malformed request line")
+        headers: Dict[str, str] = {}
+        for count in range(_MAX_HEADERS + 1):
+            line = await self._readline(reader, 431, "Header line too long")
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if count == _MAX_HEADERS:
+                raise _HTTPError(431, f"More than {_MAX_HEADERS} header fields")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise _HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise _HTTPError(400, "Invalid Content-Length")
+        if length > self.max_body_bytes:
+            raise _HTTPError(413, f"Body exceeds {self.max_body_bytes} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    @staticmethod
+    async def _readline(reader: asyncio.StreamReader, status: int, message: str) -> bytes:
+        # 超过流的 limit 的行：readline 抛出 ValueError（内部为 LimitOverrunError），转为错误响应
+        try:
+            return await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            raise _HTTPError(status, message)
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        try:
+            parts = [unquote(p) for p in path.strip("/").split("/")]
+            if parts == ["health"]:
+                return 200, {"status": "ok"}
+            if parts == ["stats"]:
+                return 200, self.stats()
+            if len(parts) not in (2, 3) or parts[0] != "agents" or not parts[1]:
+                raise _HTTPError(404, f"No route for {path}")
+            agent_id = parts[1]
+            if len(parts) == 2:
+                if method != "GET":
+                    raise _HTTPError(405, "Use GET")
+                agent = self.agents.get(agent_id)
+                if agent is None:
+                    raise _HTTPError(404, f"Unknown agent: {agent_id}")
+                return 200, {"agent_id": agent_id, "insights": len(agent.memory)}
+            if method != "POST":
+                raise _HTTPError(405, "Use POST")
+            data = self._json(body)
+            if parts[2] == "interact":
+                message = self._field(data, "message")
+                return 200, {"agent_id": agent_id, "response": await self.interact(agent_id, message)}
+            if parts[2] == "learn":
+                source = data.get("source_module", "Xun")
+                await self.learn(agent_id, self._field(data, "statement"), str(source))
+                return 200, {"agent_id": agent_id, "learned": True}
+            raise _HTTPError(404, f"No route for {path}")
+        except _HTTPError as e:
+            return e.status, {"error": e.message}
+        except Overloaded as e:
+            return 503, {"error": f"Server overloaded: {e}"}
+        except UnknownAgent as e:
+            return 404, {"error": f"Unknown agent: {e.args[0]}"}
+        except Exception as e:
+            self.errors += 1
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    @staticmethod
+    def _json(body: bytes) -> Dict[str, Any]:
+        try:
+            data = json.loads(body.decode("utf-8")) if body else {}
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise _HTTPError(400, f"Invalid JSON: {e}")
+        if not isinstance(data, dict):
+            raise _HTTPError(400, "Body must be a JSON object")
+        return data
+
+    @staticmethod
+    def _field(data: Dict[str, Any], name: str) -> str:
+        value = data.get(name)
+        if not isinstance(value, str):
+            raise _HTTPError(400, f"Field {name!r} must be a string")
+        return value
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any], keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+
+async def _serve(args):
+    server = AgentServer(max_agents=args.max_agents, workers=args.workers, max_pending=args.max_pending,
+                         batch_encoding=not args.no_batch_encoding)
+    await server.start(args.host, args.port, args.unix)
+    print(f"🚀 Civilis 智能体服务已启动: {server.address}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Civilis 智能体服务（HTTP/JSON）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--unix", default=None, help="监听 Unix socket 路径（代替 TCP）")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--max-pending", type=int, default=1024)
+    parser.add_argument("--max-agents", type=int, default=10000, help="最多自动创建的智能体数")
+    parser.add_argument("--no-batch-encoding", action="store_true", help="不使用微批编码服务")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -16,69 +16,256 @@ Civilis Simulation Core
 支持：HuggingFace镜像（中国大陆优化）| 本地模型路径 | 清晰错误指引
 无需修改代码，通过环境变量灵活配置
 """
+import contextlib
+import time
+from collections import deque
 import numpy as np
-import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Deque, Iterator, Optional, Sequence, Tuple
+
+from . import instrumentation
+from .civilization import CivilizationMetrics, CivilizationStats
+from .core import VectorMemory
+from .population import MEMORY_WINDOW, AgentPopulation
+from .embedding_backends import default_model_path, load_embedding_backend
+from .embedding_cache import get_embedding_cache
+from .instrumentation import span
+from .sinks import HistorySink
+from .social import SocialGraph, SocialMessages
+
+def encode_texts(texts: List[str], embedding_model, model_path: str, batch_size: int = 64) -> np.ndarray:
+    """整轮文本一次性编码：缓存去重后，未命中部分按 batch_size 批量推理"""
+    def encode_missing(missing: List[str]) -> np.ndarray:
+        return np.asarray(embedding_model.encode(missing, batch_size=batch_size))
+    return get_embedding_cache(model_path).encode(texts, encode_missing)
+
+
+# 每轮写入知识记忆的两条洞察（观察、反思）的来源模块
+_ROUND_SOURCES = ["observation", "reflection"]
+
+
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
 
 # =============== CivilisAgent 类 ===============
 class CivilisAgent:
-    def __init__(self, agent_id: int, embedding_model, rng: np.random.Generator):
+    """
+    近期观察与洞察计数存放在所属 AgentPopulation 的一行（模拟运行时由 AgentShard 绑定）；
+    未绑定时（单独使用、跨进程传输途中）保存在对象自身，同样只保留最近 MEMORY_WINDOW 条观察
+    """
+    def __init__(self, agent_id: int, embedding_model, rng: np.random.Generator,
+                 storage: str = "float32", model_path: Optional[str] = None,
+                 merge_threshold: Optional[float] = None):
         self.agent_id = agent_id
         self.embedding_model = embedding_model
         self.rng = rng
-        self.memory = []
-        self.insights = 0
+        self._population: Optional[AgentPopulation] = None
+        self._row = 0
+        self._memory: Deque[str] = deque(maxlen=MEMORY_WINDOW)
+        self._insights = 0
+        self.knowledge = VectorMemory(storage=storage, model_path=model_path,
+                                      merge_threshold=merge_threshold)
+    
+    @property
+    def memory(self) -> Tuple[str, ...]:
+        """最近的观察（旧 → 新）；只读快照，修改请用 observe() 或整体赋值"""
+        if self._population is not None:
+            return tuple(self._population.recent(self._row))
+        return tuple(self._memory)
+    
+    @memory.setter
+    def memory(self, observations: Sequence[str]):
+        if self._population is not None:
+            self._population.set_row(self._row, observations, self.insights)
+        else:
+            self._memory = deque(observations, maxlen=MEMORY_WINDOW)
+    
+    @property
+    def insights(self) -> int:
+        if self._population is not None:
+            return int(self._population.insights[self._row])
+        return self._insights
+    
+    @insights.setter
+    def insights(self, value: int):
+        if self._population is not None:
+            self._population.insights[self._row] = value
+        else:
+            self._insights = value
+    
+    def __getstate__(self):
+        # 跨进程传输时不序列化模型，由接收方重新挂接注册表中的模型；
+        # 群体中的一行展开为对象自身的状态，接收方重新绑定
+        state = self.__dict__.copy()
+        state["embedding_model"] = None
+        state["_memory"] = deque(self.memory, maxlen=MEMORY_WINDOW)
+        state["_insights"] = self.insights
+        state["_population"] = None
+        state["_row"] = 0
+        return state
     
     def observe(self, observation: str):
-        self.memory.append(observation)
+        if self._population is not None:
+            self._population.observe(observation, rows=[self._row])
+        else:
+            self._memory.append(observation)
     
     def reflect(self) -> str:
-        if not self.memory:
+        recent = self.memory
+        if not recent:
             return "No observations yet"
-        recent = self.memory[-3:]
         self.insights += 1
         return f"Insight #{self.insights}: Based on {len(recent)} observations"
 
+    def absorb(self, observation: str, observation_vector: np.ndarray,
+               reflection: str, reflection_vector: np.ndarray):
+        """接收本轮批量编码后的向量，一次批量写入向量记忆（不再单独编码）"""
+        self.knowledge.add_insights([observation, reflection], _ROUND_SOURCES,
+                                    vectors=np.stack([observation_vector, reflection_vector]))
+
+# =============== AgentShard：一组智能体的每轮流水线 ===============
+class AgentShard:
+    """
+    收集 → 批量编码 → 分发
+    单进程模拟即一个覆盖全部智能体的分片；多进程模式下每个工作进程持有一个分片
+    """
+    def __init__(self, agents: List[CivilisAgent], embedding_model, model_path: str,
+                 batch_size: int = 64, civilization_metrics: bool = True):
+        self.agents = agents
+        self.embedding_model = embedding_model
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.population = AgentPopulation.bind(agents)
+        # begin_round 之后、end_round 之前：本轮 (观察, 反思, 向量表, 下标)
+        self._pending: Optional[Tuple[List[str], List[str], np.ndarray, np.ndarray]] = None
+        # 文明指标的分片内增量统计（挂接为各智能体知识记忆的观察者）
+        self.civilization = (CivilizationStats([agent.knowledge for agent in agents])
+                             if civilization_metrics else None)
+        if not civilization_metrics:
+            for agent in agents:
+                agent.knowledge.observer = None
+
+    def _collect_round(self, round_num: int) -> Tuple[List[str], List[str]]:
+        # 全体智能体的观察与反思在群体数组上一次完成
+        observation = f"Round {round_num} observation"
+        self.population.observe(observation)
+        return [observation] * len(self.agents), self.population.reflect()
+
+    def _encode_batch(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        整轮文本大量重复（同轮观察、同序号反思），先去重再查缓存 / 编码
+        返回 (去重后的向量表, 每条文本在表中的下标)
+        """
+        index: Dict[str, int] = {}
+        inverse = np.fromiter((index.setdefault(text, len(index)) for text in texts),
+                              dtype=np.int64, count=len(texts))
+        vectors = encode_texts(list(index), self.embedding_model, self.model_path, self.batch_size)
+        return np.asarray(vectors), inverse
+
+    def _deliver(self, observations: List[str], reflections: List[str], vectors: np.ndarray):
+        """
+        知识记忆是每个智能体各自的 VectorMemory，写入仍逐个智能体进行（批量的只有收集与编码）：
+        每个智能体的观察与反思合并为一次 add_insights
+        """
+        n = len(observations)
+        pairs = np.stack([vectors[:n], vectors[n:]], axis=1)
+        for agent, obs, refl, pair in zip(self.agents, observations, reflections, pairs):
+            agent.knowledge.add_insights([obs, refl], _ROUND_SOURCES, vectors=pair)
+
+    def _receive(self, messages: SocialMessages):
+        """邻居的反思（主进程已编码、已路由）作为 social 来源的洞察写入知识记忆"""
+        texts, vectors, rows, ids = messages
+        bounds = np.searchsorted(rows, np.arange(len(self.agents) + 1))
+        for agent, start, end in zip(self.agents, bounds[:-1], bounds[1:]):
+            if end > start:
+                agent.knowledge.add_insights([texts[i] for i in ids[start:end]], "social",
+                                             vectors=vectors[ids[start:end]])
+
+    def begin_round(self, round_num: int) -> Tuple[List[str], Tuple[np.ndarray, np.ndarray]]:
+        """
+        收集并批量编码本轮文本，返回本轮反思及其向量（去重表, 下标）；
+        社交层据此路由消息后调用 end_round，主进程无需重新编码
+        """
+        with span("round.collect"):
+            observations, reflections = self._collect_round(round_num)
+        with span("round.encode"):
+            table, inverse = self._encode_batch(observations + reflections)
+        self._pending = (observations, reflections, table, inverse)
+        return reflections, (table, inverse[len(observations):])
+
+    def end_round(self, messages: Optional[SocialMessages] = None) -> Dict[str, Any]:
+        """分发本轮向量与收到的社交消息（行号为分片内下标），返回本轮结果"""
+        observations, reflections, table, inverse = self._pending
+        self._pending = None
+        with span("round.deliver"):
+            self._deliver(observations, reflections, table[inverse])
+            if messages is not None:
+                self._receive(messages)
+        result = {
+            "observations": observations,
+            "reflections": reflections,
+            "total_insights": int(self.population.insights.sum()),
+            "knowledge_size": sum(len(agent.knowledge) for agent in self.agents),
+        }
+        if self.civilization is not None:
+            result["civilization"] = [self.civilization.round_partial()]
+        return result
+
+    def step(self, round_num: int) -> Dict[str, Any]:
+        self.begin_round(round_num)
+        return self.end_round()
+
 # =============== CivilisSimulation 核心类 ===============
 class CivilisSimulation:
-    def __init__(self, num_agents: int = 10, rounds: int = 100, seed: int = None):
+    def __init__(self, num_agents: int = 10, rounds: int = 100, seed: int = None,
+                 batch_size: int = 64, workers: int = 1, model_path: Optional[str] = None,
+                 social_degree: int = 0, rewire_prob: float = 0.1,
+                 social_influence: float = 0.5, storage: str = "float32",
+                 civilization_metrics: bool = True, merge_threshold: Optional[float] = None,
+                 social_hops: int = 1):
         self.num_agents = num_agents
         self.rounds = rounds
+        self.batch_size = batch_size
+        self.workers = max(1, min(workers, num_agents))
         self.seed = seed if seed is not None else np.random.randint(0, 10000)
         self.rng = np.random.default_rng(self.seed)
+        self.model_path = model_path or default_model_path()
+        start = time.perf_counter()
         self._init_embedding()
-        self.agents = [CivilisAgent(i, self.embedding_model, self.rng) for i in range(self.num_agents)]
+        self.model_load_seconds = time.perf_counter() - start
+        # 每个智能体独立随机流（由 seed 派生），结果与工作进程数无关
+        agent_seeds = np.random.SeedSequence(self.seed).spawn(self.num_agents)
+        # storage="float16"/"int8" 时知识记忆以紧凑格式存储向量（见 VectorMemory）
+        self.storage = storage
+        # merge_threshold 非空时知识记忆在线合并近似重复洞察（见 VectorMemory）
+        self.merge_threshold = merge_threshold
+        self.agents = [CivilisAgent(i, self.embedding_model, np.random.default_rng(agent_seed),
+                                    storage, self.model_path, merge_threshold)
+                       for i, agent_seed in enumerate(agent_seeds)]
         self.history = []
+        self.current_round = 0
+        # 小世界社交网络（默认 social_degree=0 关闭）；culture 为每个智能体的文化向量。
+        # 每轮的反思沿网络送达 social_hops 跳以内的智能体，作为 social 来源的洞察写入知识记忆
+        if social_hops < 1:
+            raise ValueError(f"social_hops must be >= 1, got {social_hops}")
+        self.social_degree = social_degree
+        self.social_hops = social_hops
+        self.rewire_prob = rewire_prob
+        self.social_influence = social_influence
+        self.social_graph = (SocialGraph.watts_strogatz(self.num_agents, social_degree, rewire_prob, self.rng)
+                             if social_degree > 0 else None)
+        self.culture: Optional[np.ndarray] = None
+        # 文明指标（diversity / consensus / innovation / novelty），由各分片的部分和逐轮合并；
+        # civilization_metrics=False 时不挂接观察者，记录中也没有这些字段
+        self.civilization_metrics = civilization_metrics
+        self.civilization = CivilizationMetrics()
     
     def _init_embedding(self):
-        model_path = os.getenv(
-            "CIVILIS_EMBEDDING_MODEL", 
-            "sentence-transformers/all-MiniLM-L6-v2"
-        )
-        
-        # 中国大陆网络优化（自动启用HF镜像）
-        if "sentence-transformers/" in model_path and os.getenv("HF_ENDPOINT") is None:
-            try:
-                import socket
-                socket.setdefaulttimeout(2.0)
-                socket.create_connection(("hf-mirror.com", 443), timeout=2)
-                os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
-                print("🌐 检测到中国大陆网络环境，已自动启用HuggingFace镜像源 (hf-mirror.com)")
-            except:
-                pass
+        model_path = self.model_path
         
+        # 进程级注册表：模型只加载一次，重复创建模拟几乎零开销
         try:
-            print(f"📥 正在加载嵌入模型: {model_path}")
-            from sentence_transformers import SentenceTransformer
-            
-            self.embedding_model = SentenceTransformer(
-                model_path,
-                trust_remote_code=True,
-                cache_folder=os.getenv("CIVILIS_MODEL_CACHE", None)
-            )
-            dim = self.embedding_model.get_sentence_embedding_dimension()
-            print(f"✅ 模型加载成功 | 维度: {dim} | 来源: {model_path}")
-            
+            self.embedding_model = load_embedding_backend(model_path)
         except Exception as e:
             error_msg = f"""
 ❌ 模型加载失败: {str(e)}
@@ -95,6 +282,8 @@ class CivilisSimulation:
    Git Bash / Linux / macOS:
       export HF_ENDPOINT=https://hf-mirror.com
       python verify_install.py
+   
+   或设置 CIVILIS_HF_MIRROR_PROBE=1，由 Civilis 自动探测并启用镜像
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 【方案2】手动下载模型（100%可靠）
    1. 创建模型目录: mkdir -p ./models/embeddings
@@ -109,21 +298,119 @@ class CivilisSimulation:
             print(error_msg)
             raise RuntimeError("嵌入模型加载失败，请根据上方指引操作") from e
     
-    def run(self) -> Dict[str, Any]:
+    def _socialize(self, reflections: List[str],
+                   reflection_vectors: Tuple[np.ndarray, np.ndarray]) -> Tuple[float, SocialMessages]:
+        """
+        文化传播：每个智能体吸收本轮反思向量（分片已编码，(向量表, 下标)），
+        再沿社交网络与邻居均值混合（CSR 向量化）；返回传播前智能体与邻居均值的平均余弦相似度，
+        以及送往 social_hops 跳以内智能体的反思消息（相同文本只发一份向量）
+        """
+        table, inverse = reflection_vectors
+        vectors = table[inverse]
+        if self.culture is None:
+            self.culture = np.zeros_like(vectors)
+        culture = _normalize_rows(self.culture + _normalize_rows(vectors))
+        neighbor_mean = self.social_graph.neighbor_mean(culture)
+        alignment = float(np.mean(np.sum(culture * _normalize_rows(neighbor_mean), axis=1)))
+        self.culture = _normalize_rows((1.0 - self.social_influence) * culture
+                                       + self.social_influence * neighbor_mean)
+        index: Dict[str, int] = {}
+        labels = np.fromiter((index.setdefault(text, len(index)) for text in reflections),
+                             dtype=np.int64, count=len(reflections))
+        _, first = np.unique(labels, return_index=True)
+        rows, ids = self.social_graph.route(labels, self.social_hops)
+        return alignment, (list(index), vectors[first], rows, ids)
+    
+    def save_checkpoint(self, path: str):
+        """保存完整模拟状态到检查点目录（见 civilis.checkpoint）"""
+        from .checkpoint import save_checkpoint
+        save_checkpoint(self, path)
+    
+    @classmethod
+    def from_checkpoint(cls, path: str, rounds: Optional[int] = None,
+                        workers: Optional[int] = None) -> "CivilisSimulation":
+        """从检查点恢复；之后调用 run() / iter_rounds() 从保存的轮次继续"""
+        from .checkpoint import load_checkpoint
+        return load_checkpoint(path, rounds=rounds, workers=workers)
+    
+    def iter_rounds(self, checkpoint_dir: Optional[str] = None,
+                    checkpoint_every: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        逐轮推进并产出本轮记录；不在模拟内部保留历史，可从中断处继续迭代
+        checkpoint_every > 0 时每隔该轮数把完整状态写入 checkpoint_dir（覆盖上一个检查点）
+        """
+        from .checkpoint import save_checkpoint
+        if self.workers > 1:
+            from .parallel import ShardedEngine
+            engine = ShardedEngine(self.agents, self.model_path, self.batch_size, self.workers,
+                                   civilization_metrics=self.civilization_metrics)
+        else:
+            engine = AgentShard(self.agents, self.embedding_model, self.model_path, self.batch_size,
+                                self.civilization_metrics)
+        try:
+            while self.current_round < self.rounds:
+                round_num = self.current_round
+                with span("round.step"):
+                    if self.social_graph is None:
+                        result = engine.step(round_num)
+                    else:
+                        # 先编码本轮反思，沿网络路由后连同社交消息一起分发
+                        reflections, vectors = engine.begin_round(round_num)
+                        with span("round.socialize"):
+                            alignment, messages = self._socialize(reflections, vectors)
+                        result = engine.end_round(messages)
+                if self.civilization_metrics:
+                    with span("round.metrics"):
+                        result.update(self.civilization.update(result.pop("civilization")))
+                if self.social_graph is not None:
+                    result["social_alignment"] = alignment
+                self.current_round += 1
+                if checkpoint_dir and checkpoint_every > 0 and self.current_round % checkpoint_every == 0:
+                    with span("round.checkpoint"):
+                        agents = engine.collect_agents() if self.workers > 1 else self.agents
+                        save_checkpoint(self, checkpoint_dir, agents)
+                
+                yield {"round": round_num, **result}
+        finally:
+            if self.workers > 1:
+                # 取回工作进程中的智能体状态（工作进程失联时无法取回，保留原对象）
+                try:
+                    if not engine.broken:
+                        self.agents = engine.collect_agents()
+                        for agent in self.agents:
+                            agent.embedding_model = self.embedding_model
+                finally:
+                    engine.close()
+    
+    def run(self, sinks: Optional[List[HistorySink]] = None,
+            keep_history: bool = True, checkpoint_dir: Optional[str] = None,
+            checkpoint_every: int = 0, profile: bool = False,
+            trace_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        运行全部剩余轮次；每轮记录依次写入 sinks，结束时关闭 sinks
+        keep_history=False 时不保留 self.history，长时间运行内存恒定
+        checkpoint_every > 0 时定期写检查点（历史记录不在检查点内，需要时用 JSONLSink(mode="a") 续写）
+        profile=True 时开启分阶段计时与计数器（结果见返回值 metrics）；trace_path 另导出 Chrome trace
+        """
         print(f"🌍 初始化 Civilis 模拟 ({self.num_agents} 智能体, {self.rounds} 轮)...")
+        sinks = list(sinks or [])
+        profiling = (instrumentation.profile(trace_path=trace_path) if profile or trace_path
+                     else contextlib.nullcontext())
+        cache_before = get_embedding_cache(self.model_path).stats()
+        first_round = self.current_round
+        start = time.perf_counter()
         
-        for round_num in range(self.rounds):
-            observations = [f"Round {round_num} observation" for _ in range(self.num_agents)]
-            reflections = []
-            for agent, obs in zip(self.agents, observations):
-                agent.observe(obs)
-                reflections.append(agent.reflect())
-            
-            self.history.append({
-                "round": round_num,
-                "observations": observations,
-                "reflections": reflections
-            })
+        with profiling as profiler:
+            try:
+                for record in self.iter_rounds(checkpoint_dir, checkpoint_every):
+                    with span("run.history"):
+                        if keep_history:
+                            self.history.append(record)
+                        for sink in sinks:
+                            sink.write(record)
+            finally:
+                for sink in sinks:
+                    sink.close()
         
         total_insights = sum(agent.insights for agent in self.agents)
         print(f"✅ 模拟完成! 总洞察数: {total_insights}")
@@ -131,10 +418,41 @@ class CivilisSimulation:
         return {
             "total_insights": total_insights,
             "agents_count": self.num_agents,
-            "rounds_completed": self.rounds,
+            "rounds_completed": self.current_round,
             "history_length": len(self.history),
-            "history": self.history
+            "history": self.history,
+            "metrics": self._run_metrics(time.perf_counter() - start, self.current_round - first_round,
+                                         cache_before, profiler)
+        }
+    
+    def _run_metrics(self, seconds: float, rounds: int, cache_before: Dict[str, Any],
+                     profiler: Optional[instrumentation.Profiler]) -> Dict[str, Any]:
+        """
+        本次 run() 的汇总指标：墙钟时间、模型加载时间、嵌入缓存命中（本次增量）、记忆规模
+        多进程模式下缓存统计只含主进程（社交传播编码），工作进程内的分阶段计时不计入
+        """
+        cache_after = get_embedding_cache(self.model_path).stats()
+        hits = cache_after["hits"] - cache_before["hits"]
+        misses = cache_after["misses"] - cache_before["misses"]
+        metrics = {
+            "wall_seconds": seconds,
+            "rounds": rounds,
+            "rounds_per_second": rounds / seconds if seconds > 0 else 0.0,
+            "model_load_seconds": self.model_load_seconds,
+            "embedding_cache": {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "entries": cache_after["entries"],
+            },
+            "memory": {
+                "insights": sum(len(agent.knowledge) for agent in self.agents),
+                "vector_bytes": sum(agent.knowledge.memory_usage() for agent in self.agents),
+            },
         }
+        if profiler is not None:
+            metrics.update(profiler.metrics())
+        return metrics
     
     def get_agent_insights(self, agent_id: int) -> int:
         if 0 <= agent_id < len(self.agents):
@@ -0,0 +1,82 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+模拟历史输出（Sink）
+每轮记录流式写出，长时间运行内存占用恒定
+支持：内存 | JSONL | 列式数值指标（.npz）
+"""
+import json
+from array import array
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+class HistorySink:
+    """轮次记录接收器基类"""
+    def write(self, record: Dict[str, Any]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MemorySink(HistorySink):
+    """保存全部记录于内存（小规模运行 / 测试）"""
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+
+    def write(self, record: Dict[str, Any]):
+        self.records.append(record)
+
+
+class JSONLSink(HistorySink):
+    """每轮一行 JSON，边跑边写盘"""
+    def __init__(self, path: str, mode: str = "w"):
+        self.path = path
+        self._file = open(path, mode, encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class ColumnarSink(HistorySink):
+    """
+    只保留每轮的数值字段（int/float），按列紧凑存储，close 时写入 .npz
+    文本列表（observations/reflections）被丢弃
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._columns: Dict[str, array] = {}
+
+    def write(self, record: Dict[str, Any]):
+        for name, value in record.items():
+            if isinstance(value, (bool, int, float, np.integer, np.floating)):
+                self._columns.setdefault(name, array("d")).append(float(value))
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: np.frombuffer(col, dtype=np.float64).copy() for name, col in self._columns.items()}
+
+    def close(self):
+        np.savez(self.path, **self.columns())
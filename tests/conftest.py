@@ -0,0 +1,69 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import zlib
+
+import numpy as np
+import pytest
+
+from civilis import core
+from civilis.embedding_cache import reset_embedding_caches
+from civilis.simulation import CivilisSimulation
+
+
+class StubModel:
+    """按文本哈希生成确定性向量，避免加载真实模型"""
+    def __init__(self, dim: int = 32):
+        self.dim = dim
+        self.calls = []
+
+    def encode(self, texts, batch_size=32):
+        if isinstance(texts, str):
+            return self._vec(texts)
+        self.calls.append(list(texts))
+        return np.stack([self._vec(t) for t in texts])
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def _vec(self, text):
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        return rng.standard_normal(self.dim).astype(np.float32)
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    reset_embedding_caches()
+    yield
+    reset_embedding_caches()
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    model = StubModel()
+    monkeypatch.setattr(core, "_embedding_model", model)
+    return model
+
+
+@pytest.fixture
+def stub_simulation(monkeypatch):
+    """CivilisSimulation 使用桩模型，不触发真实模型加载"""
+    model = StubModel()
+
+    def _init_embedding(self):
+        self.model_path = "stub"
+        self.embedding_model = model
+
+    monkeypatch.setattr(CivilisSimulation, "_init_embedding", _init_embedding)
+    return model
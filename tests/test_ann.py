@@ -0,0 +1,78 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from civilis.ann import IVFIndex
+from civilis.core import VectorMemory
+from civilis.embedding_backends import default_model_path
+from civilis.embedding_cache import get_embedding_cache
+
+
+def _clustered(rng, n, dim=32, clusters=50, noise=0.3):
+    centers = rng.standard_normal((clusters, dim))
+    return centers[rng.integers(0, clusters, n)] + noise * rng.standard_normal((n, dim))
+
+
+def _build(index, vectors):
+    memory = VectorMemory(max_insights=len(vectors), index=index)
+    for i, vec in enumerate(vectors):
+        memory.add_insight(f"item {i}", vector=vec)
+    return memory
+
+
+def _queries(rng, count):
+    cache = get_embedding_cache(default_model_path())
+    texts = [f"query {i}" for i in range(count)]
+    for text, vec in zip(texts, _clustered(rng, count)):
+        cache.put(text, vec)
+    return texts
+
+
+@pytest.mark.parametrize("nprobe, min_recall", [(4, 0.8), (12, 0.95)])
+def test_ivf_recall_against_exact(nprobe, min_recall):
+    rng = np.random.default_rng(0)
+    vectors = _clustered(rng, 4000)
+    exact = _build(None, vectors)
+    approx = _build(IVFIndex(nlist=32, nprobe=nprobe), vectors)
+    hits = total = 0
+    for text in _queries(rng, 100):
+        truth = {ins.content for ins in exact.query(text, top_k=10, threshold=-1.0)}
+        found = {ins.content for ins in approx.query(text, top_k=10, threshold=-1.0)}
+        hits += len(truth & found)
+        total += len(truth)
+    assert hits / total >= min_recall
+
+
+def test_full_probe_equals_exact():
+    rng = np.random.default_rng(1)
+    vectors = _clustered(rng, 1000)
+    exact = _build(None, vectors)
+    approx = _build(IVFIndex(nlist=16, nprobe=16), vectors)
+    for text in _queries(rng, 10):
+        assert ([i.content for i in exact.query(text, top_k=5, threshold=-1.0)]
+                == [i.content for i in approx.query(text, top_k=5, threshold=-1.0)])
+
+
+def test_assignments_follow_eviction():
+    rng = np.random.default_rng(2)
+    index = IVFIndex(nlist=8, nprobe=2, train_size=100)
+    memory = VectorMemory(max_insights=300, index=index)
+    for i, vec in enumerate(_clustered(rng, 2000)):
+        memory.add_insight(f"item {i}", vector=vec)
+    n = len(memory)
+    assert index.trained and n == 300
+    expected = np.argmax(memory._matrix[:n] @ index.centroids.T, axis=1)
+    np.testing.assert_array_equal(index._assign[:n], expected)
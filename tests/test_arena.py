@@ -0,0 +1,55 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from civilis.arena import InsightArena
+from civilis.core import CivilisAgent
+
+
+def _fill(arena):
+    for slot, memory in enumerate(arena.memories):
+        for i in range(slot % 5, 30, 2):
+            memory.add_insight(f"fact {i}")
+
+
+def test_query_all_matches_per_agent_queries(stub_model):
+    arena, reference = InsightArena(8, dim=32, capacity=10), InsightArena(8, dim=32, capacity=10)
+    _fill(arena)
+    _fill(reference)
+    batched = arena.query_all("fact 21", top_k=3, threshold=-1.0)
+    for slot in range(8):
+        expected = reference[slot].query("fact 21", top_k=3, threshold=-1.0)
+        assert [ins.content for ins in batched[slot]] == [ins.content for ins in expected]
+        assert len(arena[slot]) == 10
+
+
+def test_mask_and_threshold(stub_model):
+    arena = InsightArena(4, dim=32, capacity=5)
+    arena.broadcast("shared news", agent_mask=np.array([True, False, True, False]))
+    results = arena.query_all("shared news", top_k=1, threshold=0.99,
+                              agent_mask=np.array([True, True, False, False]), touch=True)
+    assert [len(r) for r in results] == [1, 0, 0, 0]
+    assert results[0][0].hits == 1
+    assert len(stub_model.calls) == 1
+
+
+def test_agent_uses_arena_memory(stub_model):
+    arena = InsightArena(2, dim=32, capacity=3)
+    agent = CivilisAgent("A1", memory=arena[1])
+    agent.learn("Fire is dangerous.")
+    assert arena.valid[1].sum() == 1 and arena.valid[0].sum() == 0
+    with pytest.raises(ValueError):
+        arena[0].add_insight("wrong size", vector=np.ones(16))
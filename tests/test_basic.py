@@ -21,16 +21,18 @@ def test_agent_creation():
     assert agent.id == "A001"
     assert len(agent.memory.insights) == 0
 
-def test_agent_learning():
+def test_agent_learning(stub_model):
     agent = CivilisAgent("A002")
     agent.learn("Fire is dangerous.", "Xun")
     assert len(agent.memory.insights) == 1
     assert agent.memory.insights[0].content == "Fire is dangerous."
 
-def test_simulation_run():
+def test_simulation_run(stub_simulation):
     sim = CivilisSimulation(num_agents=10, rounds=10, seed=123)
-    history = sim.run()
-    assert len(history) > 0
+    result = sim.run()
+    assert result["rounds_completed"] == 10
+    history = result["history"]
+    assert len(history) == 10
     assert "round" in history[0]
     assert "total_insights" in history[0]
-    assert history[-1]["round"] == 10
\ No newline at end of file
+    assert history[-1]["round"] == 9
\ No newline at end of file
@@ -0,0 +1,60 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import json
+import os
+
+import numpy as np
+
+from civilis.benchmark import StubEncoder, compare, main, run_benchmarks
+
+
+def test_stub_encoder_is_deterministic():
+    encoder = StubEncoder(dim=16)
+    batch = encoder.encode(["a", "b"])
+    np.testing.assert_array_equal(batch[0], StubEncoder(dim=16).encode("a"))
+    assert batch.shape == (2, 16)
+    assert abs(np.linalg.norm(batch[1]) - 1.0) < 1e-5
+
+
+def test_quick_suite_report_shape():
+    previous = os.environ.get("CIVILIS_EMBEDDING_MODEL")
+    report = run_benchmarks("quick", repeat=1, dim=16)
+    assert os.environ.get("CIVILIS_EMBEDDING_MODEL") == previous
+    assert report["meta"]["suite"] == "quick"
+    names = {case.split("[")[0] for case in report["results"]}
+    assert names == {"vector_memory.add_insight", "vector_memory.query", "vector_memory.query_many",
+                     "agent.learn", "agent.learn_many", "simulation.run"}
+    for result in report["results"].values():
+        assert result["us_per_op"] > 0 and result["ops"] > 0
+
+
+def test_compare_flags_regressions(tmp_path, capsys):
+    baseline = {"results": {"a": {"us_per_op": 10.0}, "b": {"us_per_op": 10.0},
+                            "gone": {"us_per_op": 1.0}}}
+    current = copy.deepcopy(baseline)
+    current["results"]["a"]["us_per_op"] = 13.0
+    current["results"]["b"]["us_per_op"] = 7.0
+    del current["results"]["gone"]
+    rows = {row["case"]: row["status"] for row in compare(baseline, current, tolerance=0.2)}
+    assert rows == {"a": "regression", "b": "faster"}
+
+    paths = []
+    for name, report in (("base.json", baseline), ("cur.json", current)):
+        (tmp_path / name).write_text(json.dumps(report), encoding="utf-8")
+        paths.append(str(tmp_path / name))
+    assert main(["compare", *paths]) == 1
+    assert main(["compare", *paths, "--tolerance", "0.5"]) == 0
+    assert "regression" in capsys.readouterr().out
@@ -0,0 +1,144 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import numpy as np
+import pytest
+
+from civilis import checkpoint
+from civilis.checkpoint import read_manifest
+from civilis.simulation import CivilisSimulation
+
+
+def _state(sim):
+    agents = []
+    for agent in sim.agents:
+        k = agent.knowledge
+        n = len(k)
+        agents.append((
+            agent.insights, agent.memory, agent.rng.bit_generator.state,
+            [(i.content, i.strength, i.hits, i.used, i.source_module, i.vector.tobytes()) for i in k.insights],
+            k._use_clock,
+            k._matrix[:n].tobytes(), k._valid[:n].tobytes(),
+        ))
+    culture = None if sim.culture is None else sim.culture.tobytes()
+    return agents, culture, sim.rng.bit_generator.state, sim.current_round
+
+
+def _interrupt(sim, stop, **kwargs):
+    for record in sim.iter_rounds(**kwargs):
+        if record["round"] + 1 == stop:
+            break
+
+
+def test_resume_matches_uninterrupted_run(stub_simulation, tmp_path):
+    # max_insights 较小，确保恢复后仍会触发淘汰
+    reference = CivilisSimulation(num_agents=6, rounds=12, seed=3, social_degree=4)
+    for agent in reference.agents:
+        agent.knowledge.max_insights = 9
+    expected = list(reference.iter_rounds())
+
+    crashed = CivilisSimulation(num_agents=6, rounds=12, seed=3, social_degree=4)
+    for agent in crashed.agents:
+        agent.knowledge.max_insights = 9
+    _interrupt(crashed, stop=9, checkpoint_dir=str(tmp_path / "ckpt"), checkpoint_every=4)
+    assert read_manifest(str(tmp_path / "ckpt"))["current_round"] == 8
+
+    resumed = CivilisSimulation.from_checkpoint(str(tmp_path / "ckpt"))
+    assert resumed.current_round == 8
+    records = list(resumed.iter_rounds())
+    assert records == expected[8:]
+    assert _state(resumed) == _state(reference)
+
+
+def test_checkpoint_layout_and_overwrite(stub_simulation, tmp_path):
+    sim = CivilisSimulation(num_agents=3, rounds=4, seed=1)
+    path = tmp_path / "ckpt"
+    sim.run(checkpoint_dir=str(path), checkpoint_every=2)
+    manifest = json.loads((path / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["current_round"] == 4
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["ckpt"]
+    vectors = np.load(path / "insight_matrix.npy", mmap_mode="r")
+    assert isinstance(vectors, np.memmap) and vectors.shape == (3 * 8, 32)
+    # 每个智能体的相同文本在字符串表中只存一份
+    offsets = np.load(path / "string_offsets.npy")
+    assert len(offsets) - 1 < vectors.shape[0]
+
+
+def test_crash_between_renames_keeps_previous_checkpoint(stub_simulation, tmp_path, monkeypatch):
+    sim = CivilisSimulation(num_agents=3, rounds=4, seed=1)
+    path = tmp_path / "ckpt"
+    _interrupt(sim, stop=2, checkpoint_dir=str(path), checkpoint_every=2)
+    replace = checkpoint.os.replace
+
+    def crash_on_install(src, dst):
+        if ".tmp-" in str(src):
+            raise KeyboardInterrupt("crash")
+        replace(src, dst)
+
+    # 旧检查点已移开、新检查点尚未就位时崩溃
+    monkeypatch.setattr(checkpoint.os, "replace", crash_on_install)
+    with pytest.raises(KeyboardInterrupt):
+        list(sim.iter_rounds(checkpoint_dir=str(path), checkpoint_every=2))
+    monkeypatch.setattr(checkpoint.os, "replace", replace)
+    assert not path.exists()
+
+    resumed = CivilisSimulation.from_checkpoint(str(path))
+    assert resumed.current_round == 2
+    assert sorted(p.name for p in tmp_path.iterdir() if ".old-" in p.name) == []
+    resumed.run(checkpoint_dir=str(path), checkpoint_every=2)
+    assert read_manifest(str(path))["current_round"] == 4
+
+
+def test_resume_can_extend_rounds(stub_simulation, tmp_path):
+    sim = CivilisSimulation(num_agents=2, rounds=3, seed=2)
+    sim.run()
+    sim.save_checkpoint(str(tmp_path / "ckpt"))
+    resumed = CivilisSimulation.from_checkpoint(str(tmp_path / "ckpt"), rounds=5)
+    assert resumed.run()["rounds_completed"] == 5
+    assert resumed.get_agent_insights(1) == 5
+
+
+def test_rejects_foreign_directory(tmp_path):
+    (tmp_path / "manifest.json").write_text('{"format": "other"}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_manifest(str(tmp_path))
+
+
+def test_compact_storage_roundtrip(stub_simulation, tmp_path):
+    sim = CivilisSimulation(num_agents=3, rounds=5, seed=4, storage="int8")
+    sim.run(checkpoint_dir=str(tmp_path / "ckpt"), checkpoint_every=5)
+    assert not (tmp_path / "ckpt" / "insight_vectors.npy").exists()
+    resumed = CivilisSimulation.from_checkpoint(str(tmp_path / "ckpt"))
+    for before, after in zip(sim.agents, resumed.agents):
+        n = len(before.knowledge)
+        assert after.knowledge.storage == "int8"
+        np.testing.assert_array_equal(after.knowledge._matrix[:n], before.knowledge._matrix[:n])
+        np.testing.assert_array_equal(after.knowledge._scales[:n], before.knowledge._scales[:n])
+
+
+def test_resume_with_merged_insights(stub_simulation, tmp_path):
+    reference = CivilisSimulation(num_agents=3, rounds=8, seed=4, merge_threshold=0.3)
+    expected = list(reference.iter_rounds())
+    assert any(agent.knowledge._aliases for agent in reference.agents)
+
+    crashed = CivilisSimulation(num_agents=3, rounds=8, seed=4, merge_threshold=0.3)
+    _interrupt(crashed, stop=5, checkpoint_dir=str(tmp_path / "ckpt"), checkpoint_every=5)
+    resumed = CivilisSimulation.from_checkpoint(str(tmp_path / "ckpt"))
+    assert resumed.merge_threshold == 0.3
+    assert list(resumed.iter_rounds()) == expected[5:]
+    assert _state(resumed) == _state(reference)
+    assert [(a.knowledge._alias_groups, [i.members for i in a.knowledge.insights]) for a in resumed.agents] == \
+        [(a.knowledge._alias_groups, [i.members for i in a.knowledge.insights]) for a in reference.agents]
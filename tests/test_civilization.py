@@ -0,0 +1,98 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from civilis.civilization import CivilizationMetrics, CivilizationStats
+from civilis.core import VectorMemory
+from civilis.simulation import CivilisSimulation
+
+
+def _unit(v):
+    return v / np.linalg.norm(v)
+
+
+def _naive(memories):
+    """逐条全量重算：全体单位向量均值、各记忆质心方向的两两余弦"""
+    rows = [m._unit_rows(i).astype(np.float64) for m in memories for i in range(len(m)) if m._valid[i]]
+    mean = np.mean(rows, axis=0)
+    directions = [_unit(np.sum([m._unit_rows(i) for i in range(len(m))], axis=0)) for m in memories if len(m)]
+    pairs = [a @ b for i, a in enumerate(directions) for b in directions[i + 1:]]
+    return 1.0 - mean @ mean, float(np.mean(pairs))
+
+
+@pytest.mark.parametrize("storage", ["float32", "int8"])
+def test_incremental_matches_full_recompute(storage):
+    rng = np.random.default_rng(0)
+    memories = [VectorMemory(max_insights=5, storage=storage, rerank=0) for _ in range(4)]
+    stats = CivilizationStats(memories)
+    metrics = CivilizationMetrics()
+    for round_num in range(6):
+        for i, memory in enumerate(memories):
+            for j in range(3):
+                memory.add_insight(f"{round_num}-{i}-{j}", vector=rng.standard_normal(16) + i)
+        result = metrics.update([stats.round_partial()])
+        diversity, consensus = _naive(memories)
+        assert result["diversity"] == pytest.approx(diversity, abs=1e-6)
+        assert result["consensus"] == pytest.approx(consensus, abs=1e-6)
+        assert result["innovation"] == 12
+
+
+def test_evictions_cancel_exactly():
+    rng = np.random.default_rng(1)
+    memory = VectorMemory(max_insights=3, storage="int8", rerank=0)
+    stats = CivilizationStats([memory])
+    for i in range(20):
+        memory.add_insight(f"t{i}", vector=rng.standard_normal(8))
+    stats.round_partial()
+    fresh = CivilizationStats([memory])
+    np.testing.assert_array_equal(stats.agent_sums, fresh.agent_sums)
+    np.testing.assert_array_equal(stats.direction_sum, fresh.direction_sum)
+
+
+def test_innovation_and_novelty():
+    memories = [VectorMemory(), VectorMemory()]
+    stats = CivilizationStats(memories)
+    metrics = CivilizationMetrics()
+    memories[0].add_insight("a", vector=np.array([1.0, 0.0]))
+    memories[1].add_insight("a", vector=np.array([1.0, 0.0]))
+    first = metrics.update([stats.round_partial()])
+    assert first["innovation"] == 1 and first["novelty"] == 1.0
+    assert first["diversity"] == pytest.approx(0.0) and first["consensus"] == pytest.approx(1.0)
+
+    memories[0].add_insight("b", vector=np.array([0.0, 1.0]))
+    memories[1].add_insight("a-again", vector=np.array([1.0, 0.0]))
+    second = metrics.update([stats.round_partial()])
+    assert second["innovation"] == 2
+    # 新洞察与轮初质心 (1, 0) 的余弦距离：1 和 0 的均值
+    assert second["novelty"] == pytest.approx(0.5)
+    assert metrics.update([stats.round_partial()])["innovation"] == 0
+
+
+def test_simulation_records_metrics(stub_simulation):
+    sim = CivilisSimulation(num_agents=4, rounds=3, seed=2)
+    records = list(sim.iter_rounds())
+    assert [r["innovation"] for r in records] == [2, 2, 2]
+    assert all(0.0 <= r["diversity"] <= 1.0 and "civilization" not in r for r in records)
+    diversity, consensus = _naive([agent.knowledge for agent in sim.agents])
+    assert records[-1]["diversity"] == pytest.approx(diversity, abs=1e-6)
+    assert records[-1]["consensus"] == pytest.approx(consensus, abs=1e-6)
+
+
+def test_metrics_can_be_disabled(stub_simulation):
+    sim = CivilisSimulation(num_agents=2, rounds=2, seed=2, civilization_metrics=False)
+    record = next(sim.iter_rounds())
+    assert "diversity" not in record and "civilization" not in record
+    assert all(agent.knowledge.observer is None for agent in sim.agents)
@@ -0,0 +1,74 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+
+import numpy as np
+import pytest
+
+from civilis.embedding_backends import (
+    HashingEmbeddingBackend,
+    clear_embedding_backends,
+    get_embedding_backend,
+    load_embedding_backend,
+)
+from civilis.simulation import CivilisSimulation
+
+
+def test_hashing_backend_is_deterministic_and_normalized():
+    backend = get_embedding_backend("hashing:128")
+    assert isinstance(backend, HashingEmbeddingBackend)
+    assert backend.get_dimension() == 128
+    vectors = backend.encode(["Fire is dangerous.", "fire is DANGEROUS", "Bananas are yellow."])
+    assert vectors.shape == (3, 128)
+    assert vectors.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_allclose(vectors[0], HashingEmbeddingBackend(dim=128).encode("Fire is dangerous."))
+    assert vectors[0] @ vectors[1] > 0.8 > vectors[0] @ vectors[2]
+
+
+@pytest.mark.parametrize("model_path", ["hashing:abc", "hashing:-1", "hashing:0", "hashing:"])
+def test_hashing_model_path_is_validated(model_path):
+    with pytest.raises(ValueError, match="hashing model path"):
+        get_embedding_backend(model_path)
+
+
+def test_batch_size_does_not_change_result():
+    backend = HashingEmbeddingBackend()
+    texts = [f"Round {i} observation" for i in range(50)]
+    np.testing.assert_array_equal(backend.encode(texts), backend.encode(texts, batch_size=7))
+
+
+def test_unsupported_backend_rejected():
+    with pytest.raises(ValueError):
+        get_embedding_backend("foo", backend_type="ollama")
+
+
+def test_simulation_runs_offline(monkeypatch):
+    monkeypatch.delenv("CIVILIS_EMBEDDING_MODEL", raising=False)
+    monkeypatch.setenv("CIVILIS_OFFLINE", "1")
+    sim = CivilisSimulation(num_agents=4, rounds=3, seed=7)
+    assert isinstance(sim.embedding_model, HashingEmbeddingBackend)
+    assert sim.run()["rounds_completed"] == 3
+    assert "sentence_transformers" not in sys.modules
+
+
+def test_registry_loads_each_model_once(monkeypatch):
+    monkeypatch.setenv("CIVILIS_EMBEDDING_MODEL", "hashing:64")
+    clear_embedding_backends()
+    first = CivilisSimulation(num_agents=2, rounds=1, seed=1)
+    second = CivilisSimulation(num_agents=2, rounds=1, seed=2)
+    assert first.embedding_model is second.embedding_model
+    assert load_embedding_backend() is first.embedding_model
+    assert load_embedding_backend("hashing:32") is not first.embedding_model
@@ -0,0 +1,79 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+from civilis.embedding_cache import EmbeddingCache
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t), t.count("a"), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_encode_dedupes_and_counts():
+    cache = EmbeddingCache(max_entries=10)
+    encoder = CountingEncoder()
+    out = cache.encode(["banana", "apple", "banana"], encoder)
+    assert out.shape == (3, 3)
+    assert encoder.calls == [["banana", "apple"]]
+    np.testing.assert_array_equal(out[0], out[2])
+
+    single = cache.encode("apple", encoder)
+    assert single.shape == (3,)
+    assert len(encoder.calls) == 1
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_lru_eviction():
+    cache = EmbeddingCache(max_entries=2)
+    encoder = CountingEncoder()
+    cache.encode(["a", "b"], encoder)
+    cache.encode("a", encoder)          # a 变为最近使用
+    cache.encode("c", encoder)          # 淘汰 b
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+
+
+def test_disk_store_persists_across_instances(tmp_path):
+    encoder = CountingEncoder()
+    first = EmbeddingCache(max_entries=10, cache_dir=str(tmp_path))
+    expected = first.encode(["alpha", "beta"], encoder)
+    first.close()
+
+    second = EmbeddingCache(max_entries=10, cache_dir=str(tmp_path))
+    out = second.encode(["beta", "alpha"], encoder)
+    assert len(encoder.calls) == 1
+    np.testing.assert_array_equal(out, expected[::-1])
+    assert second.stats()["disk_hits"] == 2
+
+
+def test_disk_store_shared_between_writers(tmp_path):
+    encoder = CountingEncoder()
+    first = EmbeddingCache(cache_dir=str(tmp_path))
+    second = EmbeddingCache(cache_dir=str(tmp_path))
+    first.encode(["alpha"], encoder)
+    second.encode(["beta"], encoder)
+    # 各自写入的行不会互相覆盖，且对方立即可见
+    np.testing.assert_array_equal(first.encode("beta", encoder), [4, 1, 1])
+    np.testing.assert_array_equal(second.encode("alpha", encoder), [5, 2, 1])
+    assert len(encoder.calls) == 2
+
+    third = EmbeddingCache(cache_dir=str(tmp_path))
+    assert third.stats()["disk_entries"] == 2
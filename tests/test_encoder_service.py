@@ -0,0 +1,112 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from civilis import core
+from civilis.core import CivilisAgent
+from civilis.encoder_service import EncoderService
+
+
+class SlowModel:
+    """每次调用固定耗时，模拟单次推理的启动开销"""
+    def __init__(self, inner, delay=0.005):
+        self.inner = inner
+        self.delay = delay
+        self.calls = []
+
+    def encode(self, texts, batch_size=32):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        return self.inner.encode(texts)
+
+
+@pytest.fixture
+def service(stub_model, monkeypatch):
+    slow = SlowModel(stub_model)
+    monkeypatch.setattr(core, "_embedding_model", slow)
+    svc = EncoderService(max_batch_size=32, max_wait_ms=5)
+    previous = core.use_encoder_service(svc)
+    yield svc, slow
+    core.use_encoder_service(previous)
+    svc.close()
+
+
+def test_threaded_learn_is_batched(service, stub_model):
+    svc, slow = service
+    agents = [CivilisAgent(f"A{i}") for i in range(16)]
+    start = threading.Barrier(len(agents))
+
+    def work(agent):
+        start.wait()
+        for j in range(4):
+            agent.learn(f"{agent.id} fact {j}")
+
+    threads = [threading.Thread(target=work, args=(agent,)) for agent in agents]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(len(c) for c in slow.calls) == 64
+    assert len(slow.calls) < 32
+    assert svc.stats()["mean_batch_size"] > 2
+    ins = agents[3].memory.insights[0]
+    np.testing.assert_allclose(ins.vector, stub_model._vec("A3 fact 0"))
+
+
+def test_async_learn_is_batched(service, stub_model):
+    svc, slow = service
+    agents = [CivilisAgent(f"B{i}") for i in range(40)]
+
+    async def main():
+        return await asyncio.gather(*(agent.ainteract(f"hello from {agent.id}") for agent in agents))
+
+    replies = asyncio.run(main())
+    assert replies[5] == "[B5] Acknowledged."
+    assert all(len(agent.memory) == 1 for agent in agents)
+    assert sum(len(c) for c in slow.calls) == 40
+    assert len(slow.calls) <= 4
+
+
+def test_size_limit_and_dedupe(stub_model):
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return stub_model.encode(texts)
+
+    with EncoderService(encode, max_batch_size=4, max_wait_ms=50) as svc:
+        futures = [svc.submit(t) for t in ["a", "b", "a", "c", "d", "e"]]
+        vectors = [f.result(timeout=5) for f in futures]
+    np.testing.assert_array_equal(vectors[0], vectors[2])
+    assert all(len(set(batch)) <= 4 for batch in calls)
+    assert sorted(t for batch in calls for t in batch) == ["a", "b", "c", "d", "e"]
+    with pytest.raises(RuntimeError):
+        svc.submit("late")
+
+
+def test_errors_reach_every_caller():
+    def fail(texts):
+        raise ValueError("boom")
+
+    with EncoderService(fail, max_wait_ms=20) as svc:
+        futures = [svc.submit("x"), svc.submit_many(["y", "z"])]
+        for future in futures:
+            with pytest.raises(ValueError, match="boom"):
+                future.result(timeout=5)
@@ -0,0 +1,38 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+
+from civilis.ensemble import EnsembleRunner, expand_grid, main, summarize
+
+
+def test_grid_and_summary():
+    configs = expand_grid(seeds=[1, 2], num_agents=[3, 5], rounds=[4])
+    assert len(configs) == 4
+    rows = EnsembleRunner(configs, workers=2, model_path="hashing:32").run()
+    assert [(r["num_agents"], r["seed"]) for r in rows] == [(3, 1), (3, 2), (5, 1), (5, 2)]
+    assert rows[2]["total_insights"] == 5 * 4
+
+    summary = summarize(rows)
+    assert [(s["num_agents"], s["runs"]) for s in summary] == [(3, 2), (5, 2)]
+    assert summary[0]["total_insights_mean"] == 12.0
+
+
+def test_cli_writes_csv(tmp_path, capsys):
+    out = tmp_path / "runs.csv"
+    main(["--seeds", "1", "--agents", "2", "--rounds", "3", "--model", "hashing:16", "--csv", str(out)])
+    with open(out, encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["total_insights"] == "6"
+    assert "total_insights_mean" in capsys.readouterr().out
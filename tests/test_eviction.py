@@ -0,0 +1,105 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+
+import pytest
+
+from civilis.core import VectorMemory
+from civilis.eviction import IndexedHeap, get_eviction_policy
+
+
+def test_indexed_heap_matches_sorted_reference():
+    rnd = random.Random(0)
+    heap, reference = IndexedHeap(), {}
+    for step in range(2000):
+        op = rnd.random()
+        if op < 0.5 or not reference:
+            handle = f"h{step}"
+            reference[handle] = (rnd.random(), step)
+            heap.push(handle, reference[handle])
+        elif op < 0.8:
+            handle = rnd.choice(list(reference))
+            reference[handle] = (rnd.random(), step)
+            heap.update(handle, reference[handle])
+        else:
+            handle = rnd.choice(list(reference))
+            del reference[handle]
+            heap.remove(handle)
+        assert heap.peek() == min(reference, key=reference.get)
+    assert len(heap) == len(reference)
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        get_eviction_policy("random")
+
+
+def test_strength_policy_keeps_reinforced_insights(stub_model):
+    memory = VectorMemory(max_insights=5)
+    for i in range(5):
+        memory.add_insight(f"core {i}")
+        memory.add_insight(f"core {i}")
+    for i in range(20):
+        memory.add_insight(f"noise {i}")
+    assert {ins.content for ins in memory.insights} >= {f"core {i}" for i in range(5)}
+    assert len(memory) == 5
+
+
+def test_lru_policy_keeps_recently_queried(stub_model):
+    memory = VectorMemory(max_insights=3, eviction="lru")
+    for i in range(3):
+        memory.add_insight(f"fact {i}")
+    memory.query("fact 0", top_k=1, threshold=0.99)
+    memory.add_insight("fact 3")
+    assert {ins.content for ins in memory.insights} == {"fact 0", "fact 2", "fact 3"}
+
+
+def test_lfu_policy_counts_hits(stub_model):
+    memory = VectorMemory(max_insights=2, eviction="lfu")
+    memory.add_insight("popular")
+    memory.add_insight("ignored")
+    for _ in range(3):
+        memory.query("popular", top_k=1, threshold=0.99)
+    memory.add_insight("ignored")
+    memory.add_insight("newcomer")
+    assert {ins.content for ins in memory.insights} == {"popular", "ignored"}
+
+
+def test_query_touch_follows_policy(stub_model):
+    memory = VectorMemory()
+    memory.add_insight("fact")
+    before = memory.insights[0].last_used
+    memory.query("fact", top_k=1, threshold=0.99)
+    assert memory.insights[0].hits == 0 and memory.insights[0].last_used == before
+    memory.query("fact", top_k=1, threshold=0.99, touch=True)
+    assert memory.insights[0].hits == 1
+
+    lru = VectorMemory(eviction="lru")
+    lru.add_insight("fact")
+    lru.query_many(["fact"], top_k=1, threshold=0.99)
+    lru.query("fact", top_k=1, threshold=0.99, touch=False)
+    assert lru.insights[0].hits == 1
+
+
+def test_lru_order_does_not_depend_on_clock_resolution(stub_model, monkeypatch):
+    # 墙钟冻结（粗粒度时钟同一刻度内）：刚命中的洞察仍是最近使用的
+    from civilis import core
+    monkeypatch.setattr(core.time, "time", lambda: 1000.0)
+    memory = VectorMemory(max_insights=3, eviction="lru")
+    for i in range(3):
+        memory.add_insight(f"fact {i}")
+    memory.query("fact 0", top_k=1, threshold=0.99)
+    memory.add_insight("fact 3")
+    assert {ins.content for ins in memory.insights} == {"fact 0", "fact 2", "fact 3"}
@@ -0,0 +1,73 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+from civilis import instrumentation
+from civilis.core import VectorMemory
+from civilis.simulation import CivilisSimulation
+
+
+def test_disabled_is_a_no_op():
+    assert instrumentation.get_profiler() is None
+    assert instrumentation.span("x") is instrumentation.span("y")
+    instrumentation.count("x")
+    assert instrumentation.get_profiler() is None
+
+
+def test_profile_scope_records_memory_phases(stub_model):
+    memory = VectorMemory(max_insights=2)
+    with instrumentation.profile() as prof:
+        with instrumentation.profile() as inner:
+            assert inner is prof
+        for text in ["a", "b", "b", "c"]:
+            memory.add_insight(text)
+        memory.query("b", top_k=1, threshold=0.0)
+    assert instrumentation.get_profiler() is None
+    metrics = prof.metrics()
+    assert metrics["timers"]["memory.evict"]["count"] == 1
+    assert metrics["timers"]["memory.score"]["count"] == 1
+    assert metrics["timers"]["memory.encode"]["count"] == 4
+    assert metrics["counters"]["memory.inserted"] == 3
+    assert metrics["counters"]["memory.reinforced"] == 1
+    assert metrics["counters"]["embedding_cache.misses"] == 3
+
+
+def test_run_metrics_and_chrome_trace(monkeypatch, tmp_path):
+    monkeypatch.setenv("CIVILIS_EMBEDDING_MODEL", "hashing:32")
+    sim = CivilisSimulation(num_agents=4, rounds=3, seed=1, social_degree=4)
+    trace = tmp_path / "trace.json"
+    metrics = sim.run(trace_path=str(trace))["metrics"]
+    assert metrics["rounds"] == 3
+    for phase in ("round.step", "round.collect", "round.encode", "round.deliver",
+                  "round.socialize", "run.history", "embedding.encode"):
+        assert metrics["timers"][phase]["count"] >= 3
+    assert metrics["timers"]["round.step"]["count"] == 3
+    # 每轮 1 条观察 + 1 条反思为新文本；社交传播复用分片的向量，不再查缓存
+    assert metrics["counters"]["embedding.sentences"] == 6
+    assert metrics["embedding_cache"]["misses"] == 6
+    assert metrics["embedding_cache"]["hits"] == 0
+    assert metrics["memory"]["insights"] == 4 * 6
+    assert metrics["memory"]["vector_bytes"] > 0
+
+    events = json.loads(trace.read_text(encoding="utf-8"))["traceEvents"]
+    assert {e["ph"] for e in events} == {"X"}
+    assert sum(e["name"] == "round.step" for e in events) == 3
+
+
+def test_run_metrics_without_profiling(stub_simulation):
+    metrics = CivilisSimulation(num_agents=2, rounds=2, seed=1).run()["metrics"]
+    assert "timers" not in metrics
+    assert metrics["rounds"] == 2 and metrics["wall_seconds"] > 0
+    assert metrics["embedding_cache"]["misses"] == 4
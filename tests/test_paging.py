@@ -0,0 +1,158 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import numpy as np
+import pytest
+
+from civilis import paging
+from civilis.core import CivilisAgent, VectorMemory
+from civilis.paging import PagedAgentStore
+
+
+def _fill(memory, agent_id, n=6):
+    rng = np.random.default_rng(agent_id)
+    for i in range(n):
+        memory.add_insight(f"agent {agent_id} fact {i % 4}", vector=rng.standard_normal(16))
+
+
+def _state(memory):
+    n = len(memory)
+    return ([(i.content, i.strength, i.hits, i.members, i.last_used, i.source_module,
+              None if i.vector is None else i.vector.tobytes()) for i in memory.insights],
+            memory._matrix[:n].tobytes(), memory._valid[:n].tobytes(),
+            memory._evictor._next_seq, [memory._evictor.seq(i.content) for i in memory.insights],
+            memory._alias_groups, None if memory._exact is None else memory._exact[:n].tobytes())
+
+
+@pytest.mark.parametrize("storage, rerank", [("float32", 0), ("int8", 0), ("int8", 2)])
+def test_paged_agents_roundtrip(tmp_path, storage, rerank):
+    reference = {}
+    with PagedAgentStore(str(tmp_path), max_resident=3, shard_size=4, max_insights=5,
+                         storage=storage, merge_threshold=0.6, rerank=rerank) as store:
+        for agent_id in range(10):
+            memory = store.get(agent_id).memory
+            _fill(memory, agent_id)
+            memory.query(np.ones(16), top_k=1, threshold=-1.0)
+            mirror = VectorMemory(max_insights=5, storage=storage, merge_threshold=0.6, rerank=rerank)
+            _fill(mirror, agent_id)
+            mirror.query(np.ones(16), top_k=1, threshold=-1.0)
+            reference[agent_id] = mirror
+            assert store.stats()["resident"] <= 3
+        assert len(store) == 10
+
+    store = PagedAgentStore(str(tmp_path), max_resident=3, rerank=rerank)
+    assert store.storage == storage and store.shard_size == 4
+    for agent_id in (9, 0, 5):
+        agent = store.get(agent_id, readonly=True)
+        assert isinstance(agent, CivilisAgent) and agent.id == agent_id
+        assert _state(agent.memory)[1:] == _state(reference[agent_id])[1:]
+        assert [i.content for i in agent.memory.insights] == [i.content for i in reference[agent_id].insights]
+    assert store.stats()["loads"] == 3 and 42 not in store
+
+
+def test_lru_budget_and_write_back(tmp_path):
+    store = PagedAgentStore(str(tmp_path), max_resident=2, shard_size=8)
+    for agent_id in range(3):
+        store.get(agent_id)
+    # 0 被换出并回写；再次访问从磁盘载入
+    assert store.stats()["evictions"] == 1 and store.stats()["writebacks"] == 1
+    store.get(0).memory.add_insight("fresh", vector=np.ones(4))
+    assert store.stats()["loads"] == 1 and store.stats()["writebacks"] == 2
+    store.evict_all()
+    assert [i.content for i in store.get(0).memory.insights] == ["fresh"]
+    # 只读访问的修改不会回写
+    store.get(1, readonly=True).memory.add_insight("lost", vector=np.ones(4))
+    store.evict_all()
+    assert len(store.get(1).memory) == 0
+
+
+def test_layout_mismatch_and_meta_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(paging, "_COMPACT_MIN_BYTES", 0)
+    store = PagedAgentStore(str(tmp_path), max_resident=1, shard_size=2)
+    for round_num in range(20):
+        for agent_id in range(2):
+            store.get(agent_id).memory.add_insight(f"r{round_num}", vector=np.ones(4) + round_num)
+    store.close()
+    meta = os.path.getsize(tmp_path / "shard-00000" / "meta.bin")
+    index = np.load(tmp_path / "shard-00000" / "index.npy")
+    assert meta < 2 * index[:, 1].sum() + 1
+    assert len(PagedAgentStore(str(tmp_path)).get(1).memory) == 20
+    with pytest.raises(ValueError):
+        PagedAgentStore(str(tmp_path), shard_size=4)
+
+
+def test_failed_write_back_keeps_agent(tmp_path):
+    store = PagedAgentStore(str(tmp_path), max_resident=1, max_insights=5)
+    agent = store.get(0)
+    agent.memory.add_insight("kept", vector=np.ones(4))
+    agent.memory.max_insights = 10
+    with pytest.raises(ValueError):
+        store.get(1)
+    # 回写失败：0 仍常驻且为脏，修正后可正常换出
+    assert store._resident[0] is agent and store.stats()["dirty"] == 2
+    agent.memory.max_insights = 5
+    store.evict_all()
+    assert [i.content for i in store.get(0).memory.insights] == ["kept"]
+
+
+def test_reopen_counts_garbage_and_detects_corruption(tmp_path):
+    with PagedAgentStore(str(tmp_path), shard_size=2) as store:
+        for value in range(3):
+            store.get(0).memory.add_insight(f"v{value}", vector=np.ones(4))
+            store.flush()
+    shard_dir = tmp_path / "shard-00000"
+    live = int(np.load(shard_dir / "index.npy")[:, 1].sum())
+    store = PagedAgentStore(str(tmp_path))
+    assert store._shard(0, create=False).garbage == os.path.getsize(shard_dir / "meta.bin") - live > 0
+    # 当前缓冲区的向量被改写（与元数据不符）
+    shard = store._shard(0, create=False)
+    shard.matrix[0, shard.index[0, 2], 0] += 1.0
+    with pytest.raises(ValueError, match="corrupted vectors"):
+        store.get(0)
+
+
+def test_interrupted_write_keeps_previous_version(tmp_path, monkeypatch):
+    with PagedAgentStore(str(tmp_path), shard_size=2) as store:
+        store.get(0).memory.add_insight("old", vector=np.ones(4))
+    store = PagedAgentStore(str(tmp_path), max_resident=1)
+    memory = store.get(0).memory
+    memory.add_insight("new", vector=-np.ones(4))
+    memory._matrix[0] *= -1
+
+    # 新版本的向量已写入另一份缓冲区，元数据写入前崩溃
+    def crash(*args, **kwargs):
+        raise OSError("disk gone")
+
+    monkeypatch.setattr(paging.json, "dumps", crash)
+    with pytest.raises(OSError):
+        store.flush()
+    monkeypatch.undo()
+    reopened = PagedAgentStore(str(tmp_path))
+    memory = reopened.get(0).memory
+    assert [i.content for i in memory.insights] == ["old"]
+    np.testing.assert_allclose(memory._matrix[0], np.ones(4) / 2)
+    # 之后的写入照常切换缓冲区
+    memory.add_insight("newer", vector=np.ones(4) * [1, 1, 1, -1])
+    reopened.close()
+    assert [i.content for i in PagedAgentStore(str(tmp_path)).get(0).memory.insights] == ["old", "newer"]
+
+
+def test_len_skips_shard_without_index(tmp_path):
+    store = PagedAgentStore(str(tmp_path), shard_size=2)
+    store.get(0)
+    store.flush()
+    os.makedirs(tmp_path / "shard-00003")
+    assert len(store) == 1
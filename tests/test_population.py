@@ -0,0 +1,88 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+
+import numpy as np
+import pytest
+
+from civilis.population import AgentPopulation
+from civilis.simulation import CivilisAgent, CivilisSimulation
+
+
+def _agents(n):
+    return [CivilisAgent(i, None, np.random.default_rng(i)) for i in range(n)]
+
+
+def test_vectorized_step_matches_unbound_agents():
+    bound, unbound = _agents(4), _agents(4)
+    population = AgentPopulation.bind(bound)
+    assert population.reflect() == ["No observations yet"] * 4
+    for r in range(5):
+        population.observe(f"obs {r}", rows=[0, 1, 2] if r == 0 else None)
+        for i, agent in enumerate(unbound):
+            if r > 0 or i < 3:
+                agent.observe(f"obs {r}")
+        assert population.reflect() == [agent.reflect() for agent in unbound]
+    assert [a.memory for a in bound] == [a.memory for a in unbound]
+    assert bound[0].memory == ("obs 2", "obs 3", "obs 4")
+    assert [a.insights for a in bound] == [5, 5, 5, 4]
+
+
+def test_text_table_stays_bounded():
+    population = AgentPopulation(3)
+    for r in range(1000):
+        population.observe(f"obs {r}")
+    assert len(population.texts) <= 64
+    assert population.recent(1) == ["obs 997", "obs 998", "obs 999"]
+
+
+def test_bind_reuses_or_gathers():
+    agents = _agents(3)
+    population = AgentPopulation.bind(agents)
+    assert AgentPopulation.bind(agents) is population
+    population.observe("hello")
+    agents[1].insights = 7
+    # 子集 / 重排会收拢到新群体，状态随行迁移
+    subset = AgentPopulation.bind([agents[2], agents[1]])
+    assert subset is not population
+    assert subset.insights.tolist() == [0, 7] and agents[1].memory == ("hello",)
+
+
+def test_pickle_materializes_row():
+    agents = _agents(2)
+    population = AgentPopulation.bind(agents)
+    population.observe("a")
+    population.reflect()
+    clone = pickle.loads(pickle.dumps(agents[1]))
+    assert clone._population is None
+    assert clone.memory == ("a",) and clone.insights == 1
+
+
+def test_long_run_memory_is_flat(stub_simulation):
+    sim = CivilisSimulation(num_agents=3, rounds=50, seed=1, social_degree=0)
+    sim.run(keep_history=False)
+    assert all(len(agent.memory) == 3 for agent in sim.agents)
+    assert sim.get_agent_insights(2) == 50
+
+
+def test_memory_is_read_only_and_rows_are_unique():
+    agents = _agents(2)
+    population = AgentPopulation.bind(agents)
+    with pytest.raises(AttributeError):
+        agents[0].memory.append("lost")
+    with pytest.raises(ValueError):
+        population.observe("twice", rows=[1, 1])
+    agents[0].memory = ["a", "b"]
+    assert agents[0].memory == ("a", "b") and population.observed.tolist() == [2, 0]
@@ -0,0 +1,214 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from civilis import core
+from civilis.core import CivilisAgent
+from civilis.server import AgentServer
+
+
+class Client:
+    """保持连接的最小 HTTP/1.1 客户端"""
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+
+    @classmethod
+    async def connect(cls, server):
+        if isinstance(server.address, str):
+            return cls(*await asyncio.open_unix_connection(server.address))
+        return cls(*await asyncio.open_connection(*server.address))
+
+    async def request(self, method, path, payload=None, raw=None):
+        body = raw if raw is not None else (json.dumps(payload).encode() if payload is not None else b"")
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                          + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+        data = await self.reader.readexactly(int(headers["content-length"]))
+        return status, json.loads(data)
+
+    async def close(self):
+        self.writer.close()
+
+
+async def _serve(server, body, **kwargs):
+    await server.start(**kwargs)
+    async with server:
+        return await body(server)
+
+
+def test_concurrent_interactions(stub_model):
+    server = AgentServer(workers=4)
+
+    async def body(server):
+        clients = [await Client.connect(server) for _ in range(8)]
+
+        async def chat(i, client):
+            return [await client.request("POST", f"/agents/a{i % 5}/interact", {"message": f"m{i}-{k}"})
+                    for k in range(5)]
+
+        results = await asyncio.gather(*(chat(i, c) for i, c in enumerate(clients)))
+        _, agent = await clients[0].request("GET", "/agents/a0")
+        _, stats = await clients[0].request("GET", "/stats")
+        for client in clients:
+            await client.close()
+        return results, agent, stats
+
+    results, agent, stats = asyncio.run(_serve(server, body))
+    assert all(status == 200 for replies in results for status, _ in replies)
+    assert results[3][0][1] == {"agent_id": "a3", "response": "[a3] Acknowledged."}
+    assert agent == {"agent_id": "a0", "insights": 10}
+    assert len(server.agents) == 5 and sum(len(a.memory) for a in server.agents.values()) == 40
+    latency = stats["latency"]["interact"]
+    assert latency["count"] == 40 and 0 < latency["p50_ms"] <= latency["p99_ms"] <= latency["max_ms"]
+    assert stats["pending"] == 0 and stats["encoder_service"]["texts"] == 40
+    # 请求结束后不保留空闲的智能体锁
+    assert server._locks == {} and server._lock_users == {}
+    # 停止后恢复之前的编码服务
+    assert core._encoder_service is None
+
+
+class SlowAgent(CivilisAgent):
+    active = 0
+    overlap = False
+    guard = threading.Lock()
+
+    def interact(self, message):
+        with SlowAgent.guard:
+            SlowAgent.active += 1
+            SlowAgent.overlap |= SlowAgent.active > 1
+        time.sleep(0.02)
+        with SlowAgent.guard:
+            SlowAgent.active -= 1
+        return message
+
+
+def test_same_agent_is_serialized():
+    server = AgentServer(agents={"x": SlowAgent("x")}, create_agents=False, workers=4, batch_encoding=False)
+
+    async def body(server):
+        return await asyncio.gather(*(server.interact("x", str(i)) for i in range(5)))
+
+    assert asyncio.run(_serve(server, body)) == [str(i) for i in range(5)]
+    assert not SlowAgent.overlap
+
+
+def test_backpressure_rejects_with_503():
+    server = AgentServer(agent_factory=SlowAgent, workers=1, max_pending=2, batch_encoding=False)
+
+    async def body(server):
+        clients = [await Client.connect(server) for _ in range(4)]
+        replies = await asyncio.gather(*(c.request("POST", f"/agents/{i}/interact", {"message": "hi"})
+                                         for i, c in enumerate(clients)))
+        for client in clients:
+            await client.close()
+        return replies
+
+    statuses = sorted(status for status, _ in asyncio.run(_serve(server, body)))
+    assert statuses == [200, 200, 503, 503]
+    assert server.rejected == 2
+
+
+def test_errors_and_unix_socket(stub_model, tmp_path):
+    server = AgentServer(agents={"known": CivilisAgent("known")}, create_agents=False, batch_encoding=False)
+
+    async def body(server):
+        client = await Client.connect(server)
+        replies = [
+            await client.request("GET", "/health"),
+            await client.request("POST", "/agents/ghost/interact", {"message": "hi"}),
+            await client.request("POST", "/agents/known/interact", raw=b"{not json"),
+            await client.request("POST", "/agents/known/learn", {"statement": 3}),
+            await client.request("GET", "/agents/known/interact"),
+            await client.request("POST", "/agents/known/learn", {"statement": "ok", "source_module": "Li"}),
+            await client.request("GET", "/nowhere"),
+            await client.request("POST", "/agents/known/learn", raw=b""),
+        ]
+        # 负的 Content-Length 返回 400 并关闭连接
+        client.writer.write(b"POST /agents/known/learn HTTP/1.1\r\nContent-Length: -5\r\n\r\n")
+        replies.append((int((await client.reader.readline()).split()[1]), None))
+        await client.close()
+        return replies
+
+    replies = asyncio.run(_serve(server, body, unix_path=str(tmp_path / "civilis.sock")))
+    assert [status for status, _ in replies] == [200, 404, 400, 400, 405, 200, 404, 400, 400]
+    assert replies[5][1] == {"agent_id": "known", "learned": True}
+    assert len(server.agents["known"].memory) == 1
+
+
+class BrokenAgent(CivilisAgent):
+    def interact(self, message):
+        return {}["missing"]
+
+
+def test_internal_key_error_is_500_and_oversized_headers_get_431():
+    server = AgentServer(agents={"b": BrokenAgent("b")}, create_agents=False, batch_encoding=False,
+                         max_body_bytes=1024)
+
+    async def raw(server, data):
+        client = await Client.connect(server)
+        client.writer.write(data)
+        status = int((await client.reader.readline()).split()[1])
+        await client.close()
+        return status
+
+    async def body(server):
+        client = await Client.connect(server)
+        replies = [await client.request("POST", "/agents/b/interact", {"message": "hi"}),
+                   await client.request("POST", "/agents/ghost/interact", {"message": "hi"})]
+        await client.close()
+        flood = b"".join(b"X-%d: 1\r\n" % i for i in range(101))
+        statuses = [
+            await raw(server, b"GET /health HTTP/1.1\r\n" + flood + b"\r\n"),
+            await raw(server, b"GET /health HTTP/1.1\r\nX-Big: " + b"a" * (1 << 17) + b"\r\n\r\n"),
+            await raw(server, b"GET /" + b"a" * (1 << 17) + b" HTTP/1.1\r\n\r\n"),
+        ]
+        return [status for status, _ in replies] + statuses
+
+    # 智能体内部的 KeyError 不再被当作“未知智能体”
+    assert asyncio.run(_serve(server, body)) == [500, 404, 431, 431, 400]
+    assert server.errors == 1
+
+
+def test_agent_pool_is_capped(stub_model):
+    server = AgentServer(max_agents=2, batch_encoding=False)
+
+    async def body(server):
+        client = await Client.connect(server)
+        replies = [await client.request("POST", f"/agents/{i}/interact", {"message": "hi"}) for i in range(3)]
+        replies.append(await client.request("POST", "/agents/0/interact", {"message": "again"}))
+        await client.close()
+        return replies
+
+    assert [status for status, _ in asyncio.run(_serve(server, body))] == [200, 200, 503, 200]
+    assert sorted(server.agents) == ["0", "1"]
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        AgentServer(workers=0)
+    with pytest.raises(ValueError):
+        AgentServer(max_pending=0)
+    with pytest.raises(ValueError):
+        AgentServer(max_agents=0)
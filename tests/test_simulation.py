@@ -0,0 +1,126 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import multiprocessing as mp
+
+import numpy as np
+import pytest
+
+from civilis import parallel, simulation
+from civilis.simulation import CivilisSimulation
+from civilis.sinks import ColumnarSink, JSONLSink, MemorySink
+
+
+def test_round_is_encoded_in_one_batch(stub_simulation):
+    sim = CivilisSimulation(num_agents=20, rounds=5, seed=1, batch_size=16)
+    result = sim.run()
+    assert result["rounds_completed"] == 5
+    # 每轮一次批量调用，且同轮重复文本只编码一次
+    assert len(stub_simulation.calls) == 5
+    assert stub_simulation.calls[0] == ["Round 0 observation", "Insight #1: Based on 1 observations"]
+
+
+def test_agents_receive_round_vectors(stub_simulation, stub_model):
+    sim = CivilisSimulation(num_agents=3, rounds=4, seed=1)
+    sim.run()
+    for agent in sim.agents:
+        assert len(agent.knowledge) == 8
+        ins = agent.knowledge.query("Round 3 observation", top_k=1, threshold=0.99)
+        assert ins[0].content == "Round 3 observation"
+        np.testing.assert_allclose(ins[0].vector, stub_simulation._vec("Round 3 observation"))
+
+
+def test_iter_rounds_streams_without_history(stub_simulation):
+    sim = CivilisSimulation(num_agents=2, rounds=3, seed=1)
+    rounds = [record["round"] for record in sim.iter_rounds()]
+    assert rounds == [0, 1, 2]
+    assert sim.history == []
+    assert list(sim.iter_rounds()) == []
+
+
+def test_run_writes_sinks(stub_simulation, tmp_path):
+    sim = CivilisSimulation(num_agents=3, rounds=4, seed=1)
+    memory = MemorySink()
+    jsonl = JSONLSink(str(tmp_path / "history.jsonl"))
+    columnar = ColumnarSink(str(tmp_path / "metrics.npz"))
+    result = sim.run(sinks=[memory, jsonl, columnar], keep_history=False)
+    assert result["history"] == [] and result["rounds_completed"] == 4
+
+    assert [r["round"] for r in memory.records] == [0, 1, 2, 3]
+    lines = (tmp_path / "history.jsonl").read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[-1])["reflections"] == memory.records[-1]["reflections"]
+    metrics = np.load(tmp_path / "metrics.npz")
+    assert "observations" not in metrics.files
+    np.testing.assert_array_equal(metrics["total_insights"], [3, 6, 9, 12])
+
+
+def _snapshot(sim):
+    return [
+        (agent.insights, agent.memory,
+         sorted((ins.content, ins.strength) for ins in agent.knowledge.insights),
+         agent.rng.bit_generator.state)
+        for agent in sim.agents
+    ]
+
+
+def test_results_independent_of_worker_count(monkeypatch):
+    monkeypatch.setenv("CIVILIS_EMBEDDING_MODEL", "hashing:32")
+    # 开启社交层：分片返回的反思向量拼接后与单进程结果一致
+    serial = CivilisSimulation(num_agents=7, rounds=6, seed=11, social_degree=4)
+    sharded = CivilisSimulation(num_agents=7, rounds=6, seed=11, workers=3, social_degree=4)
+    serial_result = serial.run()
+    sharded_result = sharded.run()
+    assert sharded_result["history"] == serial_result["history"]
+    assert "social_alignment" in serial_result["history"][-1]
+    assert _snapshot(sharded) == _snapshot(serial)
+    assert sharded.get_agent_insights(6) == 6
+
+
+def test_worker_error_surfaces_and_keeps_agents(monkeypatch):
+    monkeypatch.setenv("CIVILIS_EMBEDDING_MODEL", "hashing:32")
+    step = simulation.AgentShard.step
+
+    def failing_step(self, round_num):
+        if round_num == 1 and self.agents[0].agent_id == 2:
+            raise RuntimeError("boom in shard")
+        return step(self, round_num)
+
+    # fork 启动的工作进程继承打过补丁的类
+    monkeypatch.setattr(simulation.AgentShard, "step", failing_step)
+    sim = CivilisSimulation(num_agents=6, rounds=3, seed=1, workers=3)
+    with pytest.raises(RuntimeError, match="boom in shard"):
+        sim.run()
+    # 其余分片的回复已读完，取回的仍是智能体；出错的分片停在上一轮
+    assert [type(agent).__name__ for agent in sim.agents] == ["CivilisAgent"] * 6
+    assert [agent.insights for agent in sim.agents] == [2, 2, 1, 1, 2, 2]
+
+
+def test_engine_startup_failure_stops_workers(monkeypatch):
+    def broken_backend(model_path):
+        raise OSError("no model here")
+
+    monkeypatch.setattr(parallel, "load_embedding_backend", broken_backend)
+    with pytest.raises(RuntimeError, match="no model here"):
+        parallel.ShardedEngine([simulation.CivilisAgent(i, None, np.random.default_rng(i)) for i in range(4)],
+                               "hashing:32", 8, 2, start_method="fork")
+    assert mp.active_children() == []
+
+
+def test_agents_get_independent_rng_streams(stub_simulation):
+    sim = CivilisSimulation(num_agents=3, rounds=1, seed=5)
+    draws = [agent.rng.random() for agent in sim.agents]
+    assert len(set(draws)) == 3
+    again = CivilisSimulation(num_agents=3, rounds=1, seed=5)
+    assert [agent.rng.random() for agent in again.agents] == draws
@@ -0,0 +1,98 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from civilis.simulation import CivilisSimulation
+from civilis.social import SocialGraph
+
+
+def test_lattice_without_rewiring_matches_networkx():
+    graph = SocialGraph.watts_strogatz(20, k=4, p=0.0, rng=np.random.default_rng(0))
+    reference = SocialGraph.from_networkx(nx.watts_strogatz_graph(20, 4, 0.0))
+    np.testing.assert_array_equal(graph.indptr, reference.indptr)
+    np.testing.assert_array_equal(graph.indices, reference.indices)
+    assert graph.num_edges == 40
+
+
+def test_rewired_graph_is_simple_and_keeps_edge_count():
+    graph = SocialGraph.watts_strogatz(5000, k=6, p=0.3, rng=np.random.default_rng(1))
+    rows = np.repeat(np.arange(graph.num_nodes), graph.degree)
+    assert not np.any(rows == graph.indices)
+    pairs = rows * graph.num_nodes + graph.indices
+    assert len(np.unique(pairs)) == len(pairs)
+    assert graph.num_edges == 5000 * 3
+
+
+def test_neighbor_mean_matches_python_loop():
+    rng = np.random.default_rng(2)
+    graph = SocialGraph.watts_strogatz(300, k=4, p=0.5, rng=rng)
+    values = rng.standard_normal((300, 8))
+    expected = np.stack([values[graph.indices[graph.indptr[i]:graph.indptr[i + 1]]].mean(axis=0)
+                         for i in range(300)])
+    np.testing.assert_allclose(graph.neighbor_mean(values), expected)
+
+
+def test_isolated_nodes_keep_their_value():
+    graph = SocialGraph.from_edges(4, np.array([0]), np.array([1]))
+    values = np.arange(4.0)
+    np.testing.assert_allclose(graph.propagate(values, alpha=1.0), [1.0, 0.0, 2.0, 3.0])
+
+
+def test_simulation_reports_social_alignment(stub_simulation):
+    assert CivilisSimulation(num_agents=12, rounds=1).social_graph is None
+    sim = CivilisSimulation(num_agents=12, rounds=3, seed=4, social_degree=4)
+    stub_simulation.calls.clear()
+    records = sim.run()["history"]
+    # 社交传播复用分片已编码的反思向量：每轮只编码一次（观察 + 反思去重后）
+    assert len(stub_simulation.calls) == 3
+    assert sim.social_graph.num_edges == 24
+    assert all(-1.0 <= r["social_alignment"] <= 1.0 for r in records)
+    assert sim.culture.shape == (12, 32)
+    np.testing.assert_allclose(np.linalg.norm(sim.culture, axis=1), 1.0, rtol=1e-5)
+
+
+def test_reach_matches_shortest_paths():
+    graph = SocialGraph.watts_strogatz(60, k=4, p=0.3, rng=np.random.default_rng(3))
+    g = nx.Graph()
+    g.add_nodes_from(range(60))
+    g.add_edges_from((i, j) for i in range(60) for j in graph.indices[graph.indptr[i]:graph.indptr[i + 1]])
+    for hops in (1, 2, 3):
+        rows, sources = graph.reach(hops)
+        expected = sorted((i, j) for i, lengths in nx.all_pairs_shortest_path_length(g, cutoff=hops)
+                          for j in lengths if j != i)
+        assert list(zip(rows.tolist(), sources.tolist())) == expected
+
+
+def test_reflections_travel_along_the_network(monkeypatch):
+    monkeypatch.setenv("CIVILIS_EMBEDDING_MODEL", "hashing:32")
+
+    def heard(hops, workers=1):
+        # 环形格点、不重连：智能体 i 的邻居为 i ± 1
+        sim = CivilisSimulation(num_agents=8, rounds=1, seed=5, social_degree=2, rewire_prob=0.0,
+                                social_hops=hops, workers=workers)
+        sim.agents[0].insights = 10      # 智能体 0 的反思与其他人不同
+        sim.run()
+        return [i for i, agent in enumerate(sim.agents)
+                for ins in agent.knowledge.insights
+                if ins.content == "Insight #11: Based on 1 observations"
+                and ins.source_module == ("reflection" if i == 0 else "social")]
+
+    assert heard(1) == [0, 1, 7]
+    # 两跳：经邻居转达到 2、6，3 跳以外的收不到
+    assert heard(2) == heard(2, workers=3) == [0, 1, 2, 6, 7]
+    with pytest.raises(ValueError):
+        CivilisSimulation(num_agents=4, rounds=1, social_degree=2, social_hops=0)
@@ -0,0 +1,256 @@
+# Copyright 2026 The Civilis Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from civilis.ann import IVFIndex
+from civilis.core import VectorMemory
+from conftest import StubModel
+
+
+@pytest.fixture(autouse=True)
+def _use_stub_model(stub_model):
+    return stub_model
+
+
+def _brute_force(memory, text, top_k, threshold):
+    q = StubModel()._vec(text)
+    scored = []
+    for ins in memory.insights:
+        sim = float(np.dot(q, ins.vector) / (np.linalg.norm(q) * np.linalg.norm(ins.vector)))
+        if sim >= threshold:
+            scored.append((sim, ins.content))
+    scored.sort(reverse=True)
+    return [c for _, c in scored[:top_k]]
+
+
+def test_query_matches_brute_force():
+    memory = VectorMemory(max_insights=500)
+    for i in range(300):
+        memory.add_insight(f"fact {i}")
+    for text in ["fact 7", "fact 123", "unrelated"]:
+        got = [ins.content for ins in memory.query(text, top_k=5, threshold=-1.0)]
+        assert got == _brute_force(memory, text, 5, -1.0)
+    assert memory.query("fact 7", top_k=1, threshold=0.99)[0].content == "fact 7"
+
+
+def test_duplicate_content_strengthens():
+    memory = VectorMemory()
+    memory.add_insight("Fire is dangerous.")
+    memory.add_insight("Fire is dangerous.")
+    assert len(memory) == 1
+    assert memory.insights[0].strength == 2
+
+
+def test_eviction_keeps_matrix_aligned():
+    memory = VectorMemory(max_insights=10)
+    for i in range(10):
+        memory.add_insight(f"fact {i}")
+        memory.add_insight(f"fact {i}")
+    for i in range(10, 30):
+        memory.add_insight(f"fact {i}")
+    assert len(memory) == 10
+    for row, ins in enumerate(memory.insights):
+        assert memory._index[ins.content] == row
+        expected = ins.vector / np.linalg.norm(ins.vector)
+        np.testing.assert_allclose(memory._matrix[row], expected, rtol=1e-5)
+    assert memory.query("fact 3", top_k=1, threshold=0.99)[0].content == "fact 3"
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_compact_storage_with_rerank_matches_exact(storage, stub_model):
+    exact = VectorMemory(max_insights=500)
+    compact = VectorMemory(max_insights=500, storage=storage)
+    reranked = VectorMemory(max_insights=500, storage=storage, rerank=4)
+    for i in range(300):
+        for memory in (exact, compact, reranked):
+            memory.add_insight(f"fact {i}")
+    assert compact.insights[0].vector is None and compact._exact is None
+    for text in ["fact 7", "fact 123", "unrelated"]:
+        expected = [ins.content for ins in exact.query(text, top_k=5, threshold=-1.0)]
+        stub_model.calls.clear()
+        got = reranked.query(text, top_k=5, threshold=-1.0)
+        # 精排只读侧存储，查询本身之外不再编码
+        assert len(stub_model.calls) <= 1
+        assert [ins.content for ins in got] == expected
+    assert compact.memory_usage() * (3 if storage == "int8" else 2) <= exact.memory_usage() * 1.1
+    assert reranked.memory_usage() > exact.memory_usage()
+
+
+def test_rerank_uses_stored_custom_vectors():
+    # 自定义向量与文本的嵌入无关：精排必须使用写入的向量
+    memory = VectorMemory(max_insights=3, eviction="lru", storage="int8", rerank=2)
+    memory.add_insight("a", vector=np.array([1.0, 0.0, 0.0]))
+    memory.add_insight("b", vector=np.array([0.6, 0.8, 0.0]))
+    memory.add_insight("c", vector=np.array([0.0, 0.0, 1.0]))
+    assert [i.content for i in memory.query(np.array([0.1, 1.0, 0.0]), top_k=2, threshold=-1.0)] == ["b", "a"]
+    # 淘汰 "c" 后末行换入，侧存储随之移动
+    memory.add_insight("d", vector=np.array([0.0, 1.0, 0.0]))
+    assert [i.content for i in memory.insights] == ["a", "b", "d"]
+    np.testing.assert_allclose(memory._exact[2], [0.0, 1.0, 0.0])
+    with pytest.raises(ValueError):
+        VectorMemory(rerank=-1)
+
+
+def test_int8_scores_track_exact_without_rerank():
+    memory = VectorMemory(max_insights=10, storage="int8", rerank=0)
+    for i in range(30):
+        memory.add_insight(f"fact {i}")
+    assert len(memory) == 10
+    stub = StubModel()
+    for row, ins in enumerate(memory.insights):
+        expected = stub._vec(ins.content) / np.linalg.norm(stub._vec(ins.content))
+        dequantized = memory._matrix[row].astype(np.float32) * memory._scales[row]
+        np.testing.assert_allclose(dequantized, expected, atol=0.02)
+    assert memory.query("fact 29", top_k=1, threshold=0.95)[0].content == "fact 29"
+
+
+def test_unknown_storage_rejected():
+    with pytest.raises(ValueError):
+        VectorMemory(storage="int4")
+
+
+def test_add_insights_matches_sequential_adds(stub_model):
+    texts = [f"fact {i % 7}" for i in range(20)] + [f"new {i}" for i in range(8)]
+    sequential = VectorMemory(max_insights=10)
+    for text in texts:
+        sequential.add_insight(text, "seq")
+    stub_model.calls.clear()
+    bulk = VectorMemory(max_insights=10)
+    bulk.add_insights(texts, "bulk")
+    # 已被缓存的文本不会再调用模型；批量版本对未命中文本只有一次调用
+    assert len(stub_model.calls) == 0
+    assert [(i.content, i.strength) for i in bulk.insights] == \
+        [(i.content, i.strength) for i in sequential.insights]
+    np.testing.assert_array_equal(bulk._matrix[:10], sequential._matrix[:10])
+
+    fresh = VectorMemory()
+    fresh.add_insights([f"batch {i}" for i in range(5)] * 2)
+    assert stub_model.calls == [[f"batch {i}" for i in range(5)]]
+    assert [i.strength for i in fresh.insights] == [2] * 5
+    with pytest.raises(ValueError):
+        fresh.add_insights(["a", "b"], vectors=np.zeros((1, 32)))
+
+
+@pytest.mark.parametrize("storage", ["float32", "int8"])
+def test_query_many_matches_single_queries(storage):
+    single, batched = VectorMemory(storage=storage), VectorMemory(storage=storage)
+    texts = [f"fact {i}" for i in range(150)]
+    single.add_insights(texts)
+    batched.add_insights(texts)
+    probes = ["fact 3", "fact 140", "unrelated", "fact 3"]
+    expected = [[i.content for i in single.query(p, top_k=3, threshold=0.0)] for p in probes]
+    got = [[i.content for i in matches] for matches in batched.query_many(probes, top_k=3, threshold=0.0)]
+    assert got == expected
+    assert [i.hits for i in batched.insights] == [i.hits for i in single.insights]
+    assert batched.query_many([]) == []
+
+
+def test_learn_encodes_once_and_learn_many_batches(stub_model):
+    from civilis.core import CivilisAgent
+    from civilis.embedding_backends import default_model_path
+    from civilis.embedding_cache import get_embedding_cache
+
+    agent = CivilisAgent("A")
+    agent.learn("Water flows downhill.")
+    stats = get_embedding_cache(default_model_path()).stats()
+    assert stats["hits"] + stats["misses"] == 1
+
+    stub_model.calls.clear()
+    agent.learn_many([f"lesson {i}" for i in range(50)] + ["Water flows downhill."])
+    assert stub_model.calls == [[f"lesson {i}" for i in range(50)]]
+    assert len(agent.memory) == 51
+    assert agent.memory.insights[0].strength == 2
+    # 默认强度策略下自查询不改动命中计数
+    assert all(ins.hits == 0 for ins in agent.memory.insights)
+
+
+def test_merge_folds_near_duplicates():
+    memory = VectorMemory(merge_threshold=0.9, rerank=0)
+    memory.add_insight("fire is hot", vector=np.array([1.0, 0.0, 0.0]))
+    memory.add_insight("fire is very hot", vector=np.array([0.98, 0.2, 0.0]))
+    memory.add_insight("water is wet", vector=np.array([0.0, 0.0, 1.0]))
+    assert [(i.content, i.strength, i.members) for i in memory.insights] == \
+        [("fire is hot", 2, 2), ("water is wet", 1, 1)]
+    # 代表向量为成员质心；别名再次出现时直接加强
+    np.testing.assert_allclose(memory.insights[0].vector, [0.995, 0.1, 0.0], atol=1e-2)
+    memory.add_insight("fire is very hot")
+    assert memory.insights[0].strength == 3 and len(memory) == 2
+
+
+def test_merge_with_empty_probed_cluster():
+    memory = VectorMemory(max_insights=2, merge_threshold=0.9,
+                          index=IVFIndex(nlist=2, nprobe=1, train_size=2, retrain_factor=10))
+    memory.add_insight("east", vector=np.array([1.0, 0.0, 0.0]))
+    memory.add_insight("north", vector=np.array([0.0, 1.0, 0.0]))
+    # 落入 north 簇并淘汰 east：east 所在的簇变空
+    memory.add_insight("up north", vector=np.array([0.0, 1.0, 1.0]))
+    assert {ins.content for ins in memory.insights} == {"north", "up north"}
+    # 最近的簇没有任何行时改为精确查找，不再对空数组取 argmax
+    memory.add_insight("east again", vector=np.array([1.0, 0.0, 0.1]))
+    assert {ins.content for ins in memory.insights} == {"up north", "east again"}
+    memory.add_insight("north again", vector=np.array([0.05, 1.0, 1.0]))
+    assert [(ins.content, ins.strength) for ins in memory.insights
+            if ins.content == "up north"] == [("up north", 2)]
+
+
+@pytest.mark.parametrize("storage, rerank", [("float16", 4), ("int8", 4), ("int8", 0)])
+def test_merge_with_compact_storage_ranks_by_centroid(storage, rerank):
+    # 成对的近似重复：合并后代表向量为质心，紧凑存储（含精排）的排序与 float32 一致
+    rng = np.random.default_rng(0)
+    bases = rng.standard_normal((20, 16))
+    vectors = [(f"t{i}{suffix}", bases[i] + 0.3 * rng.standard_normal(16))
+               for i in range(20) for suffix in ("", "'")]
+    exact = VectorMemory(merge_threshold=0.85)
+    compact = VectorMemory(merge_threshold=0.85, storage=storage, rerank=rerank)
+    for content, vec in vectors:
+        exact.add_insight(content, vector=vec)
+        compact.add_insight(content, vector=vec)
+    assert [(i.content, i.members) for i in compact.insights] == [(i.content, i.members) for i in exact.insights]
+    assert any(i.members > 1 for i in compact.insights)
+    for row, ins in enumerate(exact.insights):
+        np.testing.assert_allclose(compact._unit_rows(row), exact._matrix[row], atol=0.02)
+    for q in rng.standard_normal((10, 16)):
+        expected = [i.content for i in exact.query(q, top_k=3, threshold=-1.0)]
+        got = [i.content for i in compact.query(q, top_k=3, threshold=-1.0)]
+        assert got == expected if rerank else got[0] == expected[0]
+    # 离线合并同样更新精排侧存储
+    assert compact.consolidate(threshold=0.5) == exact.consolidate(threshold=0.5)
+    if rerank:
+        n = len(compact)
+        np.testing.assert_allclose(compact._exact[:n], exact._matrix[:n], atol=1e-5)
+
+
+def test_merge_aliases_dropped_with_evicted_insight():
+    memory = VectorMemory(max_insights=1, eviction="lru", merge_threshold=0.9, rerank=0)
+    memory.add_insight("a", vector=np.array([1.0, 0.0]))
+    memory.add_insight("a2", vector=np.array([1.0, 0.01]))
+    memory.add_insight("b", vector=np.array([0.0, 1.0]))
+    assert [i.content for i in memory.insights] == ["b"]
+    assert memory._aliases == {} and memory._alias_groups == {}
+
+
+def test_consolidate_existing_memory():
+    memory = VectorMemory(rerank=0)
+    for content, vec in [("x", [1.0, 0.0]), ("y", [0.0, 1.0]), ("x'", [0.99, 0.05]), ("y'", [0.05, 0.99])]:
+        memory.add_insight(content, vector=np.array(vec))
+    memory.insights[2].strength = 5
+    assert memory.consolidate(threshold=0.95) == 2
+    # 强度更高的 x' 成为代表，吸收 x 的强度
+    assert sorted((i.content, i.strength, i.members) for i in memory.insights) == [("x'", 6, 2), ("y", 2, 2)]
+    memory.add_insight("x")
+    assert len(memory) == 2
+    with pytest.raises(ValueError):
+        VectorMemory().consolidate()